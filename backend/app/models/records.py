@@ -0,0 +1,286 @@
+"""Compact records for active call rooms.
+
+Rooms keep only what the API reads back (ids, kinds, membership and
+activity) in ``__slots__`` objects; full SFU responses (ICE candidates,
+DTLS and RTP parameters) go to the client and are not stored. Each id
+string is held once per room and shared by every index that refers to it.
+
+``to_dict``/``from_dict`` convert to the JSON form kept by the SQLite
+state backend; the memory backend holds the records themselves.
+"""
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+def _interner() -> Callable[[Optional[str]], Optional[str]]:
+    # Scoped to one decoded room rather than sys.intern: ids churn for the
+    # life of the process, and interned strings are immortal on Python 3.12
+    seen: Dict[str, str] = {}
+
+    def intern(value: Optional[str]) -> Optional[str]:
+        return value if value is None else seen.setdefault(value, value)
+
+    return intern
+
+
+class ProducerRecord:
+    """A participant's media sender."""
+
+    __slots__ = ("producer_id", "user_id", "kind")
+
+    def __init__(self, producer_id: str, user_id: str, kind: str):
+        self.producer_id = producer_id
+        self.user_id = user_id
+        self.kind = kind
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"producer_id": self.producer_id, "user_id": self.user_id, "kind": self.kind}
+
+
+class ConsumerRecord:
+    """A participant's receiver of another participant's producer."""
+
+    __slots__ = ("consumer_id", "producer_id", "user_id", "kind")
+
+    def __init__(self, consumer_id: str, producer_id: str, user_id: str, kind: Optional[str]):
+        self.consumer_id = consumer_id
+        self.producer_id = producer_id
+        self.user_id = user_id
+        self.kind = kind
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "consumer_id": self.consumer_id,
+            "producer_id": self.producer_id,
+            "user_id": self.user_id,
+            "kind": self.kind
+        }
+
+
+class ParticipantRecord:
+    """A seat in a room: its transport, media and last activity."""
+
+    __slots__ = ("user_id", "transport_id", "last_seen", "producer_ids", "consumer_ids")
+
+    def __init__(
+        self,
+        user_id: str,
+        last_seen: float,
+        transport_id: Optional[str] = None,
+        producer_ids: Optional[List[str]] = None,
+        consumer_ids: Optional[List[str]] = None
+    ):
+        self.user_id = user_id
+        self.transport_id = transport_id
+        self.last_seen = last_seen
+        self.producer_ids = producer_ids if producer_ids is not None else []
+        self.consumer_ids = consumer_ids if consumer_ids is not None else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "transport_id": self.transport_id,
+            "last_seen": self.last_seen,
+            "producer_ids": self.producer_ids,
+            "consumer_ids": self.consumer_ids
+        }
+
+
+class RoomRecord:
+    """
+    An active call room.
+
+    ``participants`` is keyed by user ID in join order. ``producers`` and
+    ``consumers`` are keyed by SFU id, and ``producer_consumers`` links a
+    producer to its consumers, so leave/close/fan-out only touch affected
+    entries.
+    """
+
+    __slots__ = (
+        "room_id",
+        "router_id",
+        "codec_fingerprint",
+        "created_by",
+        "created_at",
+        "ended_at",
+        "status",
+        "participants",
+        "participants_seen",
+        "producers",
+        "consumers",
+        "producer_consumers"
+    )
+
+    def __init__(
+        self,
+        room_id: str,
+        router_id: str,
+        codec_fingerprint: Optional[str],
+        created_by: str,
+        created_at: str,
+        status: str = "active",
+        ended_at: Optional[str] = None
+    ):
+        self.room_id = room_id
+        self.router_id = router_id
+        self.codec_fingerprint = codec_fingerprint
+        self.created_by = created_by
+        self.created_at = created_at
+        self.ended_at = ended_at
+        self.status = status
+        self.participants: Dict[str, ParticipantRecord] = {}
+        self.participants_seen: List[str] = []
+        self.producers: Dict[str, ProducerRecord] = {}
+        self.consumers: Dict[str, ConsumerRecord] = {}
+        self.producer_consumers: Dict[str, List[str]] = {}
+
+    # Membership
+
+    def participant_ids(self) -> List[str]:
+        return list(self.participants)
+
+    def add_participant(self, user_id: str, now: float) -> ParticipantRecord:
+        participant = self.participants[user_id] = ParticipantRecord(user_id, now)
+        if user_id not in self.participants_seen:
+            self.participants_seen.append(user_id)
+        return participant
+
+    def remove_participant(self, user_id: str) -> bool:
+        """Drop a participant with their producers (and those producers' consumers) and consumers."""
+        participant = self.participants.pop(user_id, None)
+        if participant is None:
+            return False
+        for producer_id in list(participant.producer_ids):
+            self.drop_producer(producer_id)
+        for consumer_id in list(participant.consumer_ids):
+            self.drop_consumer(consumer_id)
+        return True
+
+    def touch(self, user_id: str, now: float) -> None:
+        participant = self.participants.get(user_id)
+        if participant is not None:
+            participant.last_seen = now
+
+    def end(self, ended_at: str) -> None:
+        self.status = "ended"
+        self.ended_at = ended_at
+
+    # Media
+
+    def add_producer(self, user_id: str, producer_id: str, kind: str) -> ProducerRecord:
+        participant = self.participants.get(user_id)
+        if participant is None:
+            raise ValueError(f"User {user_id} is not in call room {self.room_id}")
+        producer = ProducerRecord(producer_id, participant.user_id, kind)
+        self.producers[producer_id] = producer
+        participant.producer_ids.append(producer_id)
+        self.producer_consumers.setdefault(producer_id, [])
+        return producer
+
+    def add_consumer(self, user_id: str, consumer_id: str, producer_id: str, kind: Optional[str]) -> ConsumerRecord:
+        participant = self.participants.get(user_id)
+        if participant is None:
+            raise ValueError(f"User {user_id} is not in call room {self.room_id}")
+        producer = self.producers.get(producer_id)
+        if producer is None:
+            raise ValueError(f"Producer {producer_id} was closed")
+        consumer = ConsumerRecord(consumer_id, producer.producer_id, participant.user_id, kind or producer.kind)
+        self.consumers[consumer_id] = consumer
+        participant.consumer_ids.append(consumer_id)
+        self.producer_consumers.setdefault(producer.producer_id, []).append(consumer_id)
+        return consumer
+
+    def drop_consumer(self, consumer_id: str, unlink_producer: bool = True) -> None:
+        consumer = self.consumers.pop(consumer_id, None)
+        if consumer is None:
+            return
+
+        owner = self.participants.get(consumer.user_id)
+        if owner is not None and consumer_id in owner.consumer_ids:
+            owner.consumer_ids.remove(consumer_id)
+
+        if unlink_producer:
+            linked = self.producer_consumers.get(consumer.producer_id)
+            if linked is not None and consumer_id in linked:
+                linked.remove(consumer_id)
+
+    def drop_producer(self, producer_id: str) -> None:
+        producer = self.producers.pop(producer_id, None)
+        if producer is None:
+            return
+
+        owner = self.participants.get(producer.user_id)
+        if owner is not None and producer_id in owner.producer_ids:
+            owner.producer_ids.remove(producer_id)
+
+        # Consumers of a closed producer are closed by the SFU as well
+        for consumer_id in self.producer_consumers.pop(producer_id, []):
+            self.drop_consumer(consumer_id, unlink_producer=False)
+
+    def remote_producers(self, user_id: str) -> List[ProducerRecord]:
+        """Producers owned by everyone except ``user_id``."""
+        return [
+            self.producers[producer_id]
+            for owner, participant in self.participants.items()
+            if owner != user_id
+            for producer_id in participant.producer_ids
+        ]
+
+    def consumed_producer_ids(self, user_id: str) -> Set[str]:
+        participant = self.participants.get(user_id)
+        if participant is None:
+            return set()
+        return {self.consumers[consumer_id].producer_id for consumer_id in participant.consumer_ids}
+
+    # Serialization
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "room_id": self.room_id,
+            "router_id": self.router_id,
+            "codec_fingerprint": self.codec_fingerprint,
+            "created_by": self.created_by,
+            "created_at": self.created_at,
+            "ended_at": self.ended_at,
+            "status": self.status,
+            "participants": [participant.to_dict() for participant in self.participants.values()],
+            "participants_seen": self.participants_seen,
+            "producers": [producer.to_dict() for producer in self.producers.values()],
+            "consumers": [consumer.to_dict() for consumer in self.consumers.values()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RoomRecord":
+        intern = _interner()
+        room = cls(
+            room_id=intern(data["room_id"]),
+            router_id=intern(data["router_id"]),
+            codec_fingerprint=data.get("codec_fingerprint"),
+            created_by=intern(data["created_by"]),
+            created_at=data["created_at"],
+            status=data.get("status", "active"),
+            ended_at=data.get("ended_at")
+        )
+        room.participants_seen = [intern(user_id) for user_id in data.get("participants_seen", [])]
+
+        for entry in data["participants"]:
+            user_id = intern(entry["user_id"])
+            room.participants[user_id] = ParticipantRecord(
+                user_id,
+                entry["last_seen"],
+                transport_id=intern(entry.get("transport_id")),
+                producer_ids=[intern(producer_id) for producer_id in entry["producer_ids"]],
+                consumer_ids=[intern(consumer_id) for consumer_id in entry["consumer_ids"]]
+            )
+        for entry in data["producers"]:
+            producer_id = intern(entry["producer_id"])
+            room.producers[producer_id] = ProducerRecord(producer_id, intern(entry["user_id"]), entry["kind"])
+            room.producer_consumers[producer_id] = []
+        for entry in data["consumers"]:
+            consumer_id = intern(entry["consumer_id"])
+            producer_id = intern(entry["producer_id"])
+            room.consumers[consumer_id] = ConsumerRecord(
+                consumer_id, producer_id, intern(entry["user_id"]), entry.get("kind")
+            )
+            room.producer_consumers.setdefault(producer_id, []).append(consumer_id)
+        return room
+
@@ -1,6 +1,6 @@
 """Pydantic schemas for API requests and responses."""
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 
 class CreateCallRequest(BaseModel):
@@ -26,15 +26,27 @@ class CreateProducerRequest(BaseModel):
     kind: str  # "audio" or "video"
 
 
+class CreateProducersRequest(BaseModel):
+    """Request to create several producers on one transport."""
+    producers: List[CreateProducerRequest]
+
+
 class CreateConsumerRequest(BaseModel):
     """Request to create a consumer."""
     producer_id: str
     rtp_capabilities: Dict[str, Any]
 
 
+class ConsumeRemoteRequest(BaseModel):
+    """Request to consume every remote producer in a call."""
+    rtp_capabilities: Dict[str, Any]
+
+
 class StartRecordingRequest(BaseModel):
     """Request to start recording."""
     user_id: str
+    priority: int = 0  # higher is admitted first when recorders are saturated
+    segmented: bool = False  # stream fixed-length segments to S3 while recording
 
 
 class CallResponse(BaseModel):
@@ -61,5 +73,13 @@ class S3UploadResponse(BaseModel):
     s3_key: str
     s3_url: str
     status: str
+    job_id: Optional[str] = None
+    bytes_total: Optional[int] = None
+    bytes_uploaded: Optional[int] = None
 
 
+class ProfilingConfigRequest(BaseModel):
+    """Request to change profiler settings (omitted fields are unchanged)."""
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = None
+    slow_threshold_ms: Optional[float] = None
@@ -0,0 +1,151 @@
+"""Persistent history of call rooms.
+
+Active room state lives in the state store and disappears when the room
+empties. This table keeps a summary of every room (participants, creation
+and end time), upserted on create, join and close, for analytics exports.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from config import settings
+from app.models.records import RoomRecord
+
+
+def call_summary(room: RoomRecord) -> Dict[str, Any]:
+    """
+    Reduce room state to the fields kept in history.
+
+    Args:
+        room: Room record from the state store
+
+    Returns:
+        Summary without transports or media indexes
+    """
+    return {
+        "room_id": room.room_id,
+        "router_id": room.router_id,
+        "created_by": room.created_by,
+        "participants": room.participant_ids(),
+        "participants_seen": list(room.participants_seen),
+        "created_at": room.created_at,
+        "ended_at": room.ended_at,
+        "status": room.status
+    }
+
+
+class CallHistory:
+    """Call room summaries in SQLite (WAL), indexed by last change."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path,
+            timeout=settings.sqlite_busy_timeout,  # waits on the event loop
+            isolation_level=None,  # autocommit; every write is a single statement
+            check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS calls ("
+                " room_id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " created_at TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL,"
+                " info TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS calls_updated ON calls (updated_at, room_id)"
+            )
+
+    def record(self, room: RoomRecord) -> None:
+        """
+        Insert or replace a room's history entry.
+
+        Args:
+            room: Room record
+        """
+        summary = call_summary(room)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO calls (room_id, status, created_at, updated_at, info)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    summary["room_id"],
+                    summary["status"],
+                    summary["created_at"],
+                    datetime.now().isoformat(),
+                    json.dumps(summary)
+                )
+            )
+
+    def iter_updated_since(
+        self,
+        since: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield rooms changed at or after ``since``, oldest change first.
+
+        Args:
+            since: ISO timestamp (None exports everything)
+            batch_size: Rows per query
+
+        Yields:
+            Room summary with its ``updated_at``
+        """
+        where, params = "updated_at >= ?", (since or "",)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT room_id, updated_at, info FROM calls"
+                    f" WHERE {where} ORDER BY updated_at, room_id LIMIT ?",
+                    (*params, batch_size)
+                ).fetchall()
+            for _, updated_at, info in rows:
+                summary = json.loads(info)
+                summary["updated_at"] = updated_at
+                yield summary
+            if len(rows) < batch_size:
+                return
+            last_id, last_updated_at, _ = rows[-1]
+            where = "updated_at > ? OR (updated_at = ? AND room_id > ?)"
+            params = (last_updated_at, last_updated_at, last_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_history: Optional[CallHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_call_history() -> CallHistory:
+    """
+    Get the call history, creating it on first use.
+
+    Returns:
+        CallHistory at ``settings.call_history_db_path``
+    """
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = CallHistory(settings.call_history_db_path)
+    return _history
+
+
+def close_call_history() -> None:
+    """Close the call history (called on application shutdown)."""
+    global _history
+    with _history_lock:
+        if _history is not None:
+            _history.close()
+            _history = None
@@ -1,17 +1,37 @@
 """Call room management service."""
 import uuid
-from typing import Dict, Optional, Any
+import asyncio
+import time
+from typing import Dict, List, Optional, Any
 from datetime import datetime
-from services.mediasoup_client import (
-    create_mediasoup_router,
-    get_router_rtp_capabilities,
+from app.models.records import RoomRecord
+from app.services.mediasoup_client import (
+    provision_room,
+    get_router_rtp_capabilities_entry,
     create_mediasoup_transport,
     close_router
 )
+from app.services.router_pool import get_router_pool
+from app.services.state_store import get_state_store, register_record_type
+from app.services.call_history import get_call_history
+from app.services import metrics
 
 
-# In-memory storage for active calls (use Redis/DB in production)
-_active_calls: Dict[str, Dict] = {}
+# State store namespace for active calls
+CALLS = "calls"
+
+register_record_type(CALLS, RoomRecord)
+
+
+# Each participant's ``last_seen`` is the wall-clock time of their last API
+# call, heartbeat or signaling keepalive; the room reaper expires
+# participants (and then rooms) that stay silent for too long.
+
+def _track_room(room_id: str) -> None:
+    from app.services.room_reaper import get_room_reaper
+    reaper = get_room_reaper()
+    if reaper is not None:
+        reaper.track(room_id)
 
 
 async def create_call_room(user_id: str) -> Dict[str, Any]:
@@ -26,36 +46,41 @@ async def create_call_room(user_id: str) -> Dict[str, Any]:
     """
     room_id = str(uuid.uuid4())
     
-    # Create mediasoup router
-    router_config = await create_mediasoup_router()
-    router_id = router_config.get("router_id")
-    
-    # Get RTP capabilities
-    rtp_capabilities = await get_router_rtp_capabilities(router_id)
-    
-    # Create transport for the first user
-    transport = await create_mediasoup_transport(router_id, "sendrecv")
-    
-    call_info = {
-        "room_id": room_id,
-        "router_id": router_id,
-        "created_by": user_id,
-        "participants": [user_id],
-        "transports": {
-            user_id: transport
-        },
-        "producers": {},
-        "consumers": {},
-        "created_at": datetime.now().isoformat(),
-        "status": "active"
-    }
-    
-    _active_calls[room_id] = call_info
+    # Take a pre-warmed router + transport if available, otherwise create
+    # both in one SFU round trip
+    pool = get_router_pool()
+    pooled = pool.acquire() if pool else None
+    if pooled is not None:
+        router_id = pooled.router_id
+        transport = pooled.transport
+        codec_fingerprint = pooled.codec_fingerprint
+    else:
+        provisioned = await provision_room(transports=1)
+        router_id = provisioned["router_id"]
+        transport = provisioned["transports"][0]
+        codec_fingerprint = provisioned.get("codec_fingerprint")
+    
+    capabilities = await get_router_rtp_capabilities_entry(router_id, codec_fingerprint)
+    
+    # Only ids are kept; the full transport goes back to the client
+    room = RoomRecord(
+        room_id=room_id,
+        router_id=router_id,
+        codec_fingerprint=capabilities.fingerprint,
+        created_by=user_id,
+        created_at=datetime.now().isoformat()
+    )
+    room.add_participant(user_id, time.time()).transport_id = transport["transport_id"]
+    
+    get_state_store().put(CALLS, room_id, room)
+    get_call_history().record(room)
+    _track_room(room_id)
     
     return {
         "room_id": room_id,
         "router_id": router_id,
-        "rtp_capabilities": rtp_capabilities,
+        "rtp_capabilities": capabilities.rtp_capabilities,
+        "rtp_capabilities_json": capabilities.json_bytes,
         "transport": transport,
         "status": "created"
     }
@@ -72,33 +97,53 @@ async def join_call_room(room_id: str, user_id: str) -> Dict[str, Any]:
     Returns:
         Call room configuration with router and transport info
     """
-    if room_id not in _active_calls:
-        raise ValueError(f"Call room {room_id} not found")
-    
-    call_info = _active_calls[room_id]
-    
-    if user_id in call_info["participants"]:
-        raise ValueError(f"User {user_id} already in room")
-    
-    if len(call_info["participants"]) >= 2:
-        raise ValueError("Call room is full (1:1 call only)")
-    
-    router_id = call_info["router_id"]
-    
-    # Get RTP capabilities
-    rtp_capabilities = await get_router_rtp_capabilities(router_id)
-    
-    # Create transport for the joining user
-    transport = await create_mediasoup_transport(router_id, "sendrecv")
-    
-    # Add user to participants
-    call_info["participants"].append(user_id)
-    call_info["transports"][user_id] = transport
+    store = get_state_store()
+    
+    def reserve_seat(room):
+        if room is None:
+            raise ValueError(f"Call room {room_id} not found")
+        if user_id in room.participants:
+            raise ValueError(f"User {user_id} already in room")
+        if len(room.participants) >= 2:
+            raise ValueError("Call room is full (1:1 call only)")
+        room.add_participant(user_id, time.time())
+        return room, room
+    
+    # Claim the seat atomically before any SFU await so concurrent joins
+    # (in this or another worker) can never admit a third participant
+    room = store.update(CALLS, room_id, reserve_seat)
+    router_id = room.router_id
+    
+    try:
+        # Capabilities are normally cached (no SFU call); on a miss the lookup
+        # and transport creation are independent, so dispatch them together
+        capabilities, transport = await asyncio.gather(
+            get_router_rtp_capabilities_entry(router_id, room.codec_fingerprint),
+            create_mediasoup_transport(router_id, "sendrecv")
+        )
+    except Exception:
+        def release_seat(room):
+            if room is not None:
+                room.remove_participant(user_id)
+            return room, None
+        
+        store.update(CALLS, room_id, release_seat)
+        raise
+    
+    def attach_transport(room):
+        if room is None or user_id not in room.participants:
+            raise ValueError(f"Call room {room_id} not found")
+        room.participants[user_id].transport_id = transport["transport_id"]
+        return room, room
+    
+    get_call_history().record(store.update(CALLS, room_id, attach_transport))
+    _track_room(room_id)
     
     return {
         "room_id": room_id,
         "router_id": router_id,
-        "rtp_capabilities": rtp_capabilities,
+        "rtp_capabilities": capabilities.rtp_capabilities,
+        "rtp_capabilities_json": capabilities.json_bytes,
         "transport": transport,
         "status": "joined"
     }
@@ -115,38 +160,98 @@ async def leave_call_room(room_id: str, user_id: str) -> bool:
     Returns:
         True if successful
     """
-    if room_id not in _active_calls:
+    def remove_user(room):
+        if room is None:
+            return None, None
+        
+        # Drops the user's transport, producers (and their consumers) and consumers
+        room.remove_participant(user_id)
+        
+        # If room is empty, drop it and report its router for closing
+        if not room.participants:
+            room.end(datetime.now().isoformat())
+            return None, (room.router_id, room)
+        return room, ("", room)
+    
+    result = get_state_store().update(CALLS, room_id, remove_user)
+    if result is None:
         return False
     
-    call_info = _active_calls[room_id]
+    router_to_close, room = result
+    get_call_history().record(room)
     
-    if user_id in call_info["participants"]:
-        call_info["participants"].remove(user_id)
+    if router_to_close:
+        await close_router(router_to_close)
     
-    # Remove user's transport
-    if user_id in call_info["transports"]:
-        del call_info["transports"][user_id]
+    return True
+
+
+def touch_participant(room_id: str, user_id: str) -> None:
+    """
+    Record that a participant is still connected (heartbeat).
     
-    # Remove user's producers/consumers
-    call_info["producers"] = {
-        k: v for k, v in call_info["producers"].items()
-        if not k.startswith(f"{user_id}_")
-    }
-    call_info["consumers"] = {
-        k: v for k, v in call_info["consumers"].items()
-        if not k.startswith(f"{user_id}_")
-    }
+    Args:
+        room_id: The call room ID
+        user_id: The user ID
+    """
+    def touch(room):
+        if room is None or user_id not in room.participants:
+            raise ValueError(f"User {user_id} is not in call room {room_id}")
+        room.touch(user_id, time.time())
+        return room, None
     
-    # If room is empty, close router and remove room
-    if len(call_info["participants"]) == 0:
-        router_id = call_info["router_id"]
-        await close_router(router_id)
-        del _active_calls[room_id]
+    get_state_store().update(CALLS, room_id, touch)
+
+
+async def expire_idle_participants(room_id: str, idle_timeout: float) -> Dict[str, Any]:
+    """
+    Remove participants idle for ``idle_timeout`` seconds, ending the call if none remain.
     
-    return True
+    Staleness is decided inside the state update, so a heartbeat that lands
+    first always wins.
+    
+    Args:
+        room_id: The call room ID
+        idle_timeout: Seconds without activity before a participant expires
+    
+    Returns:
+        ``expired`` user IDs, whether the call ``ended``, and ``next_check``
+        (when the next participant could expire, or None once the room is gone)
+    """
+    now = time.time()
+    
+    def expire(room):
+        if room is None:
+            return None, None
+        
+        expired = [
+            user_id for user_id, participant in room.participants.items()
+            if participant.last_seen + idle_timeout <= now
+        ]
+        for user_id in expired:
+            room.remove_participant(user_id)
+        
+        if not room.participants:
+            room.end(datetime.now().isoformat())
+            return None, (expired, room, None)
+        next_check = min(participant.last_seen for participant in room.participants.values()) + idle_timeout
+        return room, (expired, room, next_check)
+    
+    result = get_state_store().update(CALLS, room_id, expire)
+    if result is None:
+        return {"expired": [], "ended": False, "next_check": None}
+    
+    expired, room, next_check = result
+    ended = next_check is None
+    if ended:
+        await close_router(room.router_id)
+    if expired or ended:
+        get_call_history().record(room)
+    
+    return {"expired": expired, "ended": ended, "next_check": next_check}
 
 
-def get_call_info(room_id: str) -> Optional[Dict]:
+def get_call_info(room_id: str) -> Optional[RoomRecord]:
     """
     Get information about a call room.
     
@@ -154,9 +259,9 @@ def get_call_info(room_id: str) -> Optional[Dict]:
         room_id: The call room ID
     
     Returns:
-        Call room information or None
+        Call room record or None
     """
-    return _active_calls.get(room_id)
+    return get_state_store().get(CALLS, room_id)
 
 
 async def add_producer_to_call(
@@ -179,17 +284,25 @@ async def add_producer_to_call(
     Returns:
         Producer configuration
     """
-    call_info = get_call_info(room_id)
-    if not call_info:
+    room = get_call_info(room_id)
+    if not room:
         raise ValueError(f"Call room {room_id} not found")
     
-    router_id = call_info["router_id"]
+    router_id = room.router_id
     
-    from services.mediasoup_client import create_producer
+    from app.services.mediasoup_client import create_producer
     producer = await create_producer(router_id, transport_id, rtp_parameters)
     
-    producer_key = f"{user_id}_{kind}"
-    call_info["producers"][producer_key] = producer
+    producer.setdefault("kind", kind)
+    
+    def store_producer(room):
+        if room is None:
+            raise ValueError(f"Call room {room_id} not found")
+        room.add_producer(user_id, producer["producer_id"], producer["kind"])
+        room.touch(user_id, time.time())
+        return room, None
+    
+    get_state_store().update(CALLS, room_id, store_producer)
     
     return producer
 
@@ -214,17 +327,171 @@ async def add_consumer_to_call(
     Returns:
         Consumer configuration
     """
-    call_info = get_call_info(room_id)
-    if not call_info:
+    room = get_call_info(room_id)
+    if not room:
         raise ValueError(f"Call room {room_id} not found")
     
-    router_id = call_info["router_id"]
+    if producer_id not in room.producers:
+        raise ValueError(f"Producer {producer_id} not found in room")
+    
+    router_id = room.router_id
     
-    from services.mediasoup_client import create_consumer
+    from app.services.mediasoup_client import create_consumer
     consumer = await create_consumer(router_id, transport_id, producer_id, rtp_capabilities)
     
-    consumer_key = f"{user_id}_{producer_id}"
-    call_info["consumers"][consumer_key] = consumer
+    consumer.setdefault("producer_id", producer_id)
+    
+    def store_consumer(room):
+        if room is None:
+            raise ValueError(f"Call room {room_id} not found")
+        room.add_consumer(user_id, consumer["consumer_id"], producer_id, consumer.get("kind"))
+        room.touch(user_id, time.time())
+        return room, None
+    
+    get_state_store().update(CALLS, room_id, store_consumer)
     
     return consumer
 
+
+async def add_producers_to_call(
+    room_id: str,
+    user_id: str,
+    transport_id: str,
+    producers: List[Dict]
+) -> List[Dict]:
+    """
+    Add several producers (e.g. audio and video) to a call in one SFU round trip.
+    
+    Args:
+        room_id: The call room ID
+        user_id: The user ID
+        transport_id: The transport ID
+        producers: ``{"kind", "rtp_parameters"}`` per producer
+    
+    Returns:
+        Producer configurations, in request order
+    """
+    room = get_call_info(room_id)
+    if not room:
+        raise ValueError(f"Call room {room_id} not found")
+    if not producers:
+        raise ValueError("At least one producer is required")
+    
+    router_id = room.router_id
+    
+    from app.services.mediasoup_client import create_producers
+    created = await create_producers(router_id, transport_id, producers)
+    
+    for producer, requested in zip(created, producers):
+        producer.setdefault("kind", requested["kind"])
+    
+    def store_producers(room):
+        if room is None:
+            raise ValueError(f"Call room {room_id} not found")
+        for producer in created:
+            room.add_producer(user_id, producer["producer_id"], producer["kind"])
+        room.touch(user_id, time.time())
+        return room, None
+    
+    get_state_store().update(CALLS, room_id, store_producers)
+    
+    return created
+
+
+async def consume_remote_producers(
+    room_id: str,
+    user_id: str,
+    transport_id: str,
+    rtp_capabilities: Dict
+) -> Dict[str, List[Dict]]:
+    """
+    Consume every remote producer the user is not consuming yet, in one SFU round trip.
+    
+    Args:
+        room_id: The call room ID
+        user_id: The user ID
+        transport_id: The user's transport ID
+        rtp_capabilities: RTP capabilities
+    
+    Returns:
+        ``consumers`` (configurations with RTP parameters) and ``skipped``
+        (producers that could not be consumed, with a reason)
+    """
+    room = get_call_info(room_id)
+    if not room:
+        raise ValueError(f"Call room {room_id} not found")
+    
+    consumed = room.consumed_producer_ids(user_id)
+    producer_ids = [
+        producer.producer_id
+        for producer in room.remote_producers(user_id)
+        if producer.producer_id not in consumed
+    ]
+    if not producer_ids:
+        return {"consumers": [], "skipped": []}
+    
+    from app.services.mediasoup_client import create_consumers
+    result = await create_consumers(room.router_id, transport_id, producer_ids, rtp_capabilities)
+    skipped = list(result.get("skipped", []))
+    
+    def store_consumers(room):
+        if room is None:
+            raise ValueError(f"Call room {room_id} not found")
+        stored = []
+        for consumer in result["consumers"]:
+            # The SFU closes consumers of producers closed in the meantime
+            if consumer["producer_id"] not in room.producers:
+                skipped.append({"producer_id": consumer["producer_id"], "reason": "Producer was closed"})
+                continue
+            room.add_consumer(user_id, consumer["consumer_id"], consumer["producer_id"], consumer.get("kind"))
+            stored.append(consumer)
+        room.touch(user_id, time.time())
+        return room, stored
+    
+    stored = get_state_store().update(CALLS, room_id, store_consumers)
+    
+    return {"consumers": stored, "skipped": skipped}
+
+
+def get_remote_producers(room_id: str, user_id: str) -> list:
+    """
+    List producers in a call that belong to other participants.
+    
+    Args:
+        room_id: The call room ID
+        user_id: The user ID whose own producers are excluded
+    
+    Returns:
+        Producer entries (``producer_id``, ``user_id``, ``kind``) available for consumption
+    """
+    room = get_call_info(room_id)
+    if not room:
+        raise ValueError(f"Call room {room_id} not found")
+    
+    return [producer.to_dict() for producer in room.remote_producers(user_id)]
+
+
+def get_call_stats() -> Dict[str, int]:
+    """
+    Count active rooms and their participants and media.
+    
+    Returns:
+        Counts of rooms, participants, producers and consumers
+    """
+    stats = {"rooms": 0, "participants": 0, "producers": 0, "consumers": 0}
+    for room in get_state_store().values(CALLS):
+        stats["rooms"] += 1
+        stats["participants"] += len(room.participants)
+        stats["producers"] += len(room.producers)
+        stats["consumers"] += len(room.consumers)
+    return stats
+
+
+# One pass over the rooms per scrape for all four gauges
+metrics.gauge_group(
+    {
+        f"ripplenote_active_{stat}": f"Active call {stat} (shared state, so equal across workers)."
+        for stat in ("rooms", "participants", "producers", "consumers")
+    },
+    lambda: {f"ripplenote_active_{stat}": count for stat, count in get_call_stats().items()}
+)
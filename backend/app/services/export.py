@@ -0,0 +1,52 @@
+"""Streaming NDJSON export of call and recording history."""
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from app.services.call_history import get_call_history
+from app.services.recording_catalog import get_recording_catalog
+
+
+EXPORT_TYPES = ("calls", "recordings")
+
+
+def _lines(record_type: str, records: Iterable[dict]) -> Iterator[bytes]:
+    for record in records:
+        yield json.dumps({"type": record_type, **record}, separators=(",", ":")).encode() + b"\n"
+
+
+def export_ndjson(
+    since: Optional[str] = None,
+    types: Iterable[str] = EXPORT_TYPES
+) -> Iterator[bytes]:
+    """
+    Build a newline-delimited JSON stream of history records.
+
+    Records are read from the stores in batches as the stream is consumed,
+    so memory stays flat regardless of history size. Each line carries its
+    ``type`` (``call`` or ``recording``) and ``updated_at``; passing the
+    largest ``updated_at`` seen as the next ``since`` gives an incremental
+    sync (the boundary record may be repeated).
+
+    Args:
+        since: ISO timestamp; only records changed at or after it
+        types: Subset of ``EXPORT_TYPES`` to include
+
+    Returns:
+        Iterator of NDJSON lines
+    """
+    if since is not None:
+        datetime.fromisoformat(since)  # raises ValueError if malformed
+
+    types = [t.strip() for t in types if t.strip()]
+    unknown = set(types) - set(EXPORT_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown export types: {', '.join(sorted(unknown))}")
+
+    def generate() -> Iterator[bytes]:
+        if "calls" in types:
+            yield from _lines("call", get_call_history().iter_updated_since(since))
+        if "recordings" in types:
+            yield from _lines("recording", get_recording_catalog().iter_updated_since(since))
+
+    return generate()
@@ -0,0 +1,363 @@
+"""Durable background job queue backed by SQLite.
+
+Jobs survive restarts: they are rows in ``settings.job_queue_db_path`` and
+are picked up by a bounded pool of asyncio workers in every API worker.
+A running job holds a lease that its worker renews; if the process dies,
+the lease expires and another worker (or the restarted process) takes the
+job over. Failed attempts are retried with exponential backoff and jitter
+up to ``max_attempts``, so a burst of S3 errors slows the queue down
+instead of multiplying client-side retries.
+
+Each job has a ``job_key`` (e.g. ``upload:{recording_id}``); enqueuing a
+key that is already queued or running returns the existing job.
+"""
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Handlers receive the job (with its decoded ``payload`` and ``attempts``)
+# and may return a JSON-serializable result
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+PENDING_STATUSES = ("queued", "running")
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix."""
+
+
+_COLUMNS = (
+    "job_id", "job_key", "kind", "payload", "status", "attempts", "max_attempts",
+    "run_at", "lease_until", "owner", "last_error", "result", "created_at", "updated_at"
+)
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(zip(_COLUMNS, row))
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobQueue:
+    """SQLite-backed job queue with a pool of asyncio workers."""
+
+    def __init__(
+        self,
+        path: str,
+        handlers: Dict[str, JobHandler],
+        workers: int,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        lease_seconds: float,
+        poll_interval: float = 1.0
+    ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path,
+            timeout=settings.sqlite_busy_timeout,  # waits on the event loop
+            isolation_level=None,  # explicit transactions only
+            check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self.handlers = handlers
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = uuid.uuid4().hex
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " job_key TEXT NOT NULL UNIQUE,"
+                " kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " max_attempts INTEGER NOT NULL,"
+                " run_at REAL NOT NULL,"
+                " lease_until REAL,"
+                " owner TEXT,"
+                " last_error TEXT,"
+                " result TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_at)"
+            )
+
+    def _select(self, where: str, params: tuple) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE {where}", params
+        ).fetchone()
+        return _row_to_job(row) if row else None
+
+    def enqueue(
+        self,
+        kind: str,
+        job_key: str,
+        payload: Dict[str, Any],
+        max_attempts: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Add a job, or return the pending job with the same key.
+
+        A key whose previous job already succeeded or failed is re-queued
+        as a new job.
+
+        Args:
+            kind: Handler name
+            job_key: Idempotency key
+            payload: JSON-serializable job arguments
+            max_attempts: Attempts before giving up (defaults to settings)
+
+        Returns:
+            The queued (or already pending) job
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._select("job_key = ?", (job_key,))
+                if job is None or job["status"] not in PENDING_STATUSES:
+                    if job is not None:
+                        self._conn.execute("DELETE FROM jobs WHERE job_key = ?", (job_key,))
+                    job_id = str(uuid.uuid4())
+                    self._conn.execute(
+                        "INSERT INTO jobs (job_id, job_key, kind, payload, status, attempts,"
+                        " max_attempts, run_at, created_at, updated_at)"
+                        " VALUES (?, ?, ?, ?, 'queued', 0, ?, ?, ?, ?)",
+                        (job_id, job_key, kind, json.dumps(payload),
+                         max_attempts or self.max_attempts, now, now, now)
+                    )
+                    job = self._select("job_id = ?", (job_id,))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job by ID.
+
+        Args:
+            job_id: The job ID
+
+        Returns:
+            The job or None
+        """
+        with self._lock:
+            return self._select("job_id = ?", (job_id,))
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        # Ready queued jobs, plus running jobs whose worker stopped renewing
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._select(
+                    "(status = 'queued' AND run_at <= ?) OR (status = 'running' AND lease_until <= ?)"
+                    " ORDER BY run_at LIMIT 1",
+                    (now, now)
+                )
+                if job is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?,"
+                        " attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                        (self.owner, now + self.lease_seconds, now, job["job_id"])
+                    )
+                    job.update(status="running", owner=self.owner, attempts=job["attempts"] + 1)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return job
+
+    def _set(self, job_id: str, **fields: Any) -> None:
+        # Only the current lease holder may change a running job
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ? AND owner = ?",
+                (*fields.values(), job_id, self.owner)
+            )
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _renew_lease(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                self._set(job_id, lease_until=time.time() + self.lease_seconds)
+            except sqlite3.Error as e:
+                # Retried on the next renewal, well before the lease runs out
+                logger.warning("Renewing lease of job %s failed: %s", job_id, e)
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self._set(job["job_id"], status="failed", last_error=f"No handler for {job['kind']}")
+            return
+
+        renew = asyncio.create_task(self._renew_lease(job["job_id"]))
+        try:
+            result = await handler(job)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without counting the attempt
+            self._set(
+                job["job_id"],
+                status="queued",
+                attempts=job["attempts"] - 1,
+                run_at=time.time(),
+                owner=None
+            )
+            raise
+        except Exception as e:
+            if isinstance(e, PermanentJobError) or job["attempts"] >= job["max_attempts"]:
+                logger.warning("Job %s (%s) failed: %s", job["job_id"], job["job_key"], e)
+                self._set(job["job_id"], status="failed", last_error=str(e))
+            else:
+                self._set(
+                    job["job_id"],
+                    status="queued",
+                    run_at=time.time() + self._backoff(job["attempts"]),
+                    last_error=str(e)
+                )
+        else:
+            self._set(
+                job["job_id"],
+                status="succeeded",
+                result=json.dumps(result) if result is not None else None,
+                last_error=None
+            )
+        finally:
+            renew.cancel()
+
+    async def _worker(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.warning("Job queue claim failed: %s", e)
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(job)
+            except sqlite3.Error as e:
+                # The job keeps its lease and is taken over once it expires
+                logger.warning("Recording the outcome of job %s failed: %s", job["job_id"], e)
+
+    def start(self) -> None:
+        """Start the worker pool; jobs left over from a previous run resume."""
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers, returning in-flight jobs to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Report job counts by status.
+
+        Returns:
+            Worker count and number of jobs per status
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {"workers": self.workers, "jobs": dict(rows)}
+
+
+# Job handlers by kind, registered by the services that own them
+_handlers: Dict[str, JobHandler] = {}
+
+_queue: Optional[JobQueue] = None
+
+
+def register_job_handler(kind: str, handler: JobHandler) -> None:
+    """
+    Register the coroutine that runs jobs of a kind.
+
+    Args:
+        kind: Job kind
+        handler: Coroutine called with the claimed job
+    """
+    _handlers[kind] = handler
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Get the job queue, creating it on first use.
+
+    Returns:
+        JobQueue configured from settings
+    """
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(
+            settings.job_queue_db_path,
+            _handlers,
+            workers=settings.job_queue_workers,
+            max_attempts=settings.job_max_attempts,
+            backoff_base=settings.job_backoff_base,
+            backoff_max=settings.job_backoff_max,
+            lease_seconds=settings.job_lease_seconds
+        )
+    return _queue
+
+
+def start_job_queue() -> None:
+    """Start this worker's job runners (called on application startup)."""
+    get_job_queue().start()
+
+
+async def stop_job_queue() -> None:
+    """Stop the job runners (called on application shutdown)."""
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue = None
@@ -1,49 +1,226 @@
 """Mediasoup SFU client integration."""
+import time
+
 import aiohttp
-import json
-from typing import Dict, Any, Optional
+import orjson
+from typing import Dict, Any, List, Optional
 from config import settings
+from app.services import rtp_capabilities_cache
+from app.services.metrics import SFU_REQUEST_SECONDS
+
+
+def _json_serialize(payload: Any) -> str:
+    return orjson.dumps(payload).decode()
+
+
+class MediasoupClient:
+    """
+    Long-lived HTTP client for the mediasoup SFU.
+
+    Holds a single ``aiohttp.ClientSession`` backed by a keep-alive
+    ``TCPConnector`` so signaling calls reuse pooled connections instead of
+    paying a TCP handshake per request.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_limit: Optional[int] = None,
+        pool_limit_per_host: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        request_timeout: Optional[float] = None
+    ):
+        self.base_url = base_url or (
+            f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}"
+        )
+        self.pool_limit = pool_limit if pool_limit is not None else settings.mediasoup_pool_limit
+        self.pool_limit_per_host = (
+            pool_limit_per_host if pool_limit_per_host is not None
+            else settings.mediasoup_pool_limit_per_host
+        )
+        self.keepalive_timeout = (
+            keepalive_timeout if keepalive_timeout is not None
+            else settings.mediasoup_keepalive_timeout
+        )
+        self.timeout = aiohttp.ClientTimeout(
+            total=request_timeout if request_timeout is not None else settings.mediasoup_request_timeout,
+            connect=connect_timeout if connect_timeout is not None else settings.mediasoup_connect_timeout
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._in_flight = 0
+        self._requests_total = 0
+
+    @property
+    def closed(self) -> bool:
+        """Whether the underlying session is closed (or was never opened)."""
+        return self._session is None or self._session.closed
+
+    async def start(self) -> None:
+        """Open the pooled session if it is not already open."""
+        if not self.closed:
+            return
+
+        self._connector = aiohttp.TCPConnector(
+            limit=self.pool_limit,
+            limit_per_host=self.pool_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self._session = aiohttp.ClientSession(
+            base_url=self.base_url,
+            connector=self._connector,
+            timeout=self.timeout,
+            json_serialize=_json_serialize
+        )
+
+    async def close(self) -> None:
+        """Close the session and release all pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._connector = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        operation: Optional[str] = None
+    ) -> aiohttp.ClientResponse:
+        """
+        Send a request to the SFU and return the fully read response.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the SFU base URL (e.g. ``/api/router/create``)
+            payload: Optional JSON body
+            operation: Metrics label for the call (defaults to ``path``; pass
+                one for paths that embed IDs)
+
+        Returns:
+            The response, with its body already read so the connection is
+            returned to the pool
+        """
+        if self.closed:
+            await self.start()
+
+        self._in_flight += 1
+        self._requests_total += 1
+        status = "error"
+        start = time.perf_counter()
+        try:
+            async with self._session.request(method, path, json=payload) as response:
+                await response.read()
+                status = str(response.status)
+                return response
+        finally:
+            self._in_flight -= 1
+            SFU_REQUEST_SECONDS.observe(time.perf_counter() - start, operation or path, status)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        Report connection pool utilization.
+
+        Returns:
+            Pool limits, in-use/idle connection counts and request counters
+        """
+        connector = self._connector
+        in_use = 0
+        idle = 0
+        if connector is not None and not connector.closed:
+            # aiohttp does not expose these counters publicly
+            in_use = len(getattr(connector, "_acquired", ()))
+            idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+
+        return {
+            "base_url": self.base_url,
+            "open": not self.closed,
+            "limit": self.pool_limit,
+            "limit_per_host": self.pool_limit_per_host,
+            "in_use": in_use,
+            "idle": idle,
+            "utilization": (in_use / self.pool_limit) if self.pool_limit else 0.0,
+            "in_flight_requests": self._in_flight,
+            "requests_total": self._requests_total
+        }
+
+
+def _cluster():
+    # Imported here: the cluster builds its nodes' clients from this module
+    from app.services.sfu_cluster import get_sfu_cluster
+    return get_sfu_cluster()
 
 
 async def create_mediasoup_router() -> Dict[str, Any]:
     """
     Create a new mediasoup router for a call room.
-    
+
     Returns:
         Router configuration with RTP capabilities
     """
-    url = f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}/api/router/create"
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url) as response:
-            if response.status == 200:
-                return await response.json()
-            raise Exception(f"Failed to create router: {response.status}")
+    cluster = _cluster()
+    node = cluster.place()
+    response = await node.client.request("POST", "/api/router/create")
+    if response.status == 200:
+        router_config = await response.json(loads=orjson.loads)
+        cluster.pin(router_config["router_id"], node)
+        rtp_capabilities_cache.remember(
+            router_config["router_id"],
+            router_config["rtp_capabilities"],
+            router_config.get("codec_fingerprint")
+        )
+        return router_config
+    raise Exception(f"Failed to create router: {response.status}")
+
+
+async def provision_room(transports: int = 1) -> Dict[str, Any]:
+    """
+    Create a router and its WebRTC transports in a single SFU round trip.
+
+    Args:
+        transports: Number of transports to create on the new router (0-2)
+
+    Returns:
+        Router ID, RTP capabilities and a list of transport configurations
+    """
+    cluster = _cluster()
+    node = cluster.place(transports)
+    response = await node.client.request(
+        "POST", "/api/room/provision", {"transports": transports}
+    )
+    if response.status == 200:
+        provisioned = await response.json(loads=orjson.loads)
+        cluster.pin(provisioned["router_id"], node)
+        rtp_capabilities_cache.remember(
+            provisioned["router_id"],
+            provisioned["rtp_capabilities"],
+            provisioned.get("codec_fingerprint")
+        )
+        return provisioned
+    raise Exception(f"Failed to provision room: {response.status}")
 
 
 async def create_mediasoup_transport(router_id: str, direction: str = "sendrecv") -> Dict[str, Any]:
     """
     Create a WebRTC transport in mediasoup.
-    
+
     Args:
         router_id: The router ID
         direction: Transport direction (sendrecv, sendonly, recvonly)
-    
+
     Returns:
         Transport configuration with ICE parameters
     """
-    url = f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}/api/transport/create"
-    
     payload = {
         "router_id": router_id,
         "direction": direction
     }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload) as response:
-            if response.status == 200:
-                return await response.json()
-            raise Exception(f"Failed to create transport: {response.status}")
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/transport/create", payload)
+    if response.status == 200:
+        return await response.json(loads=orjson.loads)
+    raise Exception(f"Failed to create transport: {response.status}")
 
 
 async def connect_transport(
@@ -53,26 +230,23 @@ async def connect_transport(
 ) -> bool:
     """
     Connect a transport with DTLS parameters.
-    
+
     Args:
         router_id: The router ID
         transport_id: The transport ID
         dtls_parameters: DTLS parameters from client
-    
+
     Returns:
         True if successful
     """
-    url = f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}/api/transport/connect"
-    
     payload = {
         "router_id": router_id,
         "transport_id": transport_id,
         "dtls_parameters": dtls_parameters
     }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload) as response:
-            return response.status == 200
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/transport/connect", payload)
+    return response.status == 200
 
 
 async def create_producer(
@@ -82,28 +256,25 @@ async def create_producer(
 ) -> Dict[str, Any]:
     """
     Create a producer (audio/video sender) in mediasoup.
-    
+
     Args:
         router_id: The router ID
         transport_id: The transport ID
         rtp_parameters: RTP parameters from client
-    
+
     Returns:
         Producer configuration
     """
-    url = f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}/api/producer/create"
-    
     payload = {
         "router_id": router_id,
         "transport_id": transport_id,
         "rtp_parameters": rtp_parameters
     }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload) as response:
-            if response.status == 200:
-                return await response.json()
-            raise Exception(f"Failed to create producer: {response.status}")
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/producer/create", payload)
+    if response.status == 200:
+        return await response.json(loads=orjson.loads)
+    raise Exception(f"Failed to create producer: {response.status}")
 
 
 async def create_consumer(
@@ -114,65 +285,230 @@ async def create_consumer(
 ) -> Dict[str, Any]:
     """
     Create a consumer (audio/video receiver) in mediasoup.
-    
+
     Args:
         router_id: The router ID
         transport_id: The transport ID
         producer_id: The producer ID to consume
         rtp_capabilities: RTP capabilities from client
-    
+
     Returns:
         Consumer configuration with RTP parameters
     """
-    url = f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}/api/consumer/create"
-    
     payload = {
         "router_id": router_id,
         "transport_id": transport_id,
         "producer_id": producer_id,
         "rtp_capabilities": rtp_capabilities
     }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload) as response:
-            if response.status == 200:
-                return await response.json()
-            raise Exception(f"Failed to create consumer: {response.status}")
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/consumer/create", payload)
+    if response.status == 200:
+        return await response.json(loads=orjson.loads)
+    raise Exception(f"Failed to create consumer: {response.status}")
+
+
+async def create_producers(
+    router_id: str,
+    transport_id: str,
+    producers: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Create several producers on one transport in a single SFU request.
+
+    The SFU creates all of them or none.
+
+    Args:
+        router_id: The router ID
+        transport_id: The transport ID
+        producers: ``{"kind", "rtp_parameters"}`` per producer
+
+    Returns:
+        Producer configurations, in request order
+    """
+    payload = {
+        "router_id": router_id,
+        "transport_id": transport_id,
+        "producers": producers
+    }
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/producers/create", payload)
+    if response.status == 200:
+        return (await response.json(loads=orjson.loads))["producers"]
+    raise Exception(f"Failed to create producers: {response.status}")
 
 
-async def get_router_rtp_capabilities(router_id: str) -> Dict[str, Any]:
+async def create_consumers(
+    router_id: str,
+    transport_id: str,
+    producer_ids: List[str],
+    rtp_capabilities: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Consume several producers on one transport in a single SFU request.
+
+    Args:
+        router_id: The router ID
+        transport_id: The transport ID
+        producer_ids: Producer IDs to consume
+        rtp_capabilities: RTP capabilities from client
+
+    Returns:
+        ``consumers`` (configurations with RTP parameters) and ``skipped``
+        (producers the client cannot consume, with a reason)
+    """
+    payload = {
+        "router_id": router_id,
+        "transport_id": transport_id,
+        "producer_ids": producer_ids,
+        "rtp_capabilities": rtp_capabilities
+    }
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/consumers/create", payload)
+    if response.status == 200:
+        return await response.json(loads=orjson.loads)
+    raise Exception(f"Failed to create consumers: {response.status}")
+
+
+async def create_recording_consumers(
+    router_id: str,
+    producer_ids: List[str],
+    ip: str,
+    ports: List[Dict[str, int]]
+) -> List[Dict[str, Any]]:
+    """
+    Create paused PlainTransport consumers that send RTP to a local recorder.
+
+    Args:
+        router_id: The router ID
+        producer_ids: Producers to record
+        ip: Address the recorder listens on
+        ports: One ``{"rtp_port", "rtcp_port"}`` pair per producer
+
+    Returns:
+        Per-producer transport/consumer IDs, kind, RTP parameters and ports
+    """
+    payload = {
+        "router_id": router_id,
+        "producer_ids": producer_ids,
+        "ip": ip,
+        "ports": ports
+    }
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/recording/consumers/create", payload)
+    if response.status == 200:
+        return (await response.json(loads=orjson.loads))["consumers"]
+    raise Exception(f"Failed to create recording consumers: {response.status}")
+
+
+async def resume_recording_consumers(router_id: str, consumer_ids: List[str]) -> bool:
+    """
+    Resume recording consumers once the recorder is listening.
+
+    Args:
+        router_id: The router ID
+        consumer_ids: Consumers to resume
+
+    Returns:
+        True if successful
+    """
+    payload = {
+        "router_id": router_id,
+        "consumer_ids": consumer_ids
+    }
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/recording/consumers/resume", payload)
+    return response.status == 200
+
+
+async def close_recording_transports(router_id: str, transport_ids: List[str]) -> bool:
+    """
+    Close recording PlainTransports (and their consumers).
+
+    Args:
+        router_id: The router ID
+        transport_ids: Transports to close
+
+    Returns:
+        True if successful
+    """
+    payload = {
+        "router_id": router_id,
+        "transport_ids": transport_ids
+    }
+
+    response = await _cluster().client_for(router_id).request("POST", "/api/recording/transports/close", payload)
+    return response.status == 200
+
+
+async def get_router_rtp_capabilities_entry(
+    router_id: str,
+    codec_fingerprint: Optional[str] = None
+) -> rtp_capabilities_cache.CachedCapabilities:
+    """
+    Get cached RTP capabilities for a router, fetching them on a miss.
+
+    Args:
+        router_id: The router ID
+        codec_fingerprint: Optional codec fingerprint known for the router
+
+    Returns:
+        Cache entry holding the capabilities and their serialized JSON
+    """
+    entry = rtp_capabilities_cache.lookup(router_id, codec_fingerprint)
+    if entry is not None:
+        return entry
+
+    response = await _cluster().client_for(router_id).request(
+        "GET",
+        f"/api/router/{router_id}/rtp-capabilities",
+        operation="/api/router/{router_id}/rtp-capabilities"
+    )
+    if response.status == 200:
+        return rtp_capabilities_cache.remember(
+            router_id,
+            await response.json(loads=orjson.loads),
+            response.headers.get("X-Codec-Fingerprint")
+        )
+    raise Exception(f"Failed to get RTP capabilities: {response.status}")
+
+
+async def get_router_rtp_capabilities(
+    router_id: str,
+    codec_fingerprint: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Get RTP capabilities for a router.
-    
+
     Args:
         router_id: The router ID
-    
+        codec_fingerprint: Optional codec fingerprint known for the router
+
     Returns:
         RTP capabilities
     """
-    url = f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}/api/router/{router_id}/rtp-capabilities"
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                return await response.json()
-            raise Exception(f"Failed to get RTP capabilities: {response.status}")
+    entry = await get_router_rtp_capabilities_entry(router_id, codec_fingerprint)
+    return entry.rtp_capabilities
 
 
 async def close_router(router_id: str) -> bool:
     """
     Close a router and cleanup resources.
-    
+
     Args:
         router_id: The router ID
-    
+
     Returns:
         True if successful
     """
-    url = f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}/api/router/{router_id}/close"
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url) as response:
-            return response.status == 200
-
-
+    rtp_capabilities_cache.invalidate(router_id)
+    cluster = _cluster()
+    try:
+        response = await cluster.client_for(router_id).request(
+            "POST",
+            f"/api/router/{router_id}/close",
+            operation="/api/router/{router_id}/close"
+        )
+    finally:
+        cluster.unpin(router_id)
+    return response.status == 200
@@ -0,0 +1,251 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters and histograms are updated from the event loop thread only, so
+they need no locks; histogram buckets are allocated once per label set and
+an observation is a ``bisect`` plus two additions. Gauges are callbacks
+evaluated at scrape time, so nothing is maintained on the hot path; gauges
+read from the same source can share one callback (``gauge_group``).
+
+Values are per API worker process.
+"""
+import bisect
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally labelled."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        values = self._values or ({(): 0} if not self.labelnames else {})
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram:
+    """Histogram with fixed buckets, one preallocated child per label set."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], _HistogramChild] = {}
+
+    def labels(self, *labels: str) -> _HistogramChild:
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = _HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [repr(b) for b in self.buckets] + ["+Inf"]
+        for labels, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                label_str = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {repr(child.sum)}")
+            lines.append(f"{self.name}_count{label_str} {child.count}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is computed by a callback at scrape time."""
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format_value(self.fn())}"
+        ]
+
+
+class GaugeGroup:
+    """Gauges computed together by one callback per scrape."""
+
+    def __init__(self, gauges: Dict[str, str], fn: Callable[[], Dict[str, float]]):
+        self.gauges = gauges  # name -> help text
+        self.name = ",".join(gauges)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        values = self.fn()
+        lines: List[str] = []
+        for name, help_text in self.gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(values[name])}")
+        return lines
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+
+def histogram(
+    name: str,
+    help_text: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+
+def gauge(name: str, help_text: str, fn: Callable[[], float]) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, fn))
+
+
+def gauge_group(gauges: Dict[str, str], fn: Callable[[], Dict[str, float]]) -> GaugeGroup:
+    return REGISTRY.register(GaugeGroup(gauges, fn))
+
+
+def render_metrics() -> str:
+    """
+    Render all registered metrics.
+
+    Returns:
+        Prometheus text exposition format (version 0.0.4)
+    """
+    return REGISTRY.render()
+
+
+SFU_REQUEST_SECONDS = histogram(
+    "ripplenote_sfu_request_duration_seconds",
+    "Latency of mediasoup SFU API calls.",
+    ("operation", "status")
+)
+HTTP_REQUEST_SECONDS = histogram(
+    "ripplenote_http_request_duration_seconds",
+    "Latency of API requests by route template.",
+    ("method", "route", "status")
+)
+S3_UPLOADED_BYTES = counter(
+    "ripplenote_s3_uploaded_bytes_total",
+    "Bytes of recordings uploaded to S3."
+)
+S3_UPLOAD_FAILURES = counter(
+    "ripplenote_s3_upload_failures_total",
+    "Failed S3 upload attempts."
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each request into ``HTTP_REQUEST_SECONDS``.
+
+    Requests are labelled by the matched route template (e.g.
+    ``/api/call/{room_id}``), never the raw path, so label cardinality
+    stays bounded; unmatched paths share one ``unmatched`` series.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status
+            )
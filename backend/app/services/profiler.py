@@ -0,0 +1,313 @@
+"""Opt-in sampling profiler and slow-request capture.
+
+While enabled, a daemon thread samples the event loop thread's stack every
+``interval`` seconds into a short time-indexed window. When a request
+finishes slower than ``slow_threshold_ms`` (or is picked by
+``sample_rate``), the samples taken during it are folded into a profile
+and kept in a bounded ring buffer. All requests share the loop thread, so
+a profile shows everything the loop did while that request was in flight.
+
+An event loop lag monitor runs alongside (it is cheap, so always on) and
+feeds ``ripplenote_event_loop_lag_seconds``; each profile records the
+worst lag seen during the request.
+
+When disabled, the middleware costs one attribute check per request and
+no thread runs.
+"""
+import asyncio
+import collections
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from app.services import metrics
+
+
+LOOP_LAG_SECONDS = metrics.histogram(
+    "ripplenote_event_loop_lag_seconds",
+    "Delay between a scheduled event loop wakeup and when it ran.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+MAX_STACK_DEPTH = 64
+
+
+def _fold(frame) -> str:
+    """Render a frame chain as ``outer;...;inner`` (flamegraph folded format)."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Stack sampler for the event loop thread plus a slow-request ring."""
+
+    def __init__(
+        self,
+        interval: float,
+        sample_rate: float,
+        slow_threshold_ms: float,
+        ring_size: int,
+        window_seconds: float = 60.0,
+        lag_interval: float = 0.5
+    ):
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.lag_interval = lag_interval
+        self.enabled = False
+        self.profiles: Deque[Dict[str, Any]] = collections.deque(maxlen=ring_size)
+        self._samples: Deque[Tuple[float, str]] = collections.deque(
+            maxlen=max(1, int(window_seconds / interval))
+        )
+        self._lags: Deque[Tuple[float, float]] = collections.deque(
+            maxlen=max(1, int(window_seconds / lag_interval))
+        )
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lag_task: Optional[asyncio.Task] = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    # Sampling
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._samples.append((time.perf_counter(), _fold(frame)))
+
+    def enable(self) -> None:
+        """Start sampling the calling (event loop) thread."""
+        if self.enabled:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop sampling; captured profiles are kept."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._samples.clear()
+
+    # Event loop lag
+
+    async def _monitor_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._lags.append((time.perf_counter(), lag))
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def start_lag_monitor(self) -> None:
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.create_task(self._monitor_lag())
+
+    async def stop_lag_monitor(self) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+            self._lag_task = None
+
+    # Capture
+
+    def should_capture(self, duration_ms: float) -> Optional[str]:
+        if duration_ms >= self.slow_threshold_ms:
+            return "slow"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def capture(
+        self,
+        reason: str,
+        start: float,
+        end: float,
+        request_info: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Fold the samples taken between ``start`` and ``end`` into a profile.
+
+        Args:
+            reason: ``slow`` or ``sampled``
+            start: ``time.perf_counter()`` at request start
+            end: ``time.perf_counter()`` at request end
+            request_info: Method, path, route and status of the request
+
+        Returns:
+            The stored profile
+        """
+        stacks = collections.Counter(
+            stack for taken_at, stack in list(self._samples) if start <= taken_at <= end
+        )
+        # Lag is measured when the monitor wakes, which can be just after the request
+        lags = [lag for taken_at, lag in list(self._lags) if start <= taken_at <= end + self.lag_interval]
+        profile = {
+            "profile_id": uuid.uuid4().hex,
+            "reason": reason,
+            **request_info,
+            "duration_ms": round((end - start) * 1000, 3),
+            "captured_at": datetime.now().isoformat(),
+            "interval_ms": self.interval * 1000,
+            "sample_count": sum(stacks.values()),
+            "max_loop_lag_ms": round(max(lags, default=0.0) * 1000, 3),
+            "stacks": [
+                {"stack": stack, "count": count}
+                for stack, count in stacks.most_common()
+            ]
+        }
+        self.profiles.append(profile)
+        return profile
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        for profile in self.profiles:
+            if profile["profile_id"] == profile_id:
+                return profile
+        return None
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Profile summaries, newest first (without stacks)."""
+        return [
+            {key: value for key, value in profile.items() if key != "stacks"}
+            for profile in reversed(self.profiles)
+        ]
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        slow_threshold_ms: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Change profiling settings at runtime.
+
+        Args:
+            enabled: Turn sampling on or off
+            sample_rate: Fraction of requests (0-1) to profile regardless of latency
+            slow_threshold_ms: Profile every request at least this slow
+
+        Returns:
+            The new state
+        """
+        if sample_rate is not None:
+            if not 0 <= sample_rate <= 1:
+                raise ValueError("sample_rate must be between 0 and 1")
+            self.sample_rate = sample_rate
+        if slow_threshold_ms is not None:
+            if slow_threshold_ms < 0:
+                raise ValueError("slow_threshold_ms must not be negative")
+            self.slow_threshold_ms = slow_threshold_ms
+        if enabled is True:
+            self.enable()
+        elif enabled is False:
+            self.disable()
+        return self.get_state()
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "interval_ms": self.interval * 1000,
+            "profiles_kept": len(self.profiles),
+            "ring_size": self.profiles.maxlen,
+            "loop_lag_ms": {
+                "last": round(self.last_lag * 1000, 3),
+                "max": round(self.max_lag * 1000, 3)
+            }
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that hands finished requests to the profiler."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = get_profiler()
+        if scope["type"] != "http" or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = time.perf_counter()
+            reason = profiler.should_capture((end - start) * 1000)
+            if reason is not None:
+                route = scope.get("route")
+                profiler.capture(reason, start, end, {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None),
+                    "status": status
+                })
+
+
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    """
+    Get this worker's profiler.
+
+    Returns:
+        SamplingProfiler configured from settings
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler(
+            interval=settings.profiling_interval_ms / 1000,
+            sample_rate=settings.profiling_sample_rate,
+            slow_threshold_ms=settings.profiling_slow_threshold_ms,
+            ring_size=settings.profiling_ring_size
+        )
+    return _profiler
+
+
+def start_profiler() -> None:
+    """Start the loop lag monitor, and sampling if enabled in settings (called on startup)."""
+    profiler = get_profiler()
+    profiler.start_lag_monitor()
+    if settings.profiling_enabled:
+        profiler.enable()
+
+
+async def stop_profiler() -> None:
+    """Stop sampling and the lag monitor (called on shutdown)."""
+    profiler = get_profiler()
+    profiler.disable()
+    await profiler.stop_lag_monitor()
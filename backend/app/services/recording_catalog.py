@@ -0,0 +1,252 @@
+"""Persistent, indexed catalog of recordings.
+
+Every recording is upserted here at each lifecycle change (started,
+stopped, exited, upload finished), so history survives restarts and the
+list endpoint reads one indexed page instead of scanning live state.
+Pages are ordered newest first by ``(started_at, recording_id)`` and
+continued with an opaque keyset cursor, which keeps each page O(limit)
+however many recordings have accumulated. ``updated_at`` is indexed too,
+for incremental exports.
+"""
+import base64
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(started_at: str, recording_id: str) -> str:
+    raw = json.dumps([started_at, recording_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        started_at, recording_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(started_at), str(recording_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+class RecordingCatalog:
+    """Recording history in SQLite (WAL), indexed for paginated listing."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path,
+            timeout=settings.sqlite_busy_timeout,  # waits on the event loop
+            isolation_level=None,  # autocommit; every write is a single statement
+            check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recordings ("
+                " recording_id TEXT PRIMARY KEY,"
+                " room_id TEXT NOT NULL,"
+                " user_id TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " started_at TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL DEFAULT '',"
+                " info TEXT NOT NULL)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(recordings)")}
+            if "updated_at" not in columns:
+                # Catalogs created before updated_at was tracked
+                self._conn.execute(
+                    "ALTER TABLE recordings ADD COLUMN updated_at TEXT NOT NULL DEFAULT ''"
+                )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS recordings_started"
+                " ON recordings (started_at, recording_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS recordings_room"
+                " ON recordings (room_id, started_at, recording_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS recordings_user"
+                " ON recordings (user_id, started_at, recording_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS recordings_updated"
+                " ON recordings (updated_at, recording_id)"
+            )
+
+    def upsert(self, recording_info: Dict[str, Any]) -> None:
+        """
+        Insert or replace a recording's catalog entry.
+
+        Args:
+            recording_info: Recording metadata as kept in the state store
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recordings"
+                " (recording_id, room_id, user_id, status, started_at, updated_at, info)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    recording_info["recording_id"],
+                    recording_info["room_id"],
+                    recording_info["user_id"],
+                    recording_info["status"],
+                    recording_info["started_at"],
+                    datetime.now().isoformat(),
+                    json.dumps(recording_info)
+                )
+            )
+
+    def get(self, recording_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a recording's catalog entry.
+
+        Args:
+            recording_id: The recording ID
+
+        Returns:
+            Recording metadata or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT info FROM recordings WHERE recording_id = ?",
+                (recording_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_recordings(
+        self,
+        room_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        started_after: Optional[str] = None,
+        started_before: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List one page of recordings, newest first.
+
+        Args:
+            room_id: Only recordings of this room
+            user_id: Only recordings of this user
+            status: Only recordings in this status
+            started_after: Only recordings started at or after this ISO timestamp
+            started_before: Only recordings started before this ISO timestamp
+            limit: Page size (at most ``MAX_PAGE_SIZE``)
+            cursor: ``next_cursor`` from the previous page
+
+        Returns:
+            The page and the cursor for the next page (None on the last page)
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        clauses = []
+        params: List[Any] = []
+        for column, value in (("room_id", room_id), ("user_id", user_id), ("status", status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if started_after is not None:
+            clauses.append("started_at >= ?")
+            params.append(started_after)
+        if started_before is not None:
+            clauses.append("started_at < ?")
+            params.append(started_before)
+        if cursor is not None:
+            cursor_started_at, cursor_id = decode_cursor(cursor)
+            clauses.append("(started_at < ? OR (started_at = ? AND recording_id < ?))")
+            params.extend((cursor_started_at, cursor_started_at, cursor_id))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT info FROM recordings {where}"
+                " ORDER BY started_at DESC, recording_id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+
+        page = [json.loads(row[0]) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = encode_cursor(last["started_at"], last["recording_id"])
+        return page, next_cursor
+
+    def iter_updated_since(
+        self,
+        since: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield recordings changed at or after ``since``, oldest change first.
+
+        Rows are read in keyset batches, so memory use is bounded by
+        ``batch_size`` and the lock is not held between batches.
+
+        Args:
+            since: ISO timestamp (None exports everything)
+            batch_size: Rows per query
+
+        Yields:
+            Recording metadata with its ``updated_at``
+        """
+        where, params = "updated_at >= ?", (since or "",)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT recording_id, updated_at, info FROM recordings"
+                    f" WHERE {where} ORDER BY updated_at, recording_id LIMIT ?",
+                    (*params, batch_size)
+                ).fetchall()
+            for _, updated_at, info in rows:
+                recording_info = json.loads(info)
+                recording_info["updated_at"] = updated_at
+                yield recording_info
+            if len(rows) < batch_size:
+                return
+            last_id, last_updated_at, _ = rows[-1]
+            where = "updated_at > ? OR (updated_at = ? AND recording_id > ?)"
+            params = (last_updated_at, last_updated_at, last_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_catalog: Optional[RecordingCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_recording_catalog() -> RecordingCatalog:
+    """
+    Get the recording catalog, creating it on first use.
+
+    Returns:
+        RecordingCatalog at ``settings.recording_catalog_db_path``
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = RecordingCatalog(settings.recording_catalog_db_path)
+    return _catalog
+
+
+def close_recording_catalog() -> None:
+    """Close the recording catalog (called on application shutdown)."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is not None:
+            _catalog.close()
+            _catalog = None
@@ -0,0 +1,218 @@
+"""Admission control for FFmpeg recorders.
+
+Limits are per API worker: concurrent encoders, host load average per CPU
+and free space in ``settings.recordings_dir``. Requests that cannot start
+immediately wait in a priority queue (higher priority first, FIFO within a
+priority) until a slot frees up, the host recovers, or they time out.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a recording cannot be admitted (queue full or timed out)."""
+
+
+class _Waiter:
+    __slots__ = ("key", "priority", "enqueued_at", "future")
+
+    def __init__(self, key: str, priority: int, future: asyncio.Future):
+        self.key = key
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.future = future
+
+
+class RecordingScheduler:
+    """Priority admission queue with CPU- and disk-aware limits."""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_load_per_cpu: float,
+        min_free_disk_mb: int,
+        recordings_dir: str,
+        queue_limit: int,
+        queue_timeout: float,
+        poll_interval: float = 1.0
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_load_per_cpu = max_load_per_cpu
+        self.min_free_disk_bytes = min_free_disk_mb * 1024 * 1024
+        self.recordings_dir = recordings_dir
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self._active: Set[str] = set()
+        self._queue: List = []
+        self._seq = itertools.count()
+        self._poll_task: Optional[asyncio.Task] = None
+        self._admitted = 0
+        self._rejected = 0
+
+    def _load_per_cpu(self) -> Optional[float]:
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return None  # not available on this platform
+
+    def _free_disk(self) -> int:
+        return shutil.disk_usage(self.recordings_dir).free
+
+    def _blocked_reason(self) -> Optional[str]:
+        if len(self._active) >= self.max_concurrent:
+            return "max_concurrent"
+        load = self._load_per_cpu()
+        if load is not None and load > self.max_load_per_cpu:
+            return "cpu_load"
+        if self._free_disk() < self.min_free_disk_bytes:
+            return "disk_space"
+        return None
+
+    async def admit(self, key: str, priority: int = 0) -> float:
+        """
+        Wait for a recorder slot.
+
+        Args:
+            key: Slot key (the recording ID), passed to ``release`` later
+            priority: Higher values are admitted first
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        if not self._queue and self._blocked_reason() is None:
+            self._active.add(key)
+            self._admitted += 1
+            return 0.0
+
+        if len(self._queue) >= self.queue_limit:
+            self._rejected += 1
+            raise AdmissionRejected("Recording queue is full")
+
+        waiter = _Waiter(key, priority, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, (-priority, next(self._seq), waiter))
+        self._ensure_polling()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                return time.monotonic() - waiter.enqueued_at
+            self._discard(waiter)
+            self._rejected += 1
+            raise AdmissionRejected(
+                f"Timed out after {self.queue_timeout:g}s waiting for a recorder slot "
+                f"({self._blocked_reason() or 'busy'})"
+            )
+        except asyncio.CancelledError:
+            # The caller went away; give the slot back if we were just admitted
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(key)
+            else:
+                self._discard(waiter)
+            raise
+        return time.monotonic() - waiter.enqueued_at
+
+    def release(self, key: str) -> None:
+        """
+        Free a slot (safe to call more than once) and admit queued requests.
+
+        Args:
+            key: The slot key passed to ``admit``
+        """
+        if key in self._active:
+            self._active.discard(key)
+            self._dispatch()
+
+    def _discard(self, waiter: _Waiter) -> None:
+        # Timed-out and cancelled waiters leave the queue right away, so its
+        # length (the queue limit and the fast path in admit) counts live
+        # waiters only
+        waiter.future.cancel()
+        self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+        heapq.heapify(self._queue)
+
+    def _dispatch(self) -> None:
+        while self._queue:
+            waiter = self._queue[0][2]
+            if self._blocked_reason() is not None:
+                return
+            heapq.heappop(self._queue)
+            self._active.add(waiter.key)
+            self._admitted += 1
+            waiter.future.set_result(None)
+
+    def _ensure_polling(self) -> None:
+        # Load and disk space change without any event, so re-check queued
+        # requests periodically while the queue is non-empty
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def _poll(self) -> None:
+        while self._queue:
+            await asyncio.sleep(self.poll_interval)
+            self._dispatch()
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Report scheduler limits, occupancy and queue.
+
+        Returns:
+            Limits, current load/disk readings, active and queued requests
+        """
+        now = time.monotonic()
+        queued = sorted(self._queue, key=lambda entry: entry[:2])
+        load = self._load_per_cpu()
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": len(self._active),
+            "queued": [
+                {
+                    "recording_id": waiter.key,
+                    "priority": waiter.priority,
+                    "waited_seconds": round(now - waiter.enqueued_at, 3)
+                }
+                for _, _, waiter in queued
+            ],
+            "queue_limit": self.queue_limit,
+            "load_per_cpu": round(load, 3) if load is not None else None,
+            "max_load_per_cpu": self.max_load_per_cpu,
+            "free_disk_mb": self._free_disk() // (1024 * 1024),
+            "min_free_disk_mb": self.min_free_disk_bytes // (1024 * 1024),
+            "blocked_by": self._blocked_reason(),
+            "admitted_total": self._admitted,
+            "rejected_total": self._rejected
+        }
+
+
+_scheduler: Optional[RecordingScheduler] = None
+
+
+def get_recording_scheduler() -> RecordingScheduler:
+    """
+    Get the recording scheduler for this worker.
+
+    Returns:
+        RecordingScheduler configured from settings
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RecordingScheduler(
+            max_concurrent=settings.recording_max_concurrent,
+            max_load_per_cpu=settings.recording_max_load_per_cpu,
+            min_free_disk_mb=settings.recording_min_free_disk_mb,
+            recordings_dir=settings.recordings_dir,
+            queue_limit=settings.recording_queue_limit,
+            queue_timeout=settings.recording_queue_timeout
+        )
+    return _scheduler
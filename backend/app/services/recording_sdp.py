@@ -0,0 +1,69 @@
+"""SDP generation for FFmpeg RTP ingest of mediasoup consumers."""
+from typing import Any, Dict, List
+
+
+# Codecs the WebM muxer can take with ``-c copy``
+WEBM_CODECS = {"opus", "vp8", "vp9"}
+
+
+def _primary_codec(rtp_parameters: Dict[str, Any]) -> Dict[str, Any]:
+    for codec in rtp_parameters.get("codecs", []):
+        if not codec["mimeType"].lower().endswith("/rtx"):
+            return codec
+    raise ValueError("Consumer has no media codec")
+
+
+def recording_codecs(consumers: List[Dict[str, Any]]) -> List[str]:
+    """
+    List the codec names carried by recording consumers.
+
+    Args:
+        consumers: Consumer payloads from ``create_recording_consumers``
+
+    Returns:
+        Lower-case codec names (e.g. ``["opus", "vp8"]``)
+    """
+    return [
+        _primary_codec(consumer["rtp_parameters"])["mimeType"].split("/")[1].lower()
+        for consumer in consumers
+    ]
+
+
+def build_recording_sdp(consumers: List[Dict[str, Any]], host: str) -> str:
+    """
+    Describe recording consumers as an SDP session FFmpeg can read.
+
+    Args:
+        consumers: Consumer payloads with ``kind``, ``rtp_parameters``,
+            ``rtp_port`` and ``rtcp_port``
+        host: Local address FFmpeg listens on
+
+    Returns:
+        SDP document
+    """
+    lines = [
+        "v=0",
+        f"o=- 0 0 IN IP4 {host}",
+        "s=RippleNote recording",
+        f"c=IN IP4 {host}",
+        "t=0 0",
+    ]
+
+    for consumer in consumers:
+        codec = _primary_codec(consumer["rtp_parameters"])
+        payload_type = codec["payloadType"]
+        name = codec["mimeType"].split("/")[1]
+        rtpmap = f"{name}/{codec['clockRate']}"
+        if codec.get("channels"):
+            rtpmap += f"/{codec['channels']}"
+
+        lines.append(f"m={consumer['kind']} {consumer['rtp_port']} RTP/AVP {payload_type}")
+        lines.append(f"a=rtcp:{consumer['rtcp_port']}")
+        lines.append(f"a=rtpmap:{payload_type} {rtpmap}")
+        parameters = codec.get("parameters") or {}
+        if parameters:
+            fmtp = ";".join(f"{key}={value}" for key, value in parameters.items())
+            lines.append(f"a=fmtp:{payload_type} {fmtp}")
+        lines.append("a=recvonly")
+
+    return "\r\n".join(lines) + "\r\n"
@@ -1,23 +1,108 @@
 """Recording service for WebRTC streams."""
 import os
+import signal
 import asyncio
-import subprocess
+import logging
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import json
 from config import settings
+from app.services.state_store import get_state_store
+from app.services.recording_catalog import get_recording_catalog
+from app.services import metrics
+from app.services.recording_supervisor import RecordingSupervisor
+from app.services.recording_sdp import WEBM_CODECS, build_recording_sdp, recording_codecs
+from app.services.rtp_port_allocator import get_rtp_port_allocator
+from app.services.recording_scheduler import get_recording_scheduler
+from app.services.s3_service import build_s3_url
+from app.services.segment_uploader import (
+    start_segment_upload,
+    finish_segment_upload,
+    finish_all_segment_uploads
+)
+from app.services.call_manager import get_call_info
+from app.services.mediasoup_client import (
+    create_recording_consumers,
+    resume_recording_consumers,
+    close_recording_transports
+)
 
 
+logger = logging.getLogger(__name__)
+
 # Ensure recordings directory exists
 Path(settings.recordings_dir).mkdir(parents=True, exist_ok=True)
 
 
-# Active recording processes
-_active_recordings: Dict[str, Dict] = {}
+# State store namespace for recording metadata (shared across workers)
+RECORDINGS = "recordings"
+
+# Background cleanup tasks (kept referenced until done)
+_cleanup_tasks = set()
+
+
+def _in_background(coro) -> None:
+    task = asyncio.get_running_loop().create_task(coro)
+    _cleanup_tasks.add(task)
+    task.add_done_callback(_cleanup_tasks.discard)
+
+
+def _update_upload_status(recording_id: str, fields: Dict) -> None:
+    def apply(info):
+        if info is None:
+            return info, None
+        info.setdefault("upload", {}).update(fields)
+        return info, info
+    
+    recording_info = get_state_store().update(RECORDINGS, recording_id, apply)
+    if recording_info is not None and fields.get("status") in ("uploaded", "failed"):
+        get_recording_catalog().upsert(recording_info)
+
+
+async def _release_capture(recording_id: str, recording_info: Dict) -> None:
+    """Free the RTP ports and SFU PlainTransports used by a recording."""
+    get_rtp_port_allocator().release(recording_info.get("rtp_ports", []), recording_id)
+    transport_ids = recording_info.get("sfu_transport_ids")
+    if transport_ids:
+        try:
+            await close_recording_transports(recording_info["router_id"], transport_ids)
+        except Exception as e:
+            logger.warning("Error closing recording transports: %s", e)
+
+
+def _on_recorder_exit(recording_id: str, returncode: int, stderr_tail: List[str]) -> None:
+    """Record an FFmpeg exit that was not requested through stop_recording."""
+    def mark_exited(info):
+        if info is None or info["status"] != "recording":
+            # Already ended by stop_recording, which released the capture
+            return info, None
+        info["status"] = "stopped" if returncode == 0 else "failed"
+        info["stopped_at"] = datetime.now().isoformat()
+        info["exit_code"] = returncode
+        if returncode != 0:
+            info["error"] = "\n".join(stderr_tail[-5:])
+        return info, info
+    
+    recording_info = get_state_store().update(RECORDINGS, recording_id, mark_exited)
+    get_recording_scheduler().release(recording_id)
+    
+    if recording_info is not None:
+        get_recording_catalog().upsert(recording_info)
+        _in_background(_release_capture(recording_id, recording_info))
+    _in_background(finish_segment_upload(recording_id))
+
+
+# FFmpeg processes owned by this worker
+_supervisor = RecordingSupervisor(on_exit=_on_recorder_exit)
 
 
-def generate_recording_filename(room_id: str, user_id: str, media_type: str = "combined") -> str:
+def generate_recording_filename(
+    room_id: str,
+    user_id: str,
+    media_type: str = "combined",
+    extension: str = "webm"
+) -> str:
     """
     Generate a unique filename for a recording.
     
@@ -25,12 +110,13 @@ def generate_recording_filename(room_id: str, user_id: str, media_type: str = "c
         room_id: The call room ID
         user_id: The user ID
         media_type: Type of media (audio, video, combined)
+        extension: File extension for the container
     
     Returns:
         Filename string
     """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"{room_id}_{user_id}_{media_type}_{timestamp}.webm"
+    return f"{room_id}_{user_id}_{media_type}_{timestamp}.{extension}"
 
 
 def get_recording_path(filename: str) -> str:
@@ -49,46 +135,132 @@ def get_recording_path(filename: str) -> str:
 async def start_recording(
     room_id: str,
     user_id: str,
-    rtp_stream_url: Optional[str] = None,
-    audio_track_path: Optional[str] = None,
-    video_track_path: Optional[str] = None
+    priority: int = 0,
+    segmented: bool = False
 ) -> Dict[str, str]:
     """
-    Start recording a WebRTC stream locally.
+    Start recording a participant's media locally.
+    
+    The SFU forwards each of the user's producers over a PlainTransport to
+    a local port pair; FFmpeg reads the streams via a generated SDP and
+    remuxes them with ``-c copy`` (no transcoding). The request first waits
+    for a slot from the recording scheduler.
+    
+    In segmented mode FFmpeg writes self-contained files of
+    ``recording_segment_seconds`` into a per-recording directory, and each
+    finished segment is uploaded to S3 (then deleted locally) while the
+    recording continues.
     
     Args:
         room_id: The call room ID
         user_id: The user ID
-        rtp_stream_url: Optional RTP stream URL to record
-        audio_track_path: Optional path to audio track file
-        video_track_path: Optional path to video track file
+        priority: Admission priority (higher is admitted first)
+        segmented: Stream finished segments to S3 during the recording
     
     Returns:
         Recording metadata with recording_id and file path
     """
+    call_info = get_call_info(room_id)
+    if not call_info:
+        raise ValueError(f"Call room {room_id} not found")
+    
+    participant = call_info.participants.get(user_id)
+    producer_ids = list(participant.producer_ids) if participant else []
+    if not producer_ids:
+        raise ValueError(f"User {user_id} has no active producers to record")
+    
+    if segmented and not settings.s3_bucket_name:
+        raise ValueError("S3 bucket name not configured")
+    
     recording_id = f"{room_id}_{user_id}_{datetime.now().timestamp()}"
-    filename = generate_recording_filename(room_id, user_id)
-    filepath = get_recording_path(filename)
-    
-    # For MVP, we'll record using FFmpeg
-    # In production, you'd capture RTP streams from mediasoup
-    ffmpeg_cmd = [
-        "ffmpeg",
-        "-f", "webm",
-        "-i", "pipe:0",  # Input from stdin (for future stream input)
-        "-c", "copy",
-        "-y",  # Overwrite output file
-        filepath
-    ]
-    
-    # For now, create a placeholder recording process
-    # In production, this would capture actual RTP streams
-    process = subprocess.Popen(
-        ffmpeg_cmd,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
+    router_id = call_info.router_id
+    host = settings.recording_rtp_host
+    
+    scheduler = get_recording_scheduler()
+    queued_seconds = await scheduler.admit(recording_id, priority)
+    
+    allocator = get_rtp_port_allocator()
+    try:
+        ports = allocator.allocate(len(producer_ids), recording_id)
+        try:
+            consumers = await create_recording_consumers(router_id, producer_ids, host, ports)
+        except Exception:
+            allocator.release(ports, recording_id)
+            raise
+    except BaseException:
+        scheduler.release(recording_id)
+        raise
+    
+    capture = {
+        "router_id": router_id,
+        "rtp_ports": ports,
+        "sfu_transport_ids": [c["transport_id"] for c in consumers]
+    }
+    
+    try:
+        # WebM only carries Opus/VP8/VP9; anything else goes into Matroska
+        codecs = recording_codecs(consumers)
+        container, extension = ("webm", "webm") if set(codecs) <= WEBM_CODECS else ("matroska", "mkv")
+        filename = generate_recording_filename(room_id, user_id, extension=extension)
+        filepath = get_recording_path(filename)
+        
+        if segmented:
+            # Segments and the segment list live in a per-recording directory
+            filename = os.path.splitext(filename)[0]
+            filepath = get_recording_path(filename)
+            os.makedirs(filepath, exist_ok=True)
+            sdp_path = os.path.join(filepath, "session.sdp")
+            segment_list = os.path.join(filepath, "segments.txt")
+            output_args = [
+                "-f", "segment",
+                "-segment_time", str(settings.recording_segment_seconds),
+                "-segment_format", container,
+                "-segment_list", segment_list,
+                "-segment_list_type", "flat",
+                "-reset_timestamps", "1",
+                "-y",
+                os.path.join(filepath, f"segment_%05d.{extension}")
+            ]
+        else:
+            sdp_path = f"{filepath}.sdp"
+            output_args = [
+                "-f", container,
+                "-y",  # Overwrite output file
+                filepath
+            ]
+        
+        with open(sdp_path, "w") as sdp_file:
+            sdp_file.write(build_recording_sdp(consumers, host))
+        
+        ffmpeg_cmd = [
+            "ffmpeg",
+            "-loglevel", "warning",
+            "-protocol_whitelist", "file,udp,rtp",
+            "-fflags", "+genpts",
+            "-f", "sdp",
+            "-i", sdp_path,
+            "-map", "0",
+            "-c", "copy",  # Remux only, no transcoding
+            *output_args
+        ]
+        
+        process = await _supervisor.spawn(recording_id, ffmpeg_cmd)
+        
+        # Consumers were created paused so nothing is sent before FFmpeg
+        # has bound its ports; resuming also requests a video key frame
+        await asyncio.sleep(settings.recording_resume_delay)
+        if not await resume_recording_consumers(router_id, [c["consumer_id"] for c in consumers]):
+            raise Exception("Failed to resume recording consumers")
+        # An early exit was reported to _on_recorder_exit before the state
+        # entry existed, so nothing would release the capture; no await
+        # separates this check from the put below
+        if not _supervisor.is_running(recording_id):
+            raise Exception("FFmpeg exited before the recording started")
+    except BaseException:
+        await _supervisor.stop(recording_id, settings.recording_stop_timeout)
+        await _release_capture(recording_id, capture)
+        scheduler.release(recording_id)
+        raise
     
     recording_info = {
         "recording_id": recording_id,
@@ -96,12 +268,43 @@ async def start_recording(
         "user_id": user_id,
         "filename": filename,
         "filepath": filepath,
-        "process": process,
+        "sdp_path": sdp_path,
+        "codecs": codecs,
+        "pid": process.pid,
+        **capture,
+        "priority": priority,
+        "queued_seconds": round(queued_seconds, 3),
+        "segmented": segmented,
         "started_at": datetime.now().isoformat(),
         "status": "recording"
     }
     
-    _active_recordings[recording_id] = recording_info
+    if segmented:
+        manifest_key = f"recordings/{recording_id}/manifest.json"
+        recording_info["upload"] = {
+            "job_id": recording_id,
+            "mode": "segmented",
+            "status": "streaming",
+            "s3_bucket": settings.s3_bucket_name,
+            "s3_key": manifest_key,
+            "s3_url": build_s3_url(settings.s3_bucket_name, manifest_key),
+            "segments_uploaded": 0,
+            "bytes_total": None,
+            "bytes_uploaded": 0,
+            "submitted_at": recording_info["started_at"]
+        }
+    
+    get_state_store().put(RECORDINGS, recording_id, recording_info)
+    get_recording_catalog().upsert(recording_info)
+    
+    if segmented:
+        start_segment_upload(
+            recording_id,
+            filepath,
+            segment_list,
+            settings.s3_bucket_name,
+            lambda fields: _update_upload_status(recording_id, fields)
+        )
     
     return {
         "recording_id": recording_id,
@@ -115,35 +318,61 @@ async def stop_recording(recording_id: str) -> Dict[str, str]:
     """
     Stop an active recording.
     
+    Only a live recording is transitioned; one that is already stopped or
+    has failed is returned with its current status.
+    
     Args:
         recording_id: The recording ID
     
     Returns:
         Recording metadata with final status
     """
-    if recording_id not in _active_recordings:
-        raise ValueError(f"Recording {recording_id} not found")
+    store = get_state_store()
     
-    recording_info = _active_recordings[recording_id]
-    process = recording_info["process"]
+    def mark_stopped(info):
+        if info is None:
+            raise ValueError(f"Recording {recording_id} not found")
+        if info["status"] != "recording":
+            # Already stopped, or failed when FFmpeg exited on its own
+            return info, (info, False)
+        info["status"] = "stopped"
+        info["stopped_at"] = datetime.now().isoformat()
+        return info, (info, True)
     
-    # Stop the FFmpeg process
-    try:
-        process.terminate()
-        process.wait(timeout=5)
-    except subprocess.TimeoutExpired:
-        process.kill()
-    except Exception as e:
-        print(f"Error stopping recording: {e}")
+    recording_info, stopped_now = store.update(RECORDINGS, recording_id, mark_stopped)
+    
+    if stopped_now:
+        # Stop the FFmpeg process; it may belong to another worker on this
+        # host, in which case SIGINT lets FFmpeg finalize the file and that
+        # worker's supervisor reaps it
+        try:
+            if _supervisor.is_running(recording_id):
+                await _supervisor.stop(recording_id, settings.recording_stop_timeout)
+            elif recording_info.get("pid"):
+                os.kill(recording_info["pid"], signal.SIGINT)
+        except ProcessLookupError:
+            pass
+        except Exception as e:
+            logger.warning("Error stopping recording %s: %s", recording_id, e)
+        
+        # Ports and SFU transports are released once, by whoever ends the
+        # recording (here, or the supervisor's exit callback)
+        await _release_capture(recording_id, recording_info)
+    
+    get_recording_scheduler().release(recording_id)
     
-    recording_info["status"] = "stopped"
-    recording_info["stopped_at"] = datetime.now().isoformat()
+    # The last segment is flushed in the background; progress is reported
+    # under the recording's ``upload`` status
+    _in_background(finish_segment_upload(recording_id))
+    
+    if stopped_now:
+        get_recording_catalog().upsert(recording_info)
     
     return {
         "recording_id": recording_id,
         "filename": recording_info["filename"],
         "filepath": recording_info["filepath"],
-        "status": "stopped",
+        "status": recording_info["status"],
         "duration": "calculated"  # Would calculate actual duration
     }
 
@@ -152,34 +381,76 @@ def get_recording_info(recording_id: str) -> Optional[Dict]:
     """
     Get information about a recording.
     
+    Live state (including upload progress) is preferred; recordings that
+    are no longer in the state store, e.g. after a restart, come from the
+    catalog.
+    
     Args:
         recording_id: The recording ID
     
     Returns:
         Recording information or None
     """
-    return _active_recordings.get(recording_id)
+    recording_info = get_state_store().get(RECORDINGS, recording_id)
+    if recording_info is None:
+        recording_info = get_recording_catalog().get(recording_id)
+    return recording_info
 
 
-def list_recordings(room_id: Optional[str] = None) -> list:
+def list_recordings(
+    room_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    status: Optional[str] = None,
+    started_after: Optional[str] = None,
+    started_before: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict], Optional[str]]:
     """
-    List all recordings, optionally filtered by room_id.
+    List one page of recordings from the catalog, newest first.
     
     Args:
         room_id: Optional room ID to filter by
+        user_id: Optional user ID to filter by
+        status: Optional status to filter by
+        started_after: Optional lower bound (ISO timestamp, inclusive)
+        started_before: Optional upper bound (ISO timestamp, exclusive)
+        limit: Page size
+        cursor: Cursor returned with the previous page
     
     Returns:
-        List of recording information
+        The page of recordings and the next cursor (None on the last page)
     """
-    recordings = list(_active_recordings.values())
-    
-    if room_id:
-        recordings = [r for r in recordings if r["room_id"] == room_id]
+    return get_recording_catalog().list_recordings(
+        room_id=room_id,
+        user_id=user_id,
+        status=status,
+        started_after=started_after,
+        started_before=started_before,
+        limit=limit,
+        cursor=cursor
+    )
+
+
+def active_recorder_count() -> int:
+    """
+    Count FFmpeg processes running in this worker.
     
-    # Remove process object from response
-    return [
-        {k: v for k, v in r.items() if k != "process"}
-        for r in recordings
-    ]
+    Returns:
+        Number of supervised recorder processes
+    """
+    return len(_supervisor)
+
+
+metrics.gauge(
+    "ripplenote_recorder_processes",
+    "FFmpeg recorder processes running in this worker.",
+    active_recorder_count
+)
 
 
+async def shutdown_recordings() -> None:
+    """Gracefully stop this worker's recorders (called on application shutdown)."""
+    await _supervisor.shutdown(settings.recording_stop_timeout)
+    await finish_all_segment_uploads()
+    await asyncio.gather(*_cleanup_tasks, return_exceptions=True)
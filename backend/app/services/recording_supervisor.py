@@ -0,0 +1,142 @@
+"""Asyncio supervisor for FFmpeg recording processes."""
+import asyncio
+import logging
+import signal
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Called as on_exit(recording_id, returncode, stderr_tail) when a process
+# exits without being asked to stop
+ExitCallback = Callable[[str, int, List[str]], None]
+
+
+class SupervisedProcess:
+    """A running FFmpeg process and its background pipe/exit tasks."""
+
+    __slots__ = ("recording_id", "process", "stderr_tail", "stop_requested", "tasks")
+
+    def __init__(self, recording_id: str, process: asyncio.subprocess.Process, tail_lines: int):
+        self.recording_id = recording_id
+        self.process = process
+        self.stderr_tail = deque(maxlen=tail_lines)
+        self.stop_requested = False
+        self.tasks: List[asyncio.Task] = []
+
+
+class RecordingSupervisor:
+    """
+    Spawns and stops FFmpeg without blocking the event loop.
+
+    stderr is drained continuously (keeping the last few lines) so the pipe
+    can never fill up and stall FFmpeg, and each child is watched so an
+    unexpected exit is reported through ``on_exit``.
+    """
+
+    def __init__(self, on_exit: Optional[ExitCallback] = None, tail_lines: int = 20):
+        self.on_exit = on_exit
+        self.tail_lines = tail_lines
+        self._running: Dict[str, SupervisedProcess] = {}
+
+    def __len__(self) -> int:
+        return len(self._running)
+
+    def is_running(self, recording_id: str) -> bool:
+        return recording_id in self._running
+
+    async def spawn(self, recording_id: str, cmd: List[str]) -> asyncio.subprocess.Process:
+        """
+        Start a supervised process.
+
+        Args:
+            recording_id: The recording ID the process belongs to
+            cmd: Command line to execute
+
+        Returns:
+            The asyncio subprocess
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        supervised = SupervisedProcess(recording_id, process, self.tail_lines)
+        self._running[recording_id] = supervised
+        supervised.tasks = [
+            asyncio.create_task(self._drain_stderr(supervised)),
+            asyncio.create_task(self._watch(supervised))
+        ]
+        return process
+
+    async def _drain_stderr(self, supervised: SupervisedProcess) -> None:
+        stream = supervised.process.stderr
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            supervised.stderr_tail.append(line.decode(errors="replace").rstrip())
+
+    async def _watch(self, supervised: SupervisedProcess) -> None:
+        returncode = await supervised.process.wait()
+        self._running.pop(supervised.recording_id, None)
+        if supervised.stop_requested or self.on_exit is None:
+            return
+        try:
+            self.on_exit(supervised.recording_id, returncode, list(supervised.stderr_tail))
+        except Exception as e:
+            logger.warning("Recording exit callback failed for %s: %s", supervised.recording_id, e)
+
+    async def stop(self, recording_id: str, timeout: float = 5.0) -> Optional[int]:
+        """
+        Gracefully stop a process: 'q' on stdin, then SIGINT, then SIGKILL.
+
+        Args:
+            recording_id: The recording ID
+            timeout: Seconds to wait for each escalation step
+
+        Returns:
+            The process return code, or None if no process was running
+        """
+        supervised = self._running.get(recording_id)
+        if supervised is None:
+            return None
+
+        supervised.stop_requested = True
+        process = supervised.process
+
+        # FFmpeg finalizes the container on 'q' (or EOF when stdin is its input)
+        if process.stdin is not None and not process.stdin.is_closing():
+            try:
+                process.stdin.write(b"q")
+                await process.stdin.drain()
+                process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        for escalate in (lambda: process.send_signal(signal.SIGINT), process.kill):
+            try:
+                await asyncio.wait_for(asyncio.shield(process.wait()), timeout)
+                break
+            except asyncio.TimeoutError:
+                try:
+                    escalate()
+                except ProcessLookupError:
+                    break
+
+        await process.wait()
+        await asyncio.gather(*supervised.tasks, return_exceptions=True)
+        return process.returncode
+
+    def get_stderr_tail(self, recording_id: str) -> List[str]:
+        supervised = self._running.get(recording_id)
+        return list(supervised.stderr_tail) if supervised else []
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop every supervised process concurrently."""
+        await asyncio.gather(
+            *(self.stop(recording_id, timeout) for recording_id in list(self._running)),
+            return_exceptions=True
+        )
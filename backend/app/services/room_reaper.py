@@ -0,0 +1,206 @@
+"""Expiry of abandoned call rooms and participants.
+
+Participants stamp ``last_seen`` on every API call, heartbeat and signaling
+keepalive. Rooms sit in a min-heap keyed by the earliest time one of their
+participants could expire; activity never touches the heap. When an entry
+comes due the room is re-checked against its current ``last_seen`` and
+either rescheduled (lazy deletion) or has its idle participants removed,
+closing the router once the room is empty. Each check is O(log rooms),
+and between due entries the reaper sleeps.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from app.services import metrics
+from app.services.call_manager import CALLS, expire_idle_participants
+from app.services.state_store import get_state_store
+
+
+logger = logging.getLogger(__name__)
+
+REAPED_ROOMS = metrics.counter(
+    "ripplenote_reaped_rooms_total",
+    "Call rooms ended by the idle reaper."
+)
+REAPED_PARTICIPANTS = metrics.counter(
+    "ripplenote_reaped_participants_total",
+    "Participants removed from calls by the idle reaper."
+)
+
+
+class RoomReaper:
+    """
+    Ends rooms and removes participants idle for longer than ``idle_timeout``.
+
+    Rooms are tracked by the worker that created or joined them, plus every
+    room found in the state store at startup (orphans of a restart or of a
+    worker that went away).
+    """
+
+    def __init__(self, idle_timeout: float, max_sleep: float = 30.0):
+        self.idle_timeout = idle_timeout
+        self.max_sleep = max_sleep
+        self._heap: List[Tuple[float, str]] = []
+        self._tracked: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._rooms_reclaimed = 0
+        self._participants_reclaimed = 0
+        self._failures = 0
+
+    def _schedule(self, room_id: str, deadline: float) -> None:
+        heapq.heappush(self._heap, (deadline, room_id))
+        self._tracked.add(room_id)
+        if self._heap[0][1] == room_id:
+            self._wakeup.set()
+
+    def track(self, room_id: str) -> None:
+        """
+        Start watching a room; no-op if it is already scheduled.
+
+        Args:
+            room_id: The call room ID
+        """
+        if room_id not in self._tracked:
+            self._schedule(room_id, time.time() + self.idle_timeout)
+
+    async def start(self) -> None:
+        """Schedule rooms already in the state store and start the reaper loop."""
+        for room in get_state_store().values(CALLS):
+            oldest = min(
+                (participant.last_seen for participant in room.participants.values()),
+                default=time.time()
+            )
+            if room.room_id not in self._tracked:
+                self._schedule(room.room_id, oldest + self.idle_timeout)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the reaper loop."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning("Room reaper failed: %s", e)
+            delay = self.max_sleep
+            if self._heap:
+                delay = min(delay, max(0.0, self._heap[0][0] - time.time()))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check(self, room_id: str) -> None:
+        try:
+            result = await expire_idle_participants(room_id, self.idle_timeout)
+        except Exception as e:
+            self._failures += 1
+            logger.warning("Expiring idle participants of room %s failed: %s", room_id, e)
+            self._schedule(room_id, time.time() + self.max_sleep)
+            return
+
+        if result["expired"]:
+            self._participants_reclaimed += len(result["expired"])
+            REAPED_PARTICIPANTS.inc(len(result["expired"]))
+            logger.info("Removed idle participants %s from room %s", result["expired"], room_id)
+        if result["ended"]:
+            self._rooms_reclaimed += 1
+            REAPED_ROOMS.inc()
+            logger.info("Reclaimed idle room %s", room_id)
+        if result["next_check"] is not None:
+            self._schedule(room_id, result["next_check"])
+
+        from app.services.signaling import get_signaling_hub
+        hub = get_signaling_hub()
+        if result["ended"]:
+            # Nothing is published for a reaped room, so drop its event log here
+            hub.drop_room(room_id)
+        elif result["expired"]:
+            for user_id in result["expired"]:
+                await hub.publish(room_id, "peerLeft", {"user_id": user_id, "reason": "idle"})
+
+    async def reap(self) -> int:
+        """
+        Check every room whose deadline has passed.
+
+        Returns:
+            Number of rooms checked
+        """
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, room_id = heapq.heappop(self._heap)
+            self._tracked.discard(room_id)
+            due.append(room_id)
+
+        for room_id in due:
+            await self._check(room_id)
+        return len(due)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Report tracked rooms and reclaim counters.
+
+        Returns:
+            Idle timeout, tracked room count and reclaimed/failure counters
+        """
+        return {
+            "idle_timeout": self.idle_timeout,
+            "tracked_rooms": len(self._tracked),
+            "rooms_reclaimed": self._rooms_reclaimed,
+            "participants_reclaimed": self._participants_reclaimed,
+            "failures": self._failures
+        }
+
+
+_reaper: Optional[RoomReaper] = None
+
+
+def get_room_reaper() -> Optional[RoomReaper]:
+    """
+    Get the idle room reaper.
+
+    Returns:
+        The running RoomReaper, or None if disabled/not started
+    """
+    return _reaper
+
+
+async def start_room_reaper() -> Optional[RoomReaper]:
+    """
+    Create and start the idle room reaper (called on application startup).
+
+    Returns:
+        The started RoomReaper, or None if ``room_idle_timeout`` is 0
+    """
+    global _reaper
+    if settings.room_idle_timeout <= 0:
+        return None
+
+    if _reaper is None:
+        _reaper = RoomReaper(
+            idle_timeout=settings.room_idle_timeout,
+            max_sleep=settings.room_reaper_max_sleep
+        )
+        await _reaper.start()
+    return _reaper
+
+
+async def stop_room_reaper() -> None:
+    """Stop the idle room reaper (called on shutdown)."""
+    global _reaper
+    if _reaper is not None:
+        await _reaper.stop()
+        _reaper = None
@@ -0,0 +1,231 @@
+"""Pre-warmed pool of SFU routers for instant room creation."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from config import settings
+from app.services.mediasoup_client import provision_room, close_router
+from app.services.sfu_cluster import get_sfu_cluster
+
+
+logger = logging.getLogger(__name__)
+
+
+class PooledRoom:
+    """An idle router with a pre-created WebRTC transport."""
+
+    __slots__ = ("router_id", "codec_fingerprint", "transport", "created_at")
+
+    def __init__(self, router_id: str, codec_fingerprint: Optional[str], transport: Dict[str, Any]):
+        self.router_id = router_id
+        self.codec_fingerprint = codec_fingerprint
+        self.transport = transport
+        self.created_at = time.monotonic()
+
+
+class RouterPool:
+    """
+    Keeps between ``low_watermark`` and ``high_watermark`` idle routers.
+
+    Taking an entry is a dict pop; when the pool drops below the low
+    watermark it is refilled up to the high watermark in the background.
+    Entries idle for longer than ``idle_ttl`` are closed by the reaper.
+    Entries whose SFU node is draining or unhealthy are passed over and
+    closed on the next refill.
+    """
+
+    def __init__(
+        self,
+        low_watermark: int,
+        high_watermark: int,
+        idle_ttl: float,
+        reap_interval: float
+    ):
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.idle_ttl = idle_ttl
+        self.reap_interval = reap_interval
+        # Insertion-ordered, so the oldest entries are always at the front
+        self._idle: "OrderedDict[str, PooledRoom]" = OrderedDict()
+        self._retired: List[str] = []
+        self._pending = 0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._hits = 0
+        self._misses = 0
+        self._reaped = 0
+        self._failures = 0
+
+    async def start(self) -> None:
+        """Start the reaper and fill the pool to the high watermark."""
+        self._schedule_refill()
+        if self._reaper_task is None:
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    async def stop(self) -> None:
+        """Stop background tasks and close all idle routers on the SFU."""
+        for task in (self._reaper_task, self._refill_task):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(
+            *(t for t in (self._reaper_task, self._refill_task) if t is not None),
+            return_exceptions=True
+        )
+        self._reaper_task = None
+        self._refill_task = None
+
+        idle = list(self._idle) + self._retired
+        self._idle.clear()
+        self._retired = []
+        await asyncio.gather(*(close_router(router_id) for router_id in idle), return_exceptions=True)
+
+    def acquire(self) -> Optional[PooledRoom]:
+        """
+        Take an idle router from the pool.
+
+        Returns:
+            A pooled router with its transport, or None if the pool is empty
+        """
+        pooled = None
+        cluster = get_sfu_cluster()
+        while self._idle:
+            router_id, candidate = self._idle.popitem(last=False)
+            if cluster.accepts_rooms(router_id):
+                pooled = candidate
+                break
+            self._retired.append(router_id)
+
+        if pooled is not None:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+        if self._retired or len(self._idle) + self._pending < self.low_watermark:
+            self._schedule_refill()
+        return pooled
+
+    def _schedule_refill(self) -> None:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _provision_one(self) -> None:
+        self._pending += 1
+        try:
+            provisioned = await provision_room(transports=1)
+        except Exception as e:
+            self._failures += 1
+            logger.warning("Router pool refill failed: %s", e)
+            return
+        finally:
+            self._pending -= 1
+
+        pooled = PooledRoom(
+            provisioned["router_id"],
+            provisioned.get("codec_fingerprint"),
+            provisioned["transports"][0]
+        )
+        self._idle[pooled.router_id] = pooled
+
+    async def _refill(self) -> None:
+        if self._retired:
+            retired, self._retired = self._retired, []
+            await asyncio.gather(*(close_router(router_id) for router_id in retired), return_exceptions=True)
+        missing = self.high_watermark - len(self._idle) - self._pending
+        if missing > 0:
+            await asyncio.gather(*(self._provision_one() for _ in range(missing)))
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning("Router pool reaper failed: %s", e)
+
+    async def reap(self) -> int:
+        """
+        Close idle routers older than ``idle_ttl`` and top the pool back up.
+
+        Returns:
+            Number of routers reaped
+        """
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = []
+        while self._idle:
+            router_id, pooled = next(iter(self._idle.items()))
+            if pooled.created_at > cutoff:
+                break
+            del self._idle[router_id]
+            expired.append(router_id)
+
+        if expired:
+            self._reaped += len(expired)
+            await asyncio.gather(*(close_router(router_id) for router_id in expired), return_exceptions=True)
+
+        if len(self._idle) + self._pending < self.low_watermark:
+            self._schedule_refill()
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Report pool occupancy and counters.
+
+        Returns:
+            Idle/pending counts, watermarks and hit/miss/reap/failure counters
+        """
+        return {
+            "idle": len(self._idle),
+            "pending": self._pending,
+            "retired": len(self._retired),
+            "low_watermark": self.low_watermark,
+            "high_watermark": self.high_watermark,
+            "hits": self._hits,
+            "misses": self._misses,
+            "reaped": self._reaped,
+            "failures": self._failures
+        }
+
+
+_pool: Optional[RouterPool] = None
+
+
+def get_router_pool() -> Optional[RouterPool]:
+    """
+    Get the warm router pool.
+
+    Returns:
+        The running RouterPool, or None if pooling is disabled/not started
+    """
+    return _pool
+
+
+async def start_router_pool() -> Optional[RouterPool]:
+    """
+    Create and start the warm router pool (called on application startup).
+
+    Returns:
+        The started RouterPool, or None if ``router_pool_high_watermark`` is 0
+    """
+    global _pool
+    if settings.router_pool_high_watermark <= 0:
+        return None
+
+    if _pool is None:
+        _pool = RouterPool(
+            low_watermark=min(settings.router_pool_low_watermark, settings.router_pool_high_watermark),
+            high_watermark=settings.router_pool_high_watermark,
+            idle_ttl=settings.router_pool_idle_ttl,
+            reap_interval=settings.router_pool_reap_interval
+        )
+        await _pool.start()
+    return _pool
+
+
+async def stop_router_pool() -> None:
+    """Stop the warm router pool and release its routers (called on shutdown)."""
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
@@ -0,0 +1,127 @@
+"""Cache of router RTP capabilities.
+
+A router's capabilities never change during its lifetime and are identical
+for every router created from the same codec list, so entries are kept in
+two tiers: ``router_id -> fingerprint`` and ``fingerprint -> capabilities``.
+The serialized JSON is kept alongside the dict so responses can embed it
+without re-encoding.
+
+Routers closed by another API worker are never invalidated here, so the
+per-router tier is an LRU capped at ``MAX_ROUTERS`` entries.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class CachedCapabilities:
+    """RTP capabilities plus their pre-serialized JSON encoding."""
+
+    __slots__ = ("fingerprint", "rtp_capabilities", "json_bytes")
+
+    def __init__(self, fingerprint: str, rtp_capabilities: Dict[str, Any], json_bytes: bytes):
+        self.fingerprint = fingerprint
+        self.rtp_capabilities = rtp_capabilities
+        self.json_bytes = json_bytes
+
+
+# router_id -> codec fingerprint, least recently used first
+_router_fingerprints: "OrderedDict[str, str]" = OrderedDict()
+MAX_ROUTERS = 10000
+
+# codec fingerprint -> shared capabilities entry
+_by_fingerprint: Dict[str, CachedCapabilities] = {}
+
+_hits = 0
+_misses = 0
+
+
+def remember(
+    router_id: str,
+    rtp_capabilities: Dict[str, Any],
+    fingerprint: Optional[str] = None
+) -> CachedCapabilities:
+    """
+    Store capabilities for a router.
+
+    Args:
+        router_id: The router ID
+        rtp_capabilities: RTP capabilities reported by the SFU
+        fingerprint: Codec fingerprint reported by the SFU; derived from the
+            capabilities themselves when the SFU does not provide one
+
+    Returns:
+        The shared cache entry for the router's codec fingerprint
+    """
+    json_bytes = None
+    if not fingerprint:
+        json_bytes = json.dumps(rtp_capabilities, separators=(",", ":"), sort_keys=True).encode()
+        fingerprint = hashlib.sha256(json_bytes).hexdigest()[:16]
+
+    entry = _by_fingerprint.get(fingerprint)
+    if entry is None:
+        if json_bytes is None:
+            json_bytes = json.dumps(rtp_capabilities, separators=(",", ":")).encode()
+        entry = CachedCapabilities(fingerprint, rtp_capabilities, json_bytes)
+        _by_fingerprint[fingerprint] = entry
+
+    _remember_router(router_id, fingerprint)
+    return entry
+
+
+def _remember_router(router_id: str, fingerprint: str) -> None:
+    _router_fingerprints[router_id] = fingerprint
+    _router_fingerprints.move_to_end(router_id)
+    while len(_router_fingerprints) > MAX_ROUTERS:
+        _router_fingerprints.popitem(last=False)
+
+
+def lookup(router_id: str, fingerprint: Optional[str] = None) -> Optional[CachedCapabilities]:
+    """
+    Find cached capabilities for a router.
+
+    Args:
+        router_id: The router ID
+        fingerprint: Optional codec fingerprint known for the router (e.g.
+            from call state), used when the router itself is not cached yet
+
+    Returns:
+        The cache entry or None on a miss
+    """
+    global _hits, _misses
+
+    known = _router_fingerprints.get(router_id) or fingerprint
+    entry = _by_fingerprint.get(known) if known else None
+    if entry is None:
+        _misses += 1
+        return None
+
+    _hits += 1
+    _remember_router(router_id, entry.fingerprint)
+    return entry
+
+
+def invalidate(router_id: str) -> None:
+    """
+    Drop the per-router entry (called when the router is closed).
+
+    Args:
+        router_id: The router ID
+    """
+    _router_fingerprints.pop(router_id, None)
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Report cache size and hit counters.
+
+    Returns:
+        Router and fingerprint counts plus hits/misses
+    """
+    return {
+        "routers": len(_router_fingerprints),
+        "fingerprints": len(_by_fingerprint),
+        "hits": _hits,
+        "misses": _misses
+    }
@@ -0,0 +1,142 @@
+"""Allocation of local RTP/RTCP port pairs for recording ingest."""
+import os
+import socket
+import threading
+from typing import Dict, List, Optional
+
+from config import settings
+from app.services.state_store import get_state_store
+
+
+# rtp_port -> {"owner": recording_id, "pid": worker pid}
+RTP_PORTS = "rtp_ports"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RtpPortAllocator:
+    """
+    Hands out (rtp, rtp + 1) port pairs from a fixed range.
+
+    RTP ports are even, as is conventional. Every pair handed out is reserved
+    in the state store, so API workers sharing the SQLite backend never hand
+    out the same pair even before FFmpeg has bound it. A pair is only handed
+    out if both ports can actually be bound as well, so ports held by other
+    processes on the host are skipped. Reservations left by a worker that
+    died are taken over.
+    """
+
+    def __init__(self, host: str, min_port: int, max_port: int):
+        self.host = host
+        self.min_port = min_port + (min_port % 2)
+        self.max_port = max_port
+        self._next = self.min_port
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return max(0, (self.max_port - self.min_port + 1) // 2)
+
+    def _is_free(self, port: int) -> bool:
+        for candidate in (port, port + 1):
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                try:
+                    sock.bind((self.host, candidate))
+                except OSError:
+                    return False
+        return True
+
+    def _reserve(self, port: int, owner: str) -> bool:
+        def claim(current):
+            if current is not None and _pid_alive(current["pid"]):
+                return current, False
+            return {"owner": owner, "pid": os.getpid()}, True
+
+        return get_state_store().update(RTP_PORTS, str(port), claim)
+
+    def _unreserve(self, port: int, owner: str) -> None:
+        def drop(current):
+            if current is None or current["owner"] != owner:
+                # Taken over after this worker was presumed dead
+                return current, None
+            return None, None
+
+        get_state_store().update(RTP_PORTS, str(port), drop)
+
+    def allocate(self, count: int, owner: str) -> List[Dict[str, int]]:
+        """
+        Reserve ``count`` port pairs.
+
+        Args:
+            count: Number of pairs (one per media stream)
+            owner: The recording ID the pairs are reserved for
+
+        Returns:
+            List of ``{"rtp_port", "rtcp_port"}`` dicts
+
+        Raises:
+            RuntimeError: If the range has no room for ``count`` pairs
+        """
+        pairs: List[int] = []
+        with self._lock:
+            for _ in range(self.capacity):
+                if len(pairs) == count:
+                    break
+                port = self._next
+                self._next += 2
+                if self._next + 1 > self.max_port:
+                    self._next = self.min_port
+                if not self._is_free(port) or not self._reserve(port, owner):
+                    continue
+                pairs.append(port)
+
+            if len(pairs) < count:
+                for port in pairs:
+                    self._unreserve(port, owner)
+                raise RuntimeError("No free RTP ports available for recording")
+
+        return [{"rtp_port": port, "rtcp_port": port + 1} for port in pairs]
+
+    def release(self, ports: List[Dict[str, int]], owner: str) -> None:
+        """
+        Return port pairs to the pool (safe to call more than once).
+
+        Args:
+            ports: Pairs previously returned by ``allocate``
+            owner: The recording ID passed to ``allocate``
+        """
+        with self._lock:
+            for pair in ports:
+                self._unreserve(pair["rtp_port"], owner)
+
+    def in_use(self) -> int:
+        """Pairs reserved by all workers sharing the state store."""
+        return len(get_state_store().values(RTP_PORTS))
+
+
+_allocator: Optional[RtpPortAllocator] = None
+
+
+def get_rtp_port_allocator() -> RtpPortAllocator:
+    """
+    Get the recording port allocator for this worker.
+
+    Returns:
+        RtpPortAllocator over ``recording_rtp_min_port..recording_rtp_max_port``
+    """
+    global _allocator
+    if _allocator is None:
+        _allocator = RtpPortAllocator(
+            settings.recording_rtp_host,
+            settings.recording_rtp_min_port,
+            settings.recording_rtp_max_port
+        )
+    return _allocator
@@ -1,41 +1,193 @@
 """S3 service for uploading recordings."""
+import asyncio
 import boto3
+import json
 import os
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from config import settings
+from app.services.metrics import S3_UPLOADED_BYTES, S3_UPLOAD_FAILURES
+
+
+# Bounded pool for blocking boto3 transfers so they never run on the event loop
+_upload_executor = ThreadPoolExecutor(
+    max_workers=settings.s3_upload_workers,
+    thread_name_prefix="s3-upload"
+)
+
+
+def get_transfer_config() -> TransferConfig:
+    """
+    Get multipart transfer settings for uploads.
+    
+    Returns:
+        boto3 TransferConfig built from settings
+    """
+    mb = 1024 * 1024
+    return TransferConfig(
+        multipart_threshold=settings.s3_multipart_threshold_mb * mb,
+        multipart_chunksize=settings.s3_multipart_chunksize_mb * mb,
+        max_concurrency=settings.s3_max_concurrency,
+        use_threads=True
+    )
+
+
+class UploadProgress:
+    """
+    Thread-safe byte counter for boto3 transfer callbacks.
+    
+    boto3 invokes the callback from its transfer threads for every chunk, so
+    ``on_progress`` is only called at most once per ``interval`` seconds
+    (and always for the final byte).
+    """
+    
+    def __init__(
+        self,
+        total_bytes: int,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        interval: float = 1.0
+    ):
+        self.total_bytes = total_bytes
+        self.bytes_uploaded = 0
+        self.on_progress = on_progress
+        self.interval = interval
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+    
+    def __call__(self, bytes_amount: int) -> None:
+        with self._lock:
+            self.bytes_uploaded += bytes_amount
+            now = time.monotonic()
+            done = self.bytes_uploaded >= self.total_bytes
+            if not done and now - self._last_report < self.interval:
+                return
+            self._last_report = now
+            uploaded = self.bytes_uploaded
+        if self.on_progress is not None:
+            self.on_progress(uploaded, self.total_bytes)
+
+
+def build_s3_key(recording_id: str, filepath: str) -> str:
+    """
+    Build the S3 object key for a recording file.
+    
+    Args:
+        recording_id: The recording ID
+        filepath: Local file path
+    
+    Returns:
+        S3 key
+    """
+    return f"recordings/{recording_id}/{os.path.basename(filepath)}"
+
+
+def build_s3_url(bucket: str, s3_key: str) -> str:
+    """
+    Build the public URL of an S3 object.
+    
+    Args:
+        bucket: Bucket name
+        s3_key: Object key
+    
+    Returns:
+        Virtual-hosted-style S3 URL
+    """
+    return f"https://{bucket}.s3.{settings.aws_region}.amazonaws.com/{s3_key}"
+
+
+# Shared S3 client and the settings it was built from. boto3 clients are
+# thread-safe once created; only construction is guarded by the lock.
+_s3_client = None
+_s3_client_key: Optional[tuple] = None
+_s3_client_lock = threading.Lock()
+
+
+def _client_settings_key() -> tuple:
+    return (
+        settings.aws_access_key_id,
+        settings.aws_secret_access_key,
+        settings.aws_region,
+        settings.s3_max_pool_connections,
+        settings.s3_retry_mode,
+        settings.s3_max_attempts
+    )
 
 
 def get_s3_client():
     """
     Get configured S3 client.
     
+    The client is built once and shared by uploads, deletes and presigning,
+    so endpoint data, the credential chain and the connection pool are not
+    rebuilt per call. It is rebuilt if the relevant settings change.
+    
     Returns:
         boto3 S3 client
     """
+    global _s3_client, _s3_client_key
+    
     if not settings.aws_access_key_id or not settings.aws_secret_access_key:
         raise ValueError("AWS credentials not configured")
     
-    return boto3.client(
-        's3',
-        aws_access_key_id=settings.aws_access_key_id,
-        aws_secret_access_key=settings.aws_secret_access_key,
-        region_name=settings.aws_region
-    )
+    key = _client_settings_key()
+    client = _s3_client
+    if client is not None and _s3_client_key == key:
+        return client
+    
+    with _s3_client_lock:
+        if _s3_client is None or _s3_client_key != key:
+            # Sessions are not thread-safe, so each build gets its own
+            session = boto3.session.Session(
+                aws_access_key_id=settings.aws_access_key_id,
+                aws_secret_access_key=settings.aws_secret_access_key,
+                region_name=settings.aws_region
+            )
+            _s3_client = session.client(
+                's3',
+                config=Config(
+                    max_pool_connections=settings.s3_max_pool_connections,
+                    retries={
+                        'mode': settings.s3_retry_mode,
+                        'max_attempts': settings.s3_max_attempts
+                    }
+                )
+            )
+            _s3_client_key = key
+        return _s3_client
+
+
+def reset_s3_client() -> None:
+    """Drop the shared S3 client so the next call builds a new one."""
+    global _s3_client, _s3_client_key
+    with _s3_client_lock:
+        _s3_client = None
+        _s3_client_key = None
 
 
 async def upload_recording_to_s3(
     filepath: str,
     recording_id: str,
-    bucket_name: Optional[str] = None
+    bucket_name: Optional[str] = None,
+    progress: Optional[UploadProgress] = None,
+    s3_key: Optional[str] = None
 ) -> Dict[str, str]:
     """
     Upload a recording file to S3.
     
+    The transfer runs on a bounded thread pool with multipart settings from
+    ``get_transfer_config``, so the event loop keeps serving requests.
+    
     Args:
         filepath: Local file path to upload
         recording_id: The recording ID (used for S3 key)
         bucket_name: Optional bucket name (uses config default if not provided)
+        progress: Optional byte-progress callback
+        s3_key: Optional object key (defaults to ``build_s3_key``)
     
     Returns:
         Upload result with S3 URL and key
@@ -48,27 +200,34 @@ async def upload_recording_to_s3(
         raise ValueError("S3 bucket name not configured")
     
     # Generate S3 key
-    filename = os.path.basename(filepath)
-    s3_key = f"recordings/{recording_id}/{filename}"
+    s3_key = s3_key or build_s3_key(recording_id, filepath)
+    content_type = 'video/x-matroska' if filepath.endswith('.mkv') else 'video/webm'
+    size = os.path.getsize(filepath)
     
     try:
         s3_client = get_s3_client()
         
-        # Upload file
-        s3_client.upload_file(
-            filepath,
-            bucket,
-            s3_key,
-            ExtraArgs={
-                'ContentType': 'video/webm',
-                'Metadata': {
-                    'recording-id': recording_id
-                }
-            }
+        # Upload file off the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            _upload_executor,
+            lambda: s3_client.upload_file(
+                filepath,
+                bucket,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': content_type,
+                    'Metadata': {
+                        'recording-id': recording_id
+                    }
+                },
+                Callback=progress,
+                Config=get_transfer_config()
+            )
         )
+        S3_UPLOADED_BYTES.inc(size)
         
         # Generate URL
-        s3_url = f"https://{bucket}.s3.{settings.aws_region}.amazonaws.com/{s3_key}"
+        s3_url = build_s3_url(bucket, s3_key)
         
         return {
             "recording_id": recording_id,
@@ -78,6 +237,47 @@ async def upload_recording_to_s3(
             "status": "uploaded"
         }
     
+    except ClientError as e:
+        S3_UPLOAD_FAILURES.inc()
+        raise Exception(f"Failed to upload to S3: {str(e)}")
+    except Exception:
+        S3_UPLOAD_FAILURES.inc()
+        raise
+
+
+async def put_json_to_s3(
+    payload: Dict,
+    s3_key: str,
+    bucket_name: Optional[str] = None
+) -> str:
+    """
+    Write a small JSON document (e.g. a segment manifest) to S3.
+    
+    Args:
+        payload: JSON-serializable document
+        s3_key: The S3 object key
+        bucket_name: Optional bucket name (uses config default if not provided)
+    
+    Returns:
+        S3 URL of the object
+    """
+    bucket = bucket_name or settings.s3_bucket_name
+    if not bucket:
+        raise ValueError("S3 bucket name not configured")
+    
+    body = json.dumps(payload).encode()
+    try:
+        s3_client = get_s3_client()
+        await asyncio.get_running_loop().run_in_executor(
+            _upload_executor,
+            lambda: s3_client.put_object(
+                Bucket=bucket,
+                Key=s3_key,
+                Body=body,
+                ContentType='application/json'
+            )
+        )
+        return build_s3_url(bucket, s3_key)
     except ClientError as e:
         raise Exception(f"Failed to upload to S3: {str(e)}")
 
@@ -102,7 +302,10 @@ async def delete_recording_from_s3(
     
     try:
         s3_client = get_s3_client()
-        s3_client.delete_object(Bucket=bucket, Key=s3_key)
+        await asyncio.get_running_loop().run_in_executor(
+            _upload_executor,
+            lambda: s3_client.delete_object(Bucket=bucket, Key=s3_key)
+        )
         return True
     except ClientError as e:
         raise Exception(f"Failed to delete from S3: {str(e)}")
@@ -140,3 +343,6 @@ async def get_s3_presigned_url(
         raise Exception(f"Failed to generate presigned URL: {str(e)}")
 
 
+def shutdown_upload_executor() -> None:
+    """Stop accepting uploads and drop queued ones (called on application shutdown)."""
+    _upload_executor.shutdown(wait=False, cancel_futures=True)
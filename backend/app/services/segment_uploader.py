@@ -0,0 +1,186 @@
+"""Streaming upload of recording segments while FFmpeg is still writing.
+
+In segmented mode FFmpeg's segment muxer closes a self-contained file every
+``recording_segment_seconds`` and appends its name to a segment list. The
+uploader follows that list, pushes each finished segment to S3 as its own
+object, deletes it locally, and writes a manifest once the recorder exits.
+A failed segment is retried with exponential backoff (doubling up to
+``max_backoff`` seconds) rather than on every poll.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.s3_service import put_json_to_s3, upload_recording_to_s3
+
+
+logger = logging.getLogger(__name__)
+
+# Receives partial updates for the recording's ``upload`` status
+StatusCallback = Callable[[Dict[str, Any]], None]
+
+
+class SegmentUploader:
+    """Follows an FFmpeg segment list and uploads finished segments."""
+
+    def __init__(
+        self,
+        recording_id: str,
+        segment_dir: str,
+        list_path: str,
+        bucket: str,
+        on_status: StatusCallback,
+        poll_interval: float = 1.0,
+        max_attempts: int = 5,
+        max_backoff: float = 30.0
+    ):
+        self.recording_id = recording_id
+        self.segment_dir = segment_dir
+        self.list_path = list_path
+        self.bucket = bucket
+        self.on_status = on_status
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.key_prefix = f"recordings/{recording_id}"
+        self.segments: List[Dict[str, Any]] = []
+        self.bytes_uploaded = 0
+        self._processed = 0
+        self._attempts = 0
+        self._retry_at = 0.0  # monotonic time before which a failed segment is not retried
+        self._finishing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def finish(self) -> None:
+        """Upload the remaining segments and the manifest, then return."""
+        self._finishing.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def _finished_segments(self) -> List[str]:
+        try:
+            with open(self.list_path) as segment_list:
+                return [line.strip() for line in segment_list if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    async def _upload_pending(self) -> bool:
+        """Upload segments listed since the last call; False if one failed."""
+        names = self._finished_segments()
+        while self._processed < len(names):
+            name = names[self._processed]
+            path = os.path.join(self.segment_dir, name)
+            s3_key = f"{self.key_prefix}/segments/{name}"
+            try:
+                size = os.path.getsize(path)
+                await upload_recording_to_s3(path, self.recording_id, self.bucket, s3_key=s3_key)
+            except Exception as e:
+                self._attempts += 1
+                self._retry_at = time.monotonic() + min(2 ** self._attempts, self.max_backoff)
+                logger.warning("Segment upload failed for %s: %s", path, e)
+                self.on_status({"error": str(e)})
+                return False
+
+            os.remove(path)
+            self._attempts = 0
+            self._processed += 1
+            self.bytes_uploaded += size
+            self.segments.append({"index": len(self.segments), "s3_key": s3_key, "bytes": size})
+            self.on_status({
+                "segments_uploaded": len(self.segments),
+                "bytes_uploaded": self.bytes_uploaded,
+                "error": None
+            })
+        return True
+
+    async def _run(self) -> None:
+        self.on_status({"status": "streaming"})
+        while not self._finishing.is_set():
+            if time.monotonic() >= self._retry_at:
+                await self._upload_pending()
+            try:
+                await asyncio.wait_for(self._finishing.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        # The recorder has exited, so the list now includes the last segment
+        while True:
+            await asyncio.sleep(max(0.0, self._retry_at - time.monotonic()))
+            if await self._upload_pending():
+                break
+            if self._attempts >= self.max_attempts:
+                self.on_status({"status": "failed", "finished_at": datetime.now().isoformat()})
+                return
+
+        manifest_key = f"{self.key_prefix}/manifest.json"
+        try:
+            manifest_url = await put_json_to_s3(
+                {"recording_id": self.recording_id, "segments": self.segments},
+                manifest_key,
+                self.bucket
+            )
+        except Exception as e:
+            self.on_status({"status": "failed", "error": str(e), "finished_at": datetime.now().isoformat()})
+            return
+
+        self.on_status({
+            "status": "uploaded",
+            "s3_key": manifest_key,
+            "s3_url": manifest_url,
+            "finished_at": datetime.now().isoformat()
+        })
+
+
+# Uploaders running in this worker, keyed by recording_id
+_uploaders: Dict[str, SegmentUploader] = {}
+
+
+def start_segment_upload(
+    recording_id: str,
+    segment_dir: str,
+    list_path: str,
+    bucket: str,
+    on_status: StatusCallback,
+    poll_interval: float = 1.0
+) -> SegmentUploader:
+    """
+    Start following a recording's segment list.
+
+    Args:
+        recording_id: The recording ID
+        segment_dir: Directory FFmpeg writes segments into
+        list_path: FFmpeg ``-segment_list`` file
+        bucket: Destination bucket
+        on_status: Receives partial ``upload`` status updates
+        poll_interval: Seconds between segment list checks
+
+    Returns:
+        The running SegmentUploader
+    """
+    uploader = SegmentUploader(recording_id, segment_dir, list_path, bucket, on_status, poll_interval)
+    _uploaders[recording_id] = uploader
+    uploader.start()
+    return uploader
+
+
+async def finish_segment_upload(recording_id: str) -> None:
+    """
+    Flush a recording's remaining segments (no-op if not owned by this worker).
+
+    Args:
+        recording_id: The recording ID
+    """
+    uploader = _uploaders.pop(recording_id, None)
+    if uploader is not None:
+        await uploader.finish()
+
+
+async def finish_all_segment_uploads() -> None:
+    """Flush every uploader in this worker (called on application shutdown)."""
+    await asyncio.gather(*(finish_segment_upload(rid) for rid in list(_uploaders)))
@@ -0,0 +1,339 @@
+"""Pool of mediasoup SFU nodes with load-aware room placement.
+
+Nodes come from ``MEDIASOUP_NODES`` (or the single ``MEDIASOUP_HOST``/
+``MEDIASOUP_PORT`` node), each with its own pooled ``MediasoupClient``.
+Every node's ``/api/stats`` is polled in the background; a new room goes to
+the healthy, non-draining node with the lowest load score (routers and
+transports per worker, plus CPU). Placements are added to the node's
+counts right away so a burst of rooms spreads out between polls.
+
+A router lives on the node that created it, so the router-to-node pin is
+kept in the state store and every later call for the router goes there.
+Draining is set on the SFU itself (``POST /api/drain``) and read back by
+every API worker's poll: draining nodes get no new rooms while their
+current rooms finish.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import orjson
+
+from config import settings
+from app.services.mediasoup_client import MediasoupClient
+from app.services.state_store import get_state_store
+
+
+logger = logging.getLogger(__name__)
+
+SFU_ROUTERS = "sfu_routers"
+
+# Pins cached per worker; routers closed by other workers are never
+# unpinned here, so the least recently used pins are dropped past this
+MAX_CACHED_PINS = 10000
+
+
+class SFUNode:
+    """One mediasoup server, its client and its last reported load."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.node_id = urlparse(self.base_url).netloc
+        self.client = MediasoupClient(base_url=self.base_url)
+        self.healthy = True
+        self.draining = False
+        self.failures = 0
+        self.workers = 1
+        self.routers = 0
+        self.transports = 0
+        self.cpu_load = 0.0
+        self.worker_stats: List[Dict[str, Any]] = []
+        self.last_checked: Optional[float] = None
+        self.placed = 0
+
+    @property
+    def accepts_rooms(self) -> bool:
+        return self.healthy and not self.draining
+
+    def load_score(self, cpu_weight: float) -> float:
+        """Routers and transports per worker, plus CPU load scaled by ``cpu_weight``."""
+        return (self.routers + self.transports) / max(self.workers, 1) + self.cpu_load * cpu_weight
+
+    def apply_stats(self, stats: Dict[str, Any]) -> None:
+        self.workers = stats.get("workers") or 1
+        self.routers = stats.get("routers", 0)
+        self.transports = stats.get("transports", 0)
+        # Mean mediasoup worker CPU when reported, else the host load average
+        self.cpu_load = stats.get("workers_cpu", stats.get("cpu_load", 0.0))
+        self.worker_stats = stats.get("worker_stats", [])
+        self.draining = bool(stats.get("draining", False))
+
+    def get_stats(self, cpu_weight: float) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "base_url": self.base_url,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "failures": self.failures,
+            "workers": self.workers,
+            "routers": self.routers,
+            "transports": self.transports,
+            "cpu_load": self.cpu_load,
+            "worker_stats": self.worker_stats,
+            "load_score": self.load_score(cpu_weight),
+            "placed": self.placed,
+            "last_checked": self.last_checked,
+            "pool": self.client.get_pool_stats()
+        }
+
+
+class SFUCluster:
+    """
+    Places rooms on SFU nodes and routes router calls to their node.
+
+    Routers without a pin (created before the cluster was configured) are
+    assumed to live on the first node.
+    """
+
+    def __init__(
+        self,
+        base_urls: List[str],
+        health_interval: float,
+        unhealthy_after: int,
+        cpu_weight: float
+    ):
+        if not base_urls:
+            raise ValueError("At least one SFU node is required")
+        self.nodes: Dict[str, SFUNode] = {}
+        for base_url in base_urls:
+            node = SFUNode(base_url)
+            self.nodes[node.node_id] = node
+        self.default_node = next(iter(self.nodes.values()))
+        self.health_interval = health_interval
+        self.unhealthy_after = unhealthy_after
+        self.cpu_weight = cpu_weight
+        # router_id -> node, least recently used first; pins never change,
+        # so entries read from the state store stay valid while cached
+        self._router_nodes: "OrderedDict[str, SFUNode]" = OrderedDict()
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Open node clients, poll every node once and start health checks."""
+        for node in self.nodes.values():
+            await node.client.start()
+        await self.check_all()
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        """Stop health checks and close node clients."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        for node in self.nodes.values():
+            await node.client.close()
+
+    # Health
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_all()
+
+    async def check_all(self) -> None:
+        """Poll every node's load concurrently."""
+        await asyncio.gather(*(self.check(node) for node in self.nodes.values()))
+
+    async def check(self, node: SFUNode) -> bool:
+        """
+        Poll a node's ``/api/stats`` and update its health and load.
+
+        Args:
+            node: The node
+
+        Returns:
+            Whether the node answered
+        """
+        try:
+            response = await node.client.request("GET", "/api/stats")
+            if response.status == 404:
+                # SFU without load reporting: liveness only, counts stay local
+                response = await node.client.request("GET", "/api/health")
+                ok = response.status == 200
+            else:
+                ok = response.status == 200
+                if ok:
+                    node.apply_stats(await response.json(loads=orjson.loads))
+        except Exception as e:
+            logger.debug("SFU node %s health check failed: %s", node.node_id, e)
+            ok = False
+
+        node.last_checked = time.time()
+        if ok:
+            if not node.healthy:
+                logger.info("SFU node %s is healthy again", node.node_id)
+            node.failures = 0
+            node.healthy = True
+        else:
+            node.failures += 1
+            if node.healthy and node.failures >= self.unhealthy_after:
+                logger.warning("SFU node %s marked unhealthy after %d failed checks", node.node_id, node.failures)
+                node.healthy = False
+        return ok
+
+    async def set_draining(self, node_id: str, draining: bool = True) -> Dict[str, Any]:
+        """
+        Drain a node (or undo it) on the SFU, so every API worker sees it.
+
+        Args:
+            node_id: The node ID (``host:port``)
+            draining: False to accept new rooms again
+
+        Returns:
+            The node's stats after the change
+        """
+        node = self.get_node(node_id)
+        response = await node.client.request("POST", "/api/drain", {"draining": draining})
+        if response.status != 200:
+            raise Exception(f"Failed to drain SFU node {node_id}: {response.status}")
+        node.apply_stats(await response.json(loads=orjson.loads))
+        logger.info("SFU node %s %s", node_id, "draining" if node.draining else "accepting rooms")
+        return node.get_stats(self.cpu_weight)
+
+    # Placement
+
+    def get_node(self, node_id: str) -> SFUNode:
+        node = self.nodes.get(node_id)
+        if node is None:
+            raise ValueError(f"Unknown SFU node: {node_id}")
+        return node
+
+    def place(self, transports: int = 0) -> SFUNode:
+        """
+        Choose the node for a new router.
+
+        Args:
+            transports: Transports about to be created with the router
+
+        Returns:
+            The least loaded node accepting rooms
+        """
+        candidates = [node for node in self.nodes.values() if node.accepts_rooms]
+        if not candidates:
+            raise Exception("No SFU node is accepting rooms")
+        node = min(candidates, key=lambda candidate: candidate.load_score(self.cpu_weight))
+        # Counted until the next poll reports the real numbers
+        node.routers += 1
+        node.transports += transports
+        node.placed += 1
+        return node
+
+    def pin(self, router_id: str, node: SFUNode) -> None:
+        """Record that a router lives on ``node``."""
+        self._cache_pin(router_id, node)
+        get_state_store().put(SFU_ROUTERS, router_id, {"node_id": node.node_id})
+
+    def unpin(self, router_id: str) -> None:
+        """Forget a closed router's node."""
+        self._router_nodes.pop(router_id, None)
+        get_state_store().delete(SFU_ROUTERS, router_id)
+
+    def node_for_router(self, router_id: str) -> SFUNode:
+        """
+        Get the node a router lives on.
+
+        Args:
+            router_id: The router ID
+
+        Returns:
+            The pinned node (the first node for routers without a pin)
+        """
+        node = self._router_nodes.get(router_id)
+        if node is not None:
+            self._router_nodes.move_to_end(router_id)
+            return node
+
+        # Pinned by another API worker
+        entry = get_state_store().get(SFU_ROUTERS, router_id)
+        if entry is None:
+            return self.default_node
+        node = self.get_node(entry["node_id"])
+        self._cache_pin(router_id, node)
+        return node
+
+    def _cache_pin(self, router_id: str, node: SFUNode) -> None:
+        self._router_nodes[router_id] = node
+        self._router_nodes.move_to_end(router_id)
+        while len(self._router_nodes) > MAX_CACHED_PINS:
+            self._router_nodes.popitem(last=False)
+
+    def client_for(self, router_id: str) -> MediasoupClient:
+        return self.node_for_router(router_id).client
+
+    def accepts_rooms(self, router_id: str) -> bool:
+        """Whether a router's node may still take new rooms (for pooled routers)."""
+        return self.node_for_router(router_id).accepts_rooms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Report every node's health, load and connection pool.
+
+        Returns:
+            Per-node stats and the number of nodes accepting rooms
+        """
+        return {
+            "nodes": [node.get_stats(self.cpu_weight) for node in self.nodes.values()],
+            "accepting_rooms": sum(1 for node in self.nodes.values() if node.accepts_rooms),
+            "cached_pins": len(self._router_nodes)
+        }
+
+
+def _node_urls() -> List[str]:
+    if settings.mediasoup_nodes.strip():
+        return [url.strip() for url in settings.mediasoup_nodes.split(",") if url.strip()]
+    return [f"{settings.mediasoup_protocol}://{settings.mediasoup_host}:{settings.mediasoup_port}"]
+
+
+_cluster: Optional[SFUCluster] = None
+
+
+def get_sfu_cluster() -> SFUCluster:
+    """
+    Get the SFU cluster, creating it lazily if needed.
+
+    Returns:
+        The process-wide SFUCluster
+    """
+    global _cluster
+    if _cluster is None:
+        _cluster = SFUCluster(
+            _node_urls(),
+            health_interval=settings.sfu_health_interval,
+            unhealthy_after=settings.sfu_unhealthy_after,
+            cpu_weight=settings.sfu_cpu_weight
+        )
+    return _cluster
+
+
+async def start_sfu_cluster() -> SFUCluster:
+    """
+    Open node clients and start health checks (called on application startup).
+
+    Returns:
+        The started SFUCluster
+    """
+    cluster = get_sfu_cluster()
+    await cluster.start()
+    return cluster
+
+
+async def stop_sfu_cluster() -> None:
+    """Stop health checks and close node clients (called on shutdown)."""
+    global _cluster
+    if _cluster is not None:
+        await _cluster.stop()
+        _cluster = None
@@ -0,0 +1,452 @@
+"""WebSocket signaling for call participants.
+
+One socket per participant multiplexes the call operations as
+request/response messages and carries server-pushed room events:
+
+    -> {"id": 1, "method": "join", "params": {"room_id": "..."}}
+    <- {"id": 1, "ok": true, "data": {...}}
+    <- {"event": "newProducer", "data": {"user_id": "...", "producer_id": "...", "kind": "video"}}
+
+Methods: ``create``, ``join``, ``connectTransport``, ``produce``,
+``produceMany``, ``consume``, ``consumeAll``, ``getProducers`` and
+``leave``. Events: ``peerJoined``,
+``newProducer`` and ``peerLeft``. Requests on one socket run
+concurrently, up to ``signaling_max_inflight`` at a time (further
+requests are answered with an error); match responses by ``id``.
+Closing the socket leaves the room; while it is open the session keeps
+the participant's ``last_seen`` fresh, so the idle room reaper leaves it
+alone.
+
+Sockets are tracked per API worker. With the shared (SQLite) state
+backend every event is also appended to a short per-room log in the state
+store, which each worker polls for the rooms its sockets are in, so peers
+connected to other workers receive it too.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+from fastapi import WebSocket, WebSocketDisconnect
+
+from config import settings
+from app.services.call_manager import (
+    create_call_room,
+    join_call_room,
+    leave_call_room,
+    add_producer_to_call,
+    add_producers_to_call,
+    add_consumer_to_call,
+    consume_remote_producers,
+    get_remote_producers,
+    touch_participant,
+    get_call_info
+)
+from app.services.mediasoup_client import connect_transport
+from app.services.state_store import get_state_store
+
+
+logger = logging.getLogger(__name__)
+
+# room_id -> {"seq": last seq, "events": [{"seq", "event", "data", "exclude", "origin"}]}
+SIGNALING_EVENTS = "signaling_events"
+
+
+def _dumps(message: Dict[str, Any]) -> str:
+    return orjson.dumps(message).decode()
+
+
+class SignalingHub:
+    """
+    Open signaling sockets by room and user, for pushing events.
+
+    When ``shared`` is set, events are also exchanged with other API workers
+    through the state store (see the module docstring).
+    """
+
+    def __init__(self, shared: bool = False, poll_interval: float = 0.1, backlog: int = 256):
+        self._rooms: Dict[str, Dict[str, "SignalingSession"]] = {}
+        self.shared = shared
+        self.poll_interval = poll_interval
+        self.backlog = backlog
+        self._origin = os.getpid()
+        # room_id -> seq of the last shared event seen by this worker
+        self._cursors: Dict[str, int] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start polling for other workers' events (shared mode only)."""
+        if self.shared and self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            await asyncio.gather(self._poll_task, return_exceptions=True)
+            self._poll_task = None
+
+    def attach(self, room_id: str, session: "SignalingSession") -> None:
+        if room_id not in self._rooms and self.shared:
+            # Only events published from now on are delivered
+            log = get_state_store().get(SIGNALING_EVENTS, room_id)
+            self._cursors[room_id] = log["seq"] if log else 0
+        self._rooms.setdefault(room_id, {})[session.user_id] = session
+
+    def detach(self, room_id: str, session: "SignalingSession") -> None:
+        sessions = self._rooms.get(room_id)
+        if sessions and sessions.get(session.user_id) is session:
+            del sessions[session.user_id]
+            if not sessions:
+                del self._rooms[room_id]
+                self._cursors.pop(room_id, None)
+
+    async def publish(
+        self,
+        room_id: str,
+        event: str,
+        data: Dict[str, Any],
+        exclude: Optional[str] = None
+    ) -> None:
+        """
+        Push an event to every socket in a room.
+
+        Args:
+            room_id: The call room ID
+            event: Event name
+            data: Event payload
+            exclude: User ID not to notify (usually the originator)
+        """
+        if self.shared:
+            self._append(room_id, event, data, exclude)
+        await self._deliver(room_id, event, data, exclude)
+
+    async def _deliver(
+        self,
+        room_id: str,
+        event: str,
+        data: Dict[str, Any],
+        exclude: Optional[str]
+    ) -> None:
+        sessions = [
+            session for user_id, session in self._rooms.get(room_id, {}).items()
+            if user_id != exclude
+        ]
+        if sessions:
+            text = _dumps({"event": event, "data": data})
+            await asyncio.gather(*(session.send_text(text) for session in sessions))
+
+    def _append(self, room_id: str, event: str, data: Dict[str, Any], exclude: Optional[str]) -> None:
+        if get_call_info(room_id) is None:
+            # The room has ended; nobody on another worker is left to notify
+            self.drop_room(room_id)
+            return
+
+        def append(log):
+            log = log or {"seq": 0, "events": []}
+            log["seq"] += 1
+            entry = {"seq": log["seq"], "event": event, "data": data, "exclude": exclude, "origin": self._origin}
+            log["events"] = log["events"][-(self.backlog - 1):] + [entry]
+            return log, None
+
+        get_state_store().update(SIGNALING_EVENTS, room_id, append)
+
+    def drop_room(self, room_id: str) -> None:
+        """Delete an ended room's shared event log."""
+        if self.shared:
+            get_state_store().delete(SIGNALING_EVENTS, room_id)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for room_id in list(self._rooms):
+                try:
+                    await self._pull(room_id)
+                except Exception as e:
+                    logger.warning("Reading signaling events for %s failed: %s", room_id, e)
+
+    async def _pull(self, room_id: str) -> None:
+        """Deliver events other workers published in a room since the last poll."""
+        log = get_state_store().get(SIGNALING_EVENTS, room_id)
+        if log is None or room_id not in self._rooms:
+            return
+        cursor = self._cursors.get(room_id, 0)
+        if log["seq"] < cursor:
+            cursor = 0  # the log was dropped and started over
+        self._cursors[room_id] = log["seq"]
+        for entry in log["events"]:
+            if entry["seq"] > cursor and entry["origin"] != self._origin:
+                await self._deliver(room_id, entry["event"], entry["data"], entry["exclude"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rooms": len(self._rooms),
+            "sockets": sum(len(sessions) for sessions in self._rooms.values()),
+            "shared": self.shared
+        }
+
+
+_hub = SignalingHub(
+    shared=settings.state_backend.lower() == "sqlite",
+    poll_interval=settings.signaling_poll_interval,
+    backlog=settings.signaling_event_backlog
+)
+
+
+def get_signaling_hub() -> SignalingHub:
+    """
+    Get this worker's signaling hub.
+
+    Returns:
+        The SignalingHub
+    """
+    return _hub
+
+
+async def start_signaling_hub() -> SignalingHub:
+    """
+    Start exchanging events with other workers (called on application startup).
+
+    Returns:
+        The started SignalingHub
+    """
+    _hub.start()
+    return _hub
+
+
+async def stop_signaling_hub() -> None:
+    """Stop polling for other workers' events (called on shutdown)."""
+    await _hub.stop()
+
+
+class SignalingSession:
+    """One participant's signaling socket."""
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.room_id: Optional[str] = None
+        self.router_id: Optional[str] = None
+        self._send_lock = asyncio.Lock()
+        self._room_lock = asyncio.Lock()  # serializes create/join/leave
+        self._tasks = set()
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+            "create": self._create,
+            "join": self._join,
+            "connectTransport": self._connect_transport,
+            "produce": self._produce,
+            "produceMany": self._produce_many,
+            "consume": self._consume,
+            "consumeAll": self._consume_all,
+            "getProducers": self._get_producers,
+            "leave": self._leave
+        }
+
+    async def send_text(self, text: str) -> None:
+        async with self._send_lock:
+            try:
+                await self.websocket.send_text(text)
+            except Exception as e:
+                logger.debug("Dropping signaling message for %s: %s", self.user_id, e)
+
+    def _require_room(self) -> str:
+        if self.room_id is None:
+            raise ValueError("Not in a call room; send create or join first")
+        return self.room_id
+
+    def _enter(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Bind the session to the room it created or joined."""
+        self.room_id = result["room_id"]
+        self.router_id = result["router_id"]
+        _hub.attach(self.room_id, self)
+        if settings.room_idle_timeout > 0:
+            self._keepalive_task = asyncio.create_task(self._keepalive(self.room_id))
+        return result
+
+    def _stop_keepalive(self) -> None:
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+
+    async def _keepalive(self, room_id: str) -> None:
+        while True:
+            await asyncio.sleep(settings.room_idle_timeout / 3)
+            try:
+                touch_participant(room_id, self.user_id)
+            except ValueError:
+                return  # removed from the room (e.g. left via REST)
+            except Exception as e:
+                logger.warning("Signaling keepalive for %s failed: %s", self.user_id, e)
+
+    async def _create(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._room_lock:
+            if self.room_id is not None:
+                raise ValueError("Already in a call room")
+            return self._enter(await create_call_room(self.user_id))
+
+    async def _join(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._room_lock:
+            if self.room_id is not None:
+                raise ValueError("Already in a call room")
+            result = self._enter(await join_call_room(params["room_id"], self.user_id))
+        await _hub.publish(result["room_id"], "peerJoined", {"user_id": self.user_id}, exclude=self.user_id)
+        return result
+
+    async def _connect_transport(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._require_room()
+        await connect_transport(self.router_id, params["transport_id"], params["dtls_parameters"])
+        return {"status": "connected", "transport_id": params["transport_id"]}
+
+    async def _produce(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        room_id = self._require_room()
+        producer = await add_producer_to_call(
+            room_id,
+            self.user_id,
+            params["transport_id"],
+            params["rtp_parameters"],
+            params["kind"]
+        )
+        await _hub.publish(room_id, "newProducer", {
+            "user_id": self.user_id,
+            "producer_id": producer.get("producer_id"),
+            "kind": producer.get("kind")
+        }, exclude=self.user_id)
+        return {"producer_id": producer.get("producer_id"), "kind": params["kind"], "status": "created"}
+
+    async def _produce_many(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        room_id = self._require_room()
+        producers = await add_producers_to_call(
+            room_id,
+            self.user_id,
+            params["transport_id"],
+            [
+                {"kind": producer["kind"], "rtp_parameters": producer["rtp_parameters"]}
+                for producer in params["producers"]
+            ]
+        )
+        created = [
+            {"producer_id": producer.get("producer_id"), "kind": producer.get("kind")}
+            for producer in producers
+        ]
+        for producer in created:
+            await _hub.publish(room_id, "newProducer", dict(producer, user_id=self.user_id), exclude=self.user_id)
+        return {"producers": created, "status": "created"}
+
+    async def _consume(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        consumer = await add_consumer_to_call(
+            self._require_room(),
+            self.user_id,
+            params["transport_id"],
+            params["producer_id"],
+            params["rtp_capabilities"]
+        )
+        return {
+            "consumer_id": consumer.get("consumer_id"),
+            "producer_id": params["producer_id"],
+            "kind": consumer.get("kind"),
+            "rtp_parameters": consumer.get("rtp_parameters"),
+            "status": "created"
+        }
+
+    async def _consume_all(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        result = await consume_remote_producers(
+            self._require_room(),
+            self.user_id,
+            params["transport_id"],
+            params["rtp_capabilities"]
+        )
+        return {
+            "consumers": [
+                {
+                    "consumer_id": consumer.get("consumer_id"),
+                    "producer_id": consumer.get("producer_id"),
+                    "kind": consumer.get("kind"),
+                    "rtp_parameters": consumer.get("rtp_parameters")
+                }
+                for consumer in result["consumers"]
+            ],
+            "skipped": result["skipped"],
+            "status": "created"
+        }
+
+    async def _get_producers(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"producers": get_remote_producers(self._require_room(), self.user_id)}
+
+    async def _leave(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._room_lock:
+            room_id = self._require_room()
+            _hub.detach(room_id, self)
+            self._stop_keepalive()
+            self.room_id = None
+            self.router_id = None
+            await leave_call_room(room_id, self.user_id)
+        await _hub.publish(room_id, "peerLeft", {"user_id": self.user_id})
+        return {"status": "left", "room_id": room_id}
+
+    def _render(self, request_id: Any, data: Dict[str, Any]) -> str:
+        # Create/join carry the cached capabilities JSON; embed it as-is
+        capabilities_json = data.pop("rtp_capabilities_json", None)
+        if capabilities_json is not None:
+            data["rtp_capabilities"] = orjson.Fragment(capabilities_json)
+        return _dumps({"id": request_id, "ok": True, "data": data})
+
+    async def _dispatch(self, message: Dict[str, Any]) -> None:
+        request_id = message.get("id")
+        handler = self._handlers.get(message.get("method"))
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown method: {message.get('method')}")
+            data = await handler(message.get("params") or {})
+            text = self._render(request_id, data)
+        except KeyError as e:
+            text = _dumps({"id": request_id, "ok": False, "error": f"Missing parameter: {e.args[0]}"})
+        except Exception as e:
+            text = _dumps({"id": request_id, "ok": False, "error": str(e)})
+        await self.send_text(text)
+
+    async def run(self) -> None:
+        """Serve the socket until the client disconnects, then leave the room."""
+        await self.websocket.accept()
+        try:
+            while True:
+                try:
+                    message = orjson.loads(await self.websocket.receive_text())
+                except (ValueError, TypeError):
+                    await self.send_text(_dumps({"id": None, "ok": False, "error": "Invalid JSON"}))
+                    continue
+                if not isinstance(message, dict):
+                    await self.send_text(_dumps({"id": None, "ok": False, "error": "Expected an object"}))
+                    continue
+                if len(self._tasks) >= settings.signaling_max_inflight:
+                    await self.send_text(_dumps({
+                        "id": message.get("id"),
+                        "ok": False,
+                        "error": f"Too many requests in flight (max {settings.signaling_max_inflight})"
+                    }))
+                    continue
+                task = asyncio.create_task(self._dispatch(message))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Let in-flight operations finish (their replies are dropped) so
+            # the room state is consistent before leaving
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            if self.room_id is not None:
+                try:
+                    await self._leave({})
+                except Exception as e:
+                    logger.warning("Leaving %s on disconnect failed: %s", self.room_id, e)
+
+
+async def serve_signaling(websocket: WebSocket, user_id: str) -> None:
+    """
+    Run a participant's signaling session until the socket closes.
+
+    Args:
+        websocket: The incoming WebSocket
+        user_id: The participant's user ID
+    """
+    await SignalingSession(websocket, user_id).run()
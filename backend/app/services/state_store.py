@@ -0,0 +1,245 @@
+"""Pluggable storage for call and recording state.
+
+``memory`` keeps state in process (single worker only). ``sqlite`` keeps it
+in a WAL-mode SQLite database so several uvicorn workers on the same host
+share rooms and recordings; read-modify-write updates run inside
+``BEGIN IMMEDIATE`` transactions, which serialize writers across processes.
+A writer waits at most ``settings.sqlite_busy_timeout`` for the lock (the
+wait blocks the event loop) and then fails with ``sqlite3.OperationalError``.
+
+A namespace can hold record objects instead of dicts (see
+``register_record_type``): the memory backend keeps the objects, the
+SQLite backend stores ``to_dict()`` and rebuilds them with ``from_dict()``.
+"""
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+
+# A mutator receives the current value (or None) and returns
+# ``(new_value, result)``; a new_value of None deletes the key.
+Mutator = Callable[[Optional[Dict[str, Any]]], Tuple[Optional[Dict[str, Any]], Any]]
+
+# Namespace -> record class with ``to_dict()``/``from_dict()``
+_record_types: Dict[str, Any] = {}
+
+
+def register_record_type(namespace: str, record_type: Any) -> None:
+    """
+    Store a namespace's values as records of ``record_type``.
+
+    Args:
+        namespace: The namespace
+        record_type: Class providing ``to_dict()`` and ``from_dict()``
+    """
+    _record_types[namespace] = record_type
+
+
+def _encode(namespace: str, value: Any) -> str:
+    return json.dumps(value.to_dict() if namespace in _record_types else value)
+
+
+def _decode(namespace: str, text: str) -> Any:
+    record_type = _record_types.get(namespace)
+    data = json.loads(text)
+    return record_type.from_dict(data) if record_type is not None else data
+
+
+class StateStore(ABC):
+    """Key/value store of JSON-serializable dicts grouped by namespace."""
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def put(self, namespace: str, key: str, value: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def values(self, namespace: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(self, namespace: str, key: str, mutator: Mutator) -> Any:
+        """
+        Atomically read, modify and write a single key.
+
+        Args:
+            namespace: The namespace
+            key: The key
+            mutator: Called with the current value (or None); returns
+                ``(new_value, result)``. Raising aborts without writing.
+
+        Returns:
+            The mutator's result
+        """
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """In-process store; values are held (and returned) by reference."""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+
+    def _ns(self, namespace: str) -> Dict[str, Dict[str, Any]]:
+        ns = self._data.get(namespace)
+        if ns is None:
+            ns = self._data.setdefault(namespace, {})
+        return ns
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        return self._ns(namespace).get(key)
+
+    def put(self, namespace: str, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._ns(namespace)[key] = value
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            return self._ns(namespace).pop(key, None) is not None
+
+    def values(self, namespace: str) -> List[Dict[str, Any]]:
+        return list(self._ns(namespace).values())
+
+    def update(self, namespace: str, key: str, mutator: Mutator) -> Any:
+        with self._lock:
+            ns = self._ns(namespace)
+            new_value, result = mutator(ns.get(key))
+            if new_value is None:
+                ns.pop(key, None)
+            else:
+                ns[key] = new_value
+            return result
+
+
+class SQLiteStateStore(StateStore):
+    """Shared store backed by SQLite in WAL mode."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path,
+            timeout=settings.sqlite_busy_timeout,  # waits on the event loop
+            isolation_level=None,  # explicit transactions only
+            check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        return _decode(namespace, row[0]) if row else None
+
+    def put(self, namespace: str, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value) VALUES (?, ?, ?)",
+                (namespace, key, _encode(namespace, value))
+            )
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM state WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            )
+        return cursor.rowcount > 0
+
+    def values(self, namespace: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value FROM state WHERE namespace = ?",
+                (namespace,)
+            ).fetchall()
+        return [_decode(namespace, row[0]) for row in rows]
+
+    def update(self, namespace: str, key: str, mutator: Mutator) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM state WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+                new_value, result = mutator(_decode(namespace, row[0]) if row else None)
+                if new_value is None:
+                    self._conn.execute(
+                        "DELETE FROM state WHERE namespace = ? AND key = ?",
+                        (namespace, key)
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO state (namespace, key, value) VALUES (?, ?, ?)",
+                        (namespace, key, _encode(namespace, new_value))
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[StateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """
+    Get the configured state store, creating it on first use.
+
+    Returns:
+        The process-wide StateStore for ``settings.state_backend``
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = settings.state_backend.lower()
+                if backend == "memory":
+                    _store = MemoryStateStore()
+                elif backend == "sqlite":
+                    _store = SQLiteStateStore(settings.state_db_path)
+                else:
+                    raise ValueError(f"Unknown state backend: {settings.state_backend}")
+    return _store
+
+
+def close_state_store() -> None:
+    """Close the state store (called on application shutdown)."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,179 @@
+"""Background S3 upload jobs for recordings.
+
+Uploads run on the durable job queue (``app/services/job_queue.py``), so
+they survive restarts and transient S3 failures are retried with backoff.
+Upload state lives under the recording's ``upload`` key in the state store,
+so ``GET /api/recording/{recording_id}`` reports progress from any worker.
+Recordings that are only in the catalog (e.g. after a restart with the
+memory backend) can still be uploaded; their final upload status is
+written to the catalog row.
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import settings
+from app.services.state_store import get_state_store
+from app.services.recording_service import RECORDINGS
+from app.services.recording_catalog import get_recording_catalog
+from app.services.job_queue import PermanentJobError, get_job_queue, register_job_handler
+from app.services.s3_service import (
+    UploadProgress,
+    build_s3_key,
+    build_s3_url,
+    upload_recording_to_s3
+)
+
+
+UPLOAD_JOB = "upload"
+
+
+def _set_upload_fields(recording_id: str, **fields: Any) -> None:
+    def apply(info):
+        if info is None or "upload" not in info:
+            return info, None
+        info["upload"].update(fields)
+        return info, None
+
+    get_state_store().update(RECORDINGS, recording_id, apply)
+
+
+def _finish_upload(recording_id: str, **fields: Any) -> None:
+    """Record a final upload status in the state store and the catalog."""
+    fields["finished_at"] = datetime.now().isoformat()
+
+    def apply(info):
+        if info is None:
+            return info, None
+        info.setdefault("upload", {}).update(fields)
+        return info, info
+
+    catalog = get_recording_catalog()
+    recording_info = get_state_store().update(RECORDINGS, recording_id, apply)
+    if recording_info is None:
+        # No longer in the state store; the catalog row is all that is left
+        recording_info = catalog.get(recording_id)
+        if recording_info is None:
+            return
+        recording_info.setdefault("upload", {}).update(fields)
+    catalog.upsert(recording_info)
+
+
+async def _run_upload(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: upload one recording file."""
+    payload = job["payload"]
+    recording_id = payload["recording_id"]
+    filepath = payload["filepath"]
+    if not os.path.exists(filepath):
+        _finish_upload(recording_id, status="failed", error=f"Recording file not found: {filepath}")
+        raise PermanentJobError(f"Recording file not found: {filepath}")
+
+    def on_progress(uploaded: int, total: int) -> None:
+        # Called from boto3 transfer threads; the state store is thread-safe
+        _set_upload_fields(recording_id, bytes_uploaded=uploaded, bytes_total=total)
+
+    progress = UploadProgress(os.path.getsize(filepath), on_progress)
+    _set_upload_fields(recording_id, status="uploading", attempts=job["attempts"])
+    try:
+        result = await upload_recording_to_s3(
+            filepath,
+            recording_id,
+            payload["bucket"],
+            progress,
+            payload["s3_key"]
+        )
+    except asyncio.CancelledError:
+        # Shutdown: the queue keeps the job and resumes it on next start
+        _set_upload_fields(recording_id, status="queued", error="Interrupted by shutdown")
+        raise
+    except Exception as e:
+        if job["attempts"] >= job["max_attempts"]:
+            _finish_upload(recording_id, status="failed", error=str(e))
+        else:
+            _set_upload_fields(recording_id, status="retrying", error=str(e))
+        raise
+
+    _finish_upload(
+        recording_id,
+        status=result["status"],
+        bytes_uploaded=progress.bytes_uploaded,
+        error=None
+    )
+    return {"s3_key": result["s3_key"], "s3_url": result["s3_url"]}
+
+
+register_job_handler(UPLOAD_JOB, _run_upload)
+
+
+def submit_upload(recording_id: str, bucket_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Queue a stopped recording for upload.
+
+    Jobs are keyed by ``upload:{recording_id}``: submitting again while the
+    upload is queued, running or waiting to retry returns the existing job
+    instead of starting a second one. Segmented recordings upload
+    themselves while recording, so their streaming job is returned.
+
+    Args:
+        recording_id: The recording ID
+        bucket_name: Optional bucket name (uses config default if not provided)
+
+    Returns:
+        The upload job (job_id, status, S3 location and byte progress)
+    """
+    bucket = bucket_name or settings.s3_bucket_name
+    if not bucket:
+        raise ValueError("S3 bucket name not configured")
+
+    recording_info = get_state_store().get(RECORDINGS, recording_id)
+    if recording_info is None:
+        recording_info = get_recording_catalog().get(recording_id)
+    if recording_info is None:
+        raise ValueError(f"Recording {recording_id} not found")
+
+    if recording_info.get("segmented"):
+        return dict(recording_info["upload"])
+
+    filepath = recording_info["filepath"]
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Recording file not found: {filepath}")
+
+    s3_key = build_s3_key(recording_id, filepath)
+    queued = get_job_queue().enqueue(
+        UPLOAD_JOB,
+        f"upload:{recording_id}",
+        {"recording_id": recording_id, "filepath": filepath, "bucket": bucket, "s3_key": s3_key}
+    )
+    payload = queued["payload"]
+    job = {
+        "job_id": queued["job_id"],
+        "status": "queued",
+        "s3_bucket": payload["bucket"],
+        "s3_key": payload["s3_key"],
+        "s3_url": build_s3_url(payload["bucket"], payload["s3_key"]),
+        "bytes_total": os.path.getsize(filepath),
+        "bytes_uploaded": 0,
+        "attempts": queued["attempts"],
+        "submitted_at": datetime.now().isoformat()
+    }
+
+    def claim(info):
+        if info is None:
+            return info, None
+        existing = info.get("upload")
+        if existing and existing.get("job_id") == job["job_id"]:
+            return info, existing
+        info["upload"] = job
+        return info, job
+
+    upload = get_state_store().update(RECORDINGS, recording_id, claim)
+    if upload is None:
+        # Catalog-only recording: the job is tracked on the catalog row
+        existing = recording_info.get("upload")
+        if existing and existing.get("job_id") == job["job_id"]:
+            return dict(existing)
+        recording_info["upload"] = job
+        get_recording_catalog().upsert(recording_info)
+        upload = job
+    return dict(upload)
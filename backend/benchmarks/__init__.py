@@ -0,0 +1 @@
+"""Benchmarks for backend signaling paths (run from ``backend/``)."""
@@ -0,0 +1,298 @@
+"""Load-test full call lifecycles through the API against a fake SFU.
+
+Starts the FastAPI app under uvicorn in-process, pointed at
+``benchmarks/fake_sfu.py``, and drives create -> join -> produce ->
+consume -> leave for every room at the given concurrency. ``--batch``
+uses the batch endpoints (one produce and one consume-all request per
+user) instead of one request per track, and ``--sfu-nodes`` runs several
+fake SFUs as a cluster. Reports lifecycle throughput, p50/p95/p99 per
+step, and traced memory per room held open (app-side allocations only;
+the fake SFU and the load generator are filtered out), plus how the open
+rooms were spread across SFU nodes.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_call_lifecycle --rooms 500 --concurrency 20 --latency 0.005
+    python -m benchmarks.bench_call_lifecycle --save baseline.json
+    python -m benchmarks.bench_call_lifecycle --compare baseline.json
+    python -m benchmarks.bench_call_lifecycle --batch --compare baseline.json
+    python -m benchmarks.bench_call_lifecycle --sfu-nodes 3
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import socket
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import uvicorn
+
+from benchmarks.fake_sfu import FakeSFU, RTP_CAPABILITIES
+from config import settings
+
+
+STEPS = ("create", "join", "produce", "consume", "leave", "lifecycle")
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+
+    def pct(p: float) -> float:
+        return samples[max(0, int(round(len(samples) * p)) - 1)] * 1000
+
+    return {
+        "count": len(samples),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "mean": statistics.fmean(samples) * 1000,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LoadClient:
+    """Drives call lifecycles against the API and records step latencies."""
+
+    def __init__(self, session: aiohttp.ClientSession, batch: bool = False):
+        self.session = session
+        self.batch = batch
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+
+    async def _call(self, step: str, path: str, body: Optional[Dict] = None, **params) -> Any:
+        start = time.perf_counter()
+        async with self.session.post(path, json=body, params=params or None) as response:
+            payload = await response.json()
+            if response.status >= 400:
+                raise RuntimeError(f"{step} {path} -> {response.status}: {payload}")
+        self.timings[step].append(time.perf_counter() - start)
+        return payload
+
+    async def open_room(self) -> Dict[str, Any]:
+        """Create and join a room, publish audio+video per user and cross-consume."""
+        users = [f"user-{uuid.uuid4().hex[:8]}", f"user-{uuid.uuid4().hex[:8]}"]
+        created = await self._call("create", "/api/call/create", {"user_id": users[0]})
+        room_id = created["room_id"]
+        joined = await self._call("join", f"/api/call/join/{room_id}", {"user_id": users[1]})
+        transports = {
+            users[0]: created["transport"]["transport_id"],
+            users[1]: joined["transport"]["transport_id"],
+        }
+
+        if self.batch:
+            for user in users:
+                await self._call(
+                    "produce",
+                    f"/api/call/{room_id}/producers",
+                    {"producers": [
+                        {"kind": kind, "rtp_parameters": {"kind": kind, "codecs": [], "encodings": []}}
+                        for kind in ("audio", "video")
+                    ]},
+                    user_id=user,
+                    transport_id=transports[user],
+                )
+            for user in users:
+                await self._call(
+                    "consume",
+                    f"/api/call/{room_id}/consume-all",
+                    {"rtp_capabilities": RTP_CAPABILITIES},
+                    user_id=user,
+                    transport_id=transports[user],
+                )
+            return {"room_id": room_id, "users": users}
+
+        producers = {user: [] for user in users}
+        for user in users:
+            for kind in ("audio", "video"):
+                produced = await self._call(
+                    "produce",
+                    f"/api/call/{room_id}/producer",
+                    {"kind": kind, "rtp_parameters": {"kind": kind, "codecs": [], "encodings": []}},
+                    user_id=user,
+                    transport_id=transports[user],
+                )
+                producers[user].append(produced["producer_id"])
+
+        for user, peer in ((users[0], users[1]), (users[1], users[0])):
+            for producer_id in producers[peer]:
+                await self._call(
+                    "consume",
+                    f"/api/call/{room_id}/consumer",
+                    {"producer_id": producer_id, "rtp_capabilities": RTP_CAPABILITIES},
+                    user_id=user,
+                    transport_id=transports[user],
+                )
+        return {"room_id": room_id, "users": users}
+
+    async def close_room(self, room: Dict[str, Any]) -> None:
+        for user in reversed(room["users"]):
+            await self._call("leave", f"/api/call/leave/{room['room_id']}", user_id=user)
+
+    async def lifecycle(self) -> None:
+        start = time.perf_counter()
+        await self.close_room(await self.open_room())
+        self.timings["lifecycle"].append(time.perf_counter() - start)
+
+
+async def _run_concurrently(rooms: int, concurrency: int, fn) -> List[Any]:
+    remaining = iter(range(rooms))
+    results: List[Any] = []
+
+    async def worker():
+        for _ in remaining:
+            results.append(await fn())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def _app_memory(snapshot: tracemalloc.Snapshot) -> int:
+    # Exclude allocations made by the load generator and the fake SFU
+    here = os.path.join(os.path.dirname(os.path.abspath(__file__)), "*")
+    return sum(
+        stat.size
+        for stat in snapshot.filter_traces([tracemalloc.Filter(False, here, all_frames=True)])
+        .statistics("filename")
+    )
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="ripplenote-bench-")
+    sfus = [FakeSFU(latency=args.latency) for _ in range(args.sfu_nodes)]
+    settings.mediasoup_nodes = ",".join([await sfu.start() for sfu in sfus])
+    settings.state_backend = "memory"
+    settings.state_db_path = os.path.join(workdir, "state.db")
+    settings.job_queue_db_path = os.path.join(workdir, "jobs.db")
+    settings.recording_catalog_db_path = os.path.join(workdir, "recordings.db")
+    settings.call_history_db_path = os.path.join(workdir, "calls.db")
+    settings.recordings_dir = os.path.join(workdir, "recordings")
+
+    import main as api  # imported after settings are pointed at the benchmark
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        api.app, host="127.0.0.1", port=port, log_level="warning", access_log=False,
+        timeout_keep_alive=300  # pooled connections sit idle during the memory probe
+    ))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    try:
+        async with aiohttp.ClientSession(f"http://127.0.0.1:{port}", connector=connector) as session:
+            client = LoadClient(session, batch=args.batch)
+
+            # Warm-up (router pool, connection pools, caches)
+            await _run_concurrently(min(args.concurrency, args.rooms), args.concurrency, client.lifecycle)
+            client.timings.clear()
+
+            sfu_before = sum(sfu.requests for sfu in sfus)
+            start = time.perf_counter()
+            await _run_concurrently(args.rooms, args.concurrency, client.lifecycle)
+            elapsed = time.perf_counter() - start
+            sfu_requests = sum(sfu.requests for sfu in sfus) - sfu_before
+            # Copied per step: the memory probe below reuses the client
+            timings = {step: list(samples) for step, samples in client.timings.items()}
+            client.timings.clear()
+
+            # Memory held per open room
+            gc.collect()
+            tracemalloc.start(32)
+            before = _app_memory(tracemalloc.take_snapshot())
+            held = await _run_concurrently(args.memory_rooms, args.concurrency, client.open_room)
+            gc.collect()
+            after = _app_memory(tracemalloc.take_snapshot())
+            tracemalloc.stop()
+            # Includes each node's share of the warm router pool
+            routers_per_node = [len(sfu.routers) for sfu in sfus]
+            await _run_concurrently(len(held), args.concurrency, lambda: client.close_room(held.pop()))
+    finally:
+        server.should_exit = True
+        await serve_task
+        for sfu in sfus:
+            await sfu.stop()
+
+    return {
+        "config": {
+            "rooms": args.rooms,
+            "concurrency": args.concurrency,
+            "latency_ms": args.latency * 1000,
+            "memory_rooms": args.memory_rooms,
+            "batch": args.batch,
+            "sfu_nodes": args.sfu_nodes,
+        },
+        "throughput_lifecycles_per_s": args.rooms / elapsed,
+        "sfu_requests_per_lifecycle": sfu_requests / args.rooms,
+        "steps": {step: _summary(timings[step]) for step in STEPS if timings.get(step)},
+        "memory_per_room_bytes": (after - before) / max(1, args.memory_rooms),
+        "routers_per_node": routers_per_node,
+    }
+
+
+def _delta(current: float, baseline: Optional[float]) -> str:
+    if not baseline:
+        return ""
+    return f" ({(current - baseline) / baseline * 100:+.1f}%)"
+
+
+def report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    base_steps = (baseline or {}).get("steps", {})
+    config = result["config"]
+    print(
+        f"rooms={config['rooms']} concurrency={config['concurrency']} "
+        f"injected_latency={config['latency_ms']:.1f}ms batch={config.get('batch', False)}"
+    )
+    print(f"{'step':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for step, stats in result["steps"].items():
+        print(
+            f"{step:<12}{stats['count']:>8}{stats['p50']:>10.2f}{stats['p95']:>10.2f}"
+            f"{stats['p99']:>10.2f}{stats['mean']:>10.2f}"
+            + _delta(stats["p95"], base_steps.get(step, {}).get("p95"))
+        )
+    print(
+        f"throughput: {result['throughput_lifecycles_per_s']:.1f} lifecycles/s"
+        + _delta(result["throughput_lifecycles_per_s"], (baseline or {}).get("throughput_lifecycles_per_s"))
+    )
+    print(f"SFU requests per lifecycle: {result['sfu_requests_per_lifecycle']:.1f}")
+    print(
+        f"memory per open room: {result['memory_per_room_bytes'] / 1024:.1f} KiB"
+        + _delta(result["memory_per_room_bytes"], (baseline or {}).get("memory_per_room_bytes"))
+    )
+    if len(result.get("routers_per_node", ())) > 1:
+        print(f"routers per SFU node (rooms held open): {result['routers_per_node']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.005, help="Injected SFU latency (s)")
+    parser.add_argument("--memory-rooms", type=int, default=200, help="Rooms held open for the memory probe")
+    parser.add_argument("--batch", action="store_true", help="Use the batch produce/consume-all endpoints")
+    parser.add_argument("--sfu-nodes", type=int, default=1, help="Fake SFUs to run as a cluster")
+    parser.add_argument("--save", help="Write results as JSON (e.g. a baseline)")
+    parser.add_argument("--compare", help="Baseline JSON to report deltas against (p95, throughput, memory)")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(result, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,217 @@
+"""Measure serialization time per signaling response: previous paths vs. orjson.
+
+Renders the bodies of the call, consumer and consume-all endpoints from
+SFU-shaped payloads the size mediasoup returns for the default codec list
+(capabilities with RTX codecs, RTCP feedback and header extensions), and
+reports microseconds per response for:
+
+- ``response_model``: Pydantic validation of ``CallResponse`` followed by
+  FastAPI's ``jsonable_encoder`` and stdlib encoding
+- ``jsonable_encoder``: what FastAPI does for a returned dict
+- ``stdlib splice``: the previous ``_call_response`` (stdlib head, cached
+  capabilities bytes spliced in)
+- ``orjson``: ``main._json_response``, with the cached capabilities passed
+  through as an ``orjson.Fragment``
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_json_responses --iterations 20000
+"""
+import argparse
+import json
+import time
+import uuid
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.schemas import CallResponse
+from benchmarks.fake_sfu import _transport_payload
+from main import _call_response, _json_response
+
+
+FEEDBACK = {
+    "audio": [{"type": "transport-cc", "parameter": ""}],
+    "video": [
+        {"type": "nack", "parameter": ""},
+        {"type": "nack", "parameter": "pli"},
+        {"type": "ccm", "parameter": "fir"},
+        {"type": "goog-remb", "parameter": ""},
+        {"type": "transport-cc", "parameter": ""},
+    ],
+}
+
+HEADER_EXTENSIONS = [
+    ("audio", "urn:ietf:params:rtp-hdrext:sdes:mid", 1),
+    ("video", "urn:ietf:params:rtp-hdrext:sdes:mid", 1),
+    ("video", "urn:ietf:params:rtp-hdrext:sdes:rtp-stream-id", 2),
+    ("video", "urn:ietf:params:rtp-hdrext:sdes:repaired-rtp-stream-id", 3),
+    ("audio", "http://www.webrtc.org/experiments/rtp-hdrext/abs-send-time", 4),
+    ("video", "http://www.webrtc.org/experiments/rtp-hdrext/abs-send-time", 4),
+    ("audio", "http://www.ietf.org/id/draft-holmer-rmcat-transport-wide-cc-extensions-01", 5),
+    ("video", "http://www.ietf.org/id/draft-holmer-rmcat-transport-wide-cc-extensions-01", 5),
+    ("audio", "urn:ietf:params:rtp-hdrext:ssrc-audio-level", 10),
+    ("video", "urn:3gpp:video-orientation", 11),
+    ("video", "urn:ietf:params:rtp-hdrext:toffset", 12),
+    ("audio", "http://www.webrtc.org/experiments/rtp-hdrext/abs-capture-time", 13),
+    ("video", "http://www.webrtc.org/experiments/rtp-hdrext/abs-capture-time", 13),
+    ("video", "http://www.webrtc.org/experiments/rtp-hdrext/playout-delay", 14),
+]
+
+
+def _codec(kind: str, mime_type: str, payload_type: int, **extra: Any) -> Dict[str, Any]:
+    return dict(
+        kind=kind,
+        mimeType=mime_type,
+        preferredPayloadType=payload_type,
+        clockRate=48000 if kind == "audio" else 90000,
+        rtcpFeedback=FEEDBACK[kind],
+        parameters={},
+        **extra
+    )
+
+
+def router_capabilities() -> Dict[str, Any]:
+    """Router capabilities for opus, VP8, VP9 and two H264 profiles, with RTX."""
+    codecs = [_codec("audio", "audio/opus", 100, channels=2)]
+    video = [
+        ("video/VP8", {}),
+        ("video/VP9", {"profile-id": 2}),
+        ("video/H264", {"packetization-mode": 1, "profile-level-id": "4d0032", "level-asymmetry-allowed": 1}),
+        ("video/H264", {"packetization-mode": 1, "profile-level-id": "42e01f", "level-asymmetry-allowed": 1}),
+    ]
+    for i, (mime_type, parameters) in enumerate(video):
+        payload_type = 101 + 2 * i
+        codecs.append(dict(_codec("video", mime_type, payload_type), parameters=parameters))
+        codecs.append(dict(
+            _codec("video", "video/rtx", payload_type + 1),
+            rtcpFeedback=[],
+            parameters={"apt": payload_type}
+        ))
+    return {
+        "codecs": codecs,
+        "headerExtensions": [
+            {"kind": kind, "uri": uri, "preferredId": preferred_id, "preferredEncrypt": False, "direction": "sendrecv"}
+            for kind, uri, preferred_id in HEADER_EXTENSIONS
+        ],
+    }
+
+
+def consumer_payload(kind: str) -> Dict[str, Any]:
+    codec = router_capabilities()["codecs"][0 if kind == "audio" else 1]
+    return {
+        "consumer_id": str(uuid.uuid4()),
+        "producer_id": str(uuid.uuid4()),
+        "kind": kind,
+        "rtp_parameters": {
+            "mid": "0",
+            "codecs": [
+                {
+                    "mimeType": codec["mimeType"],
+                    "payloadType": codec["preferredPayloadType"],
+                    "clockRate": codec["clockRate"],
+                    "parameters": codec["parameters"],
+                    "rtcpFeedback": codec["rtcpFeedback"],
+                }
+            ],
+            "headerExtensions": [
+                {"uri": uri, "id": preferred_id, "encrypt": False, "parameters": {}}
+                for extension_kind, uri, preferred_id in HEADER_EXTENSIONS
+                if extension_kind == kind
+            ],
+            "encodings": [{"ssrc": 11111111, "rtx": {"ssrc": 22222222}} if kind == "video" else {"ssrc": 33333333}],
+            "rtcp": {"cname": uuid.uuid4().hex[:16], "reducedSize": True, "mux": True},
+        },
+    }
+
+
+def _fastapi_body(content: Any) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def _stdlib_splice(result: Dict[str, Any]) -> bytes:
+    head = json.dumps({
+        "room_id": result["room_id"],
+        "router_id": result["router_id"],
+        "transport": result["transport"],
+        "status": result["status"]
+    }, separators=(",", ":")).encode()
+    return head[:-1] + b',"rtp_capabilities":' + result["rtp_capabilities_json"] + b"}"
+
+
+def paths() -> Dict[str, Dict[str, Callable[[], bytes]]]:
+    """Renderers per endpoint, each returning the response body."""
+    capabilities = router_capabilities()
+    call = {
+        "room_id": str(uuid.uuid4()),
+        "router_id": str(uuid.uuid4()),
+        "transport": _transport_payload(),
+        "status": "created",
+        "rtp_capabilities": capabilities,
+        "rtp_capabilities_json": json.dumps(capabilities, separators=(",", ":")).encode(),
+    }
+    call_fields = {key: value for key, value in call.items() if key != "rtp_capabilities_json"}
+
+    consumer = consumer_payload("video")
+    consumer_body = {
+        "consumer_id": consumer["consumer_id"],
+        "producer_id": consumer["producer_id"],
+        "rtp_parameters": consumer["rtp_parameters"],
+        "status": "created"
+    }
+    consume_all_body = {
+        "consumers": [consumer_payload("audio"), consumer_payload("video")],
+        "skipped": [],
+        "status": "created"
+    }
+
+    return {
+        "call (create/join)": {
+            "response_model": lambda: _fastapi_body(CallResponse.model_validate(call_fields)),
+            "stdlib splice": lambda: _stdlib_splice(call),
+            "orjson": lambda: _call_response(call).body,
+        },
+        "consumer": {
+            "jsonable_encoder": lambda: _fastapi_body(consumer_body),
+            "orjson": lambda: _json_response(consumer_body).body,
+        },
+        "consume-all (2)": {
+            "jsonable_encoder": lambda: _fastapi_body(consume_all_body),
+            "orjson": lambda: _json_response(consume_all_body).body,
+        },
+    }
+
+
+def measure(render: Callable[[], bytes], iterations: int) -> Dict[str, float]:
+    body = render()
+    for _ in range(min(iterations, 1000)):
+        render()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    elapsed = time.perf_counter() - start
+    return {"us_per_response": elapsed / iterations * 1e6, "bytes": len(body)}
+
+
+def main(args: argparse.Namespace) -> None:
+    print(f"iterations={args.iterations}")
+    print(f"{'endpoint':<20}{'path':<18}{'us/response':>13}{'bytes':>8}{'speedup':>9}")
+    for endpoint, renderers in paths().items():
+        # Every path must produce the same document
+        documents = {json.dumps(json.loads(render()), sort_keys=True) for render in renderers.values()}
+        assert len(documents) == 1, f"{endpoint}: paths render different bodies"
+
+        results = {name: measure(render, args.iterations) for name, render in renderers.items()}
+        slowest = max(stats["us_per_response"] for stats in results.values())
+        for name, stats in results.items():
+            print(
+                f"{endpoint:<20}{name:<18}{stats['us_per_response']:>13.1f}{stats['bytes']:>8}"
+                f"{slowest / stats['us_per_response']:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    main(parser.parse_args())
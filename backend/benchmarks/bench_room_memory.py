@@ -0,0 +1,164 @@
+"""Measure bytes per active room: ``RoomRecord`` vs. the previous nested dicts.
+
+Builds rooms the way ``call_manager`` does for a 1:1 call (two
+participants, each with a transport, audio+video producers and consumers
+of the peer's tracks) from parsed SFU-shaped JSON, and reports traced
+memory per room for both representations, plus the JSON size each would
+occupy in the SQLite state backend.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_room_memory --rooms 5000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from app.models.records import RoomRecord
+from benchmarks.fake_sfu import RTP_CAPABILITIES, _transport_payload
+
+
+KINDS = ("audio", "video")
+
+
+def _parsed(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Every id arrives as its own string object, as it does off the wire
+    return json.loads(json.dumps(payload))
+
+
+def _consumer_payload(producer_id: str, kind: str) -> Dict[str, Any]:
+    codec = RTP_CAPABILITIES["codecs"][0 if kind == "audio" else 1]
+    return _parsed({
+        "consumer_id": str(uuid.uuid4()),
+        "producer_id": producer_id,
+        "kind": kind,
+        "rtp_parameters": {
+            "codecs": [dict(codec, payloadType=codec["preferredPayloadType"])],
+            "encodings": [{"ssrc": 11111111}],
+            "rtcp": {"cname": "fake", "reducedSize": True},
+        },
+    })
+
+
+def _sfu_session() -> Dict[str, Any]:
+    """SFU responses for one room: router, transports, producers and consumers."""
+    users = [f"user-{uuid.uuid4().hex[:8]}" for _ in range(2)]
+    producers = {
+        user: [_parsed({"producer_id": str(uuid.uuid4()), "kind": kind}) for kind in KINDS]
+        for user in users
+    }
+    consumers = {
+        user: [
+            _consumer_payload(producer["producer_id"], producer["kind"])
+            for producer in producers[peer]
+        ]
+        for user, peer in ((users[0], users[1]), (users[1], users[0]))
+    }
+    return {
+        "room_id": str(uuid.uuid4()),
+        "router_id": str(uuid.uuid4()),
+        "users": users,
+        "transports": {user: _parsed(_transport_payload()) for user in users},
+        "producers": producers,
+        "consumers": consumers,
+    }
+
+
+def build_dict_room(session: Dict[str, Any]) -> Dict[str, Any]:
+    """The room shape ``call_manager`` stored before ``RoomRecord``."""
+    users = [_parsed(user) for user in session["users"]]
+    call_info = {
+        "room_id": session["room_id"],
+        "router_id": session["router_id"],
+        "codec_fingerprint": "0123456789abcdef",
+        "created_by": users[0],
+        "participants": list(users),
+        "participants_seen": list(users),
+        "transports": {user: session["transports"][user] for user in users},
+        "producers": {},
+        "consumers": {},
+        "user_producers": {},
+        "user_consumers": {},
+        "producer_consumers": {},
+        "last_seen": {user: time.time() for user in users},
+        "created_at": datetime.now().isoformat(),
+        "status": "active",
+    }
+    for user in users:
+        for producer in session["producers"][user]:
+            producer_id = producer["producer_id"]
+            call_info["producers"][producer_id] = dict(producer, user_id=user)
+            call_info["user_producers"].setdefault(user, []).append(producer_id)
+            call_info["producer_consumers"].setdefault(producer_id, [])
+    for user in users:
+        for consumer in session["consumers"][user]:
+            consumer_id = consumer["consumer_id"]
+            call_info["consumers"][consumer_id] = dict(consumer, user_id=user)
+            call_info["user_consumers"].setdefault(user, []).append(consumer_id)
+            call_info["producer_consumers"].setdefault(consumer["producer_id"], []).append(consumer_id)
+    return call_info
+
+
+def build_record_room(session: Dict[str, Any]) -> RoomRecord:
+    users = [_parsed(user) for user in session["users"]]
+    room = RoomRecord(
+        room_id=session["room_id"],
+        router_id=session["router_id"],
+        codec_fingerprint="0123456789abcdef",
+        created_by=users[0],
+        created_at=datetime.now().isoformat()
+    )
+    for user in users:
+        room.add_participant(user, time.time()).transport_id = session["transports"][user]["transport_id"]
+    for user in users:
+        for producer in session["producers"][user]:
+            room.add_producer(user, producer["producer_id"], producer["kind"])
+    for user in users:
+        for consumer in session["consumers"][user]:
+            room.add_consumer(user, consumer["consumer_id"], consumer["producer_id"], consumer["kind"])
+    return room
+
+
+def measure(rooms: int, build: Callable[[Dict[str, Any]], Any]) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held: List[Any] = []
+    for _ in range(rooms):
+        # Whatever the room does not keep of the SFU responses is freed here
+        held.append(build(_sfu_session()))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    sample = held[0]
+    as_json = json.dumps(sample.to_dict() if isinstance(sample, RoomRecord) else sample)
+    return {
+        "bytes_per_room": (after - before) / rooms,
+        "json_bytes_per_room": len(as_json),
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    results = {
+        "dict": measure(args.rooms, build_dict_room),
+        "RoomRecord": measure(args.rooms, build_record_room),
+    }
+    print(f"rooms={args.rooms} (2 participants, audio+video each, cross-consumed)")
+    print(f"{'model':<12}{'bytes/room':>14}{'json bytes/room':>18}")
+    for name, stats in results.items():
+        print(f"{name:<12}{stats['bytes_per_room']:>14.0f}{stats['json_bytes_per_room']:>18}")
+    ratio = results["dict"]["bytes_per_room"] / results["RoomRecord"]["bytes_per_room"]
+    print(f"rooms per MiB: dict {2 ** 20 / results['dict']['bytes_per_room']:.0f}, "
+          f"RoomRecord {2 ** 20 / results['RoomRecord']['bytes_per_room']:.0f} ({ratio:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=5000)
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""Compare sequential vs. composite room create/join against a fake SFU.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_room_provisioning --rooms 200 --latency 0.01
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.fake_sfu import FakeSFU
+from config import settings
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50": samples[len(samples) // 2] * 1000,
+        "p95": samples[int(len(samples) * 0.95) - 1] * 1000,
+        "mean": statistics.fmean(samples) * 1000,
+    }
+
+
+async def _measure(rooms: int, fn: Callable[[], Awaitable[None]]) -> List[float]:
+    samples = []
+    for _ in range(rooms):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(rooms: int, latency: float) -> None:
+    sfu = FakeSFU(latency=latency)
+    await sfu.start()
+    settings.mediasoup_host = sfu.host
+    settings.mediasoup_port = sfu.port
+    settings.mediasoup_nodes = ""
+
+    from app.services import call_manager, sfu_cluster
+    from app.services.state_store import get_state_store
+
+    cluster = await sfu_cluster.start_sfu_cluster()
+    try:
+        # Pre-provisioning flow: one SFU request per step, no capabilities cache
+        client = cluster.default_node.client
+
+        async def sequential_create():
+            response = await client.request("POST", "/api/router/create")
+            router_id = (await response.json())["router_id"]
+            await client.request("GET", f"/api/router/{router_id}/rtp-capabilities")
+            await client.request("POST", "/api/transport/create", {"router_id": router_id})
+
+        async def sequential_join():
+            router_id = next(iter(sfu.routers))
+            await client.request("GET", f"/api/router/{router_id}/rtp-capabilities")
+            await client.request("POST", "/api/transport/create", {"router_id": router_id})
+
+        async def composite_create():
+            await call_manager.create_call_room("bench-user")
+
+        room_ids = iter(())
+
+        async def composite_join():
+            await call_manager.join_call_room(next(room_ids), "bench-peer")
+
+        results = {}
+        for name, fn in (
+            ("create (sequential)", sequential_create),
+            ("create (composite)", composite_create),
+        ):
+            before = sfu.requests
+            results[name] = (_summary(await _measure(rooms, fn)), (sfu.requests - before) / rooms)
+
+        room_ids = iter([room.room_id for room in get_state_store().values(call_manager.CALLS)])
+        for name, fn in (
+            ("join (sequential)", sequential_join),
+            ("join (cached)", composite_join),
+        ):
+            before = sfu.requests
+            results[name] = (_summary(await _measure(rooms, fn)), (sfu.requests - before) / rooms)
+    finally:
+        await sfu_cluster.stop_sfu_cluster()
+        await sfu.stop()
+
+    print(f"rooms={rooms} injected_latency={latency * 1000:.1f}ms")
+    print(f"{'flow':<22}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'SFU req':>10}")
+    for name, (stats, requests) in results.items():
+        print(f"{name:<22}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['mean']:>10.2f}{requests:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.01, help="Injected SFU latency (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.rooms, args.latency))
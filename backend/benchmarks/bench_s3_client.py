@@ -0,0 +1,80 @@
+"""Measure per-operation S3 client overhead: fresh client vs. shared client.
+
+Presigning is signed locally, so the comparison needs no network access or
+real credentials; dummy ones are configured for the run.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_s3_client --ops 200
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import boto3
+
+from app.services import s3_service
+from config import settings
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50": samples[len(samples) // 2] * 1000,
+        "p95": samples[int(len(samples) * 0.95) - 1] * 1000,
+        "mean": statistics.fmean(samples) * 1000,
+    }
+
+
+def _measure(ops: int, fn: Callable[[], None]) -> List[float]:
+    samples = []
+    for _ in range(ops):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _presign(client) -> None:
+    client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": settings.s3_bucket_name, "Key": "recordings/bench/file.webm"},
+        ExpiresIn=3600
+    )
+
+
+def fresh_client() -> None:
+    """Previous behaviour: build a client for every operation."""
+    _presign(boto3.client(
+        "s3",
+        aws_access_key_id=settings.aws_access_key_id,
+        aws_secret_access_key=settings.aws_secret_access_key,
+        region_name=settings.aws_region
+    ))
+
+
+def shared_client() -> None:
+    _presign(s3_service.get_s3_client())
+
+
+def main(ops: int) -> None:
+    settings.aws_access_key_id = "AKIABENCHMARK"
+    settings.aws_secret_access_key = "benchmark-secret"
+    settings.s3_bucket_name = settings.s3_bucket_name or "bench-bucket"
+    s3_service.reset_s3_client()
+
+    for name, fn in (("fresh client", fresh_client), ("shared client", shared_client)):
+        fn()  # warm imports and endpoint data
+        stats = _summary(_measure(ops, fn))
+        print(
+            f"{name:>14}: p50 {stats['p50']:.3f} ms  p95 {stats['p95']:.3f} ms  "
+            f"mean {stats['mean']:.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+    main(args.ops)
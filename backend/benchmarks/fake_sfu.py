@@ -0,0 +1,301 @@
+"""In-process stand-in for the mediasoup SFU HTTP API used by benchmarks.
+
+Implements the routes from ``mediasoup-server/index.js`` with canned
+payloads and a configurable injected latency per request, so backend
+signaling paths can be measured without a real mediasoup install.
+"""
+import asyncio
+import hashlib
+import json
+import uuid
+from typing import Dict, Any, Optional
+
+from aiohttp import web
+
+
+DEFAULT_CODECS = [
+    {"kind": "audio", "mimeType": "audio/opus", "clockRate": 48000, "channels": 2},
+    {"kind": "video", "mimeType": "video/VP8", "clockRate": 90000},
+    {"kind": "video", "mimeType": "video/VP9", "clockRate": 90000},
+    {
+        "kind": "video",
+        "mimeType": "video/H264",
+        "clockRate": 90000,
+        "parameters": {"packetization-mode": 1, "profile-level-id": "42e01f"},
+    },
+]
+
+RTP_CAPABILITIES = {
+    "codecs": [
+        dict(codec, preferredPayloadType=100 + i, rtcpFeedback=[{"type": "nack"}])
+        for i, codec in enumerate(DEFAULT_CODECS)
+    ],
+    "headerExtensions": [
+        {"kind": "audio", "uri": "urn:ietf:params:rtp-hdrext:sdes:mid", "preferredId": 1},
+        {"kind": "video", "uri": "urn:ietf:params:rtp-hdrext:sdes:mid", "preferredId": 1},
+    ],
+}
+
+CODEC_FINGERPRINT = hashlib.sha256(json.dumps(DEFAULT_CODECS).encode()).hexdigest()[:16]
+
+
+def _transport_payload() -> Dict[str, Any]:
+    return {
+        "transport_id": str(uuid.uuid4()),
+        "ice_parameters": {"usernameFragment": uuid.uuid4().hex[:16], "password": uuid.uuid4().hex},
+        "ice_candidates": [
+            {"foundation": "udpcandidate", "ip": "127.0.0.1", "port": 40000, "protocol": "udp"}
+        ],
+        "dtls_parameters": {
+            "role": "auto",
+            "fingerprints": [{"algorithm": "sha-256", "value": "AB:" * 31 + "AB"}],
+        },
+    }
+
+
+class FakeSFU:
+    """Fake SFU server with injected per-request latency."""
+
+    def __init__(self, latency: float = 0.005, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.routers: Dict[str, Dict[str, Any]] = {}
+        self.draining = False
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _delay(self) -> None:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _router(self, router_id: str) -> Dict[str, Any]:
+        router = self.routers.get(router_id)
+        if router is None:
+            raise web.HTTPNotFound(text='{"error": "Router not found"}', content_type="application/json")
+        return router
+
+    def _new_router(self) -> str:
+        router_id = str(uuid.uuid4())
+        self.routers[router_id] = {"transports": set(), "producers": {}, "consumers": set()}
+        return router_id
+
+    def _new_transport(self, router_id: str) -> Dict[str, Any]:
+        payload = _transport_payload()
+        self.routers[router_id]["transports"].add(payload["transport_id"])
+        return payload
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "uptime": 0})
+
+    def _stats(self) -> Dict[str, Any]:
+        transports = sum(len(router["transports"]) for router in self.routers.values())
+        return {
+            "workers": 1,
+            "routers": len(self.routers),
+            "transports": transports,
+            "producers": sum(len(router["producers"]) for router in self.routers.values()),
+            "consumers": sum(len(router["consumers"]) for router in self.routers.values()),
+            "cpu_load": 0.0,
+            "workers_cpu": 0.0,
+            "worker_stats": [{
+                "pid": 0,
+                "routers": len(self.routers),
+                "transports": transports,
+                "cpu": 0.0,
+                "score": len(self.routers) + transports,
+            }],
+            "draining": self.draining,
+        }
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self._stats())
+
+    async def drain(self, request: web.Request) -> web.Response:
+        body = await request.json() if request.can_read_body else {}
+        self.draining = bool(body.get("draining", True))
+        return web.json_response(self._stats())
+
+    async def create_router(self, request: web.Request) -> web.Response:
+        await self._delay()
+        router_id = self._new_router()
+        return web.json_response({
+            "router_id": router_id,
+            "rtp_capabilities": RTP_CAPABILITIES,
+            "codec_fingerprint": CODEC_FINGERPRINT,
+        })
+
+    async def provision_room(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json() if request.can_read_body else {}
+        router_id = self._new_router()
+        transports = [self._new_transport(router_id) for _ in range(int(body.get("transports", 1)))]
+        return web.json_response({
+            "router_id": router_id,
+            "rtp_capabilities": RTP_CAPABILITIES,
+            "codec_fingerprint": CODEC_FINGERPRINT,
+            "transports": transports,
+        })
+
+    async def rtp_capabilities(self, request: web.Request) -> web.Response:
+        await self._delay()
+        self._router(request.match_info["router_id"])
+        return web.json_response(RTP_CAPABILITIES, headers={"X-Codec-Fingerprint": CODEC_FINGERPRINT})
+
+    async def create_transport(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        self._router(body["router_id"])
+        return web.json_response(self._new_transport(body["router_id"]))
+
+    async def connect_transport(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        router = self._router(body["router_id"])
+        if body["transport_id"] not in router["transports"]:
+            return web.json_response({"error": "Transport not found"}, status=500)
+        return web.json_response({"status": "connected"})
+
+    async def create_producer(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        router = self._router(body["router_id"])
+        producer_id = str(uuid.uuid4())
+        kind = body.get("kind") or (body.get("rtp_parameters") or {}).get("kind", "audio")
+        router["producers"][producer_id] = kind
+        return web.json_response({"producer_id": producer_id, "kind": kind})
+
+    async def create_consumer(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        router = self._router(body["router_id"])
+        kind = router["producers"].get(body["producer_id"])
+        if kind is None:
+            return web.json_response({"error": "Cannot consume this producer"}, status=500)
+        return web.json_response(self._new_consumer(router, body["producer_id"], kind))
+
+    def _new_consumer(self, router: Dict[str, Any], producer_id: str, kind: str) -> Dict[str, Any]:
+        consumer_id = str(uuid.uuid4())
+        router["consumers"].add(consumer_id)
+        codec = RTP_CAPABILITIES["codecs"][0 if kind == "audio" else 1]
+        return {
+            "consumer_id": consumer_id,
+            "producer_id": producer_id,
+            "kind": kind,
+            "rtp_parameters": {
+                "codecs": [dict(codec, payloadType=codec["preferredPayloadType"])],
+                "encodings": [{"ssrc": 11111111}],
+                "rtcp": {"cname": "fake", "reducedSize": True},
+            },
+        }
+
+    async def create_producers(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        router = self._router(body["router_id"])
+        producers = []
+        for producer in body["producers"]:
+            producer_id = str(uuid.uuid4())
+            router["producers"][producer_id] = producer["kind"]
+            producers.append({"producer_id": producer_id, "kind": producer["kind"]})
+        return web.json_response({"producers": producers})
+
+    async def create_consumers(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        router = self._router(body["router_id"])
+        consumers, skipped = [], []
+        for producer_id in body["producer_ids"]:
+            kind = router["producers"].get(producer_id)
+            if kind is None:
+                skipped.append({"producer_id": producer_id, "reason": "Producer not found"})
+            else:
+                consumers.append(self._new_consumer(router, producer_id, kind))
+        return web.json_response({"consumers": consumers, "skipped": skipped})
+
+    async def create_recording_consumers(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        router = self._router(body["router_id"])
+        if len(body["producer_ids"]) != len(body["ports"]):
+            return web.json_response({"error": "producer_ids and ports must have the same length"}, status=500)
+        consumers = []
+        for producer_id, ports in zip(body["producer_ids"], body["ports"]):
+            kind = router["producers"].get(producer_id)
+            if kind is None:
+                return web.json_response({"error": f"Producer {producer_id} not found"}, status=500)
+            transport_id = str(uuid.uuid4())
+            consumer_id = str(uuid.uuid4())
+            router["transports"].add(transport_id)
+            router["consumers"].add(consumer_id)
+            codec = RTP_CAPABILITIES["codecs"][0 if kind == "audio" else 1]
+            consumers.append({
+                "transport_id": transport_id,
+                "consumer_id": consumer_id,
+                "producer_id": producer_id,
+                "kind": kind,
+                "rtp_parameters": {
+                    "codecs": [dict(codec, payloadType=codec["preferredPayloadType"])],
+                    "encodings": [{"ssrc": 22222222}],
+                    "rtcp": {"cname": "fake", "reducedSize": True},
+                },
+                "rtp_port": ports["rtp_port"],
+                "rtcp_port": ports["rtcp_port"],
+            })
+        return web.json_response({"consumers": consumers})
+
+    async def resume_recording_consumers(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        router = self._router(body["router_id"])
+        missing = [c for c in body["consumer_ids"] if c not in router["consumers"]]
+        if missing:
+            return web.json_response({"error": f"Consumer {missing[0]} not found"}, status=500)
+        return web.json_response({"status": "resumed"})
+
+    async def close_recording_transports(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        router = self._router(body["router_id"])
+        router["transports"].difference_update(body["transport_ids"])
+        return web.json_response({"status": "closed"})
+
+    async def close_router(self, request: web.Request) -> web.Response:
+        await self._delay()
+        self.routers.pop(request.match_info["router_id"], None)
+        return web.json_response({"status": "closed"})
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/health", self.health)
+        app.router.add_get("/api/stats", self.stats)
+        app.router.add_post("/api/drain", self.drain)
+        app.router.add_post("/api/router/create", self.create_router)
+        app.router.add_post("/api/room/provision", self.provision_room)
+        app.router.add_get("/api/router/{router_id}/rtp-capabilities", self.rtp_capabilities)
+        app.router.add_post("/api/router/{router_id}/close", self.close_router)
+        app.router.add_post("/api/transport/create", self.create_transport)
+        app.router.add_post("/api/transport/connect", self.connect_transport)
+        app.router.add_post("/api/producer/create", self.create_producer)
+        app.router.add_post("/api/consumer/create", self.create_consumer)
+        app.router.add_post("/api/producers/create", self.create_producers)
+        app.router.add_post("/api/consumers/create", self.create_consumers)
+        app.router.add_post("/api/recording/consumers/create", self.create_recording_consumers)
+        app.router.add_post("/api/recording/consumers/resume", self.resume_recording_consumers)
+        app.router.add_post("/api/recording/transports/close", self.close_recording_transports)
+        return app
+
+    async def start(self) -> str:
+        """Start serving and return the base URL."""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{self.host}:{self.port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -10,19 +10,92 @@ class Settings(BaseSettings):
     mediasoup_host: str = "localhost"
     mediasoup_port: int = 3000
     mediasoup_protocol: str = "http"
+    mediasoup_pool_limit: int = 100
+    mediasoup_pool_limit_per_host: int = 0  # 0 = no per-host limit
+    mediasoup_keepalive_timeout: float = 30.0
+    mediasoup_connect_timeout: float = 3.0
+    mediasoup_request_timeout: float = 10.0
+    
+    # SFU cluster: comma-separated node base URLs (empty = the host/port above)
+    mediasoup_nodes: str = ""
+    sfu_health_interval: float = 5.0  # seconds between /api/stats polls per node
+    sfu_unhealthy_after: int = 3  # failed polls in a row before a node gets no new rooms
+    sfu_cpu_weight: float = 50.0  # placement score of a fully loaded CPU, in routers+transports per worker
+    
+    # Warm router pool (set high watermark to 0 to disable)
+    router_pool_low_watermark: int = 2
+    router_pool_high_watermark: int = 4
+    router_pool_idle_ttl: float = 600.0
+    router_pool_reap_interval: float = 30.0
+    
+    # Idle room reaper (participants silent this long are removed; 0 disables)
+    room_idle_timeout: float = 300.0
+    room_reaper_max_sleep: float = 30.0
+    
+    # Signaling events between API workers (sqlite state backend only)
+    signaling_poll_interval: float = 0.1  # seconds between reads of other workers' events
+    signaling_event_backlog: int = 256  # events kept per room
+    signaling_max_inflight: int = 16  # concurrent requests per signaling socket
     
     # AWS S3 settings
     aws_access_key_id: Optional[str] = None
     aws_secret_access_key: Optional[str] = None
     aws_region: str = "us-east-1"
     s3_bucket_name: Optional[str] = None
+    s3_upload_workers: int = 4  # concurrent uploads per worker
+    s3_multipart_threshold_mb: int = 16
+    s3_multipart_chunksize_mb: int = 16
+    s3_max_concurrency: int = 8  # parts in flight per upload
+    s3_max_pool_connections: int = 32  # shared client; cover upload workers x concurrency
+    s3_retry_mode: str = "standard"  # legacy, standard or adaptive
+    s3_max_attempts: int = 3
+    
+    # Shared state ("memory" for a single worker, "sqlite" for multiple workers)
+    state_backend: str = "memory"
+    state_db_path: str = "./data/state.db"
+    recording_catalog_db_path: str = "./data/recordings.db"  # persistent recording history
+    call_history_db_path: str = "./data/calls.db"  # persistent call room history
+    sqlite_busy_timeout: float = 0.25  # seconds a write waits for another worker's lock (blocks the event loop)
+    
+    # Background job queue (uploads, post-processing)
+    job_queue_db_path: str = "./data/jobs.db"
+    job_queue_workers: int = 2  # per API worker
+    job_max_attempts: int = 5
+    job_backoff_base: float = 2.0  # seconds before the first retry, doubled per attempt
+    job_backoff_max: float = 300.0
+    job_lease_seconds: float = 60.0  # a job is taken over if not renewed within this
     
     # Recording settings
     recordings_dir: str = "./recordings"
+    recording_stop_timeout: float = 5.0
+    recording_rtp_host: str = "127.0.0.1"  # where the SFU sends RTP for recording
+    recording_rtp_min_port: int = 50000
+    recording_rtp_max_port: int = 50999
+    recording_resume_delay: float = 0.3  # give FFmpeg time to bind before RTP flows
+    recording_segment_seconds: int = 60  # segment length for segmented recordings
+    
+    # Recording admission (per API worker)
+    recording_max_concurrent: int = 8
+    recording_max_load_per_cpu: float = 0.8
+    recording_min_free_disk_mb: int = 1024
+    recording_queue_limit: int = 32
+    recording_queue_timeout: float = 30.0
     
     # Server settings
     server_host: str = "0.0.0.0"
     server_port: int = 8000
+    server_workers: int = 1
+    server_reload: bool = True  # only honoured with a single worker
+    
+    # Admin endpoints (disabled unless a token is set)
+    admin_token: Optional[str] = None
+    
+    # Sampling profiler (per API worker; also switchable via the admin API)
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0  # fraction of requests profiled regardless of latency
+    profiling_slow_threshold_ms: float = 500.0
+    profiling_interval_ms: float = 5.0
+    profiling_ring_size: int = 50  # slow-request profiles kept
     
     class Config:
         env_file = ".env"
@@ -1,7 +1,10 @@
 """Main FastAPI application for WebRTC call infrastructure."""
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response, WebSocket
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+import orjson
 import uvicorn
 
 from config import settings
@@ -10,11 +13,14 @@ from app.models.schemas import (
     JoinCallRequest,
     TransportConnectRequest,
     CreateProducerRequest,
+    CreateProducersRequest,
     CreateConsumerRequest,
+    ConsumeRemoteRequest,
     StartRecordingRequest,
     CallResponse,
     RecordingResponse,
-    S3UploadResponse
+    S3UploadResponse,
+    ProfilingConfigRequest
 )
 from app.services.call_manager import (
     create_call_room,
@@ -22,22 +28,88 @@ from app.services.call_manager import (
     leave_call_room,
     get_call_info,
     add_producer_to_call,
-    add_consumer_to_call
+    add_producers_to_call,
+    add_consumer_to_call,
+    consume_remote_producers,
+    touch_participant
 )
 from app.services.mediasoup_client import connect_transport
 from app.services.recording_service import (
     start_recording,
     stop_recording,
     get_recording_info,
-    list_recordings
+    list_recordings,
+    shutdown_recordings
+)
+from app.services.recording_scheduler import AdmissionRejected, get_recording_scheduler
+from app.services.s3_service import shutdown_upload_executor
+from app.services.upload_jobs import submit_upload
+from app.services.job_queue import get_job_queue, start_job_queue, stop_job_queue
+from app.services.rtp_capabilities_cache import get_cache_stats
+from app.services.state_store import close_state_store
+from app.services.recording_catalog import close_recording_catalog
+from app.services.call_history import close_call_history
+from app.services.export import export_ndjson
+from app.services.signaling import (
+    get_signaling_hub,
+    serve_signaling,
+    start_signaling_hub,
+    stop_signaling_hub
+)
+from app.services.metrics import MetricsMiddleware, render_metrics
+from app.services.profiler import (
+    ProfilingMiddleware,
+    get_profiler,
+    start_profiler,
+    stop_profiler
+)
+from app.services.sfu_cluster import (
+    get_sfu_cluster,
+    start_sfu_cluster,
+    stop_sfu_cluster
+)
+from app.services.router_pool import (
+    get_router_pool,
+    start_router_pool,
+    stop_router_pool
+)
+from app.services.room_reaper import (
+    get_room_reaper,
+    start_room_reaper,
+    stop_room_reaper
 )
-from app.services.s3_service import upload_recording_to_s3
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients on startup and release them on shutdown."""
+    await start_sfu_cluster()
+    await start_router_pool()
+    await start_room_reaper()
+    await start_signaling_hub()
+    start_job_queue()
+    start_profiler()
+    try:
+        yield
+    finally:
+        await stop_profiler()
+        await stop_signaling_hub()
+        await stop_room_reaper()
+        await shutdown_recordings()
+        await stop_job_queue()
+        shutdown_upload_executor()
+        await stop_router_pool()
+        await stop_sfu_cluster()
+        close_state_store()
+        close_recording_catalog()
+        close_call_history()
 
 
 app = FastAPI(
     title="RippleNote API",
     description="WebRTC 1:1 Call Infrastructure with Mediasoup SFU",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for UI integration
@@ -49,6 +121,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route request latency for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Slow-request profiles (a no-op unless profiling is enabled)
+app.add_middleware(ProfilingMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -63,18 +141,57 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     """Detailed health check."""
+    pool = get_router_pool()
+    reaper = get_room_reaper()
     return {
         "status": "healthy",
         "mediasoup": {
-            "host": settings.mediasoup_host,
-            "port": settings.mediasoup_port
+            "cluster": get_sfu_cluster().get_stats(),
+            "rtp_capabilities_cache": get_cache_stats(),
+            "router_pool": pool.get_stats() if pool else None
         },
+        "jobs": get_job_queue().get_stats(),
+        "signaling": get_signaling_hub().get_stats(),
+        "reaper": reaper.get_stats() if reaper else None,
         "s3_configured": bool(settings.s3_bucket_name and settings.aws_access_key_id)
     }
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics for this worker."""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # Call Management Endpoints
 
+def _json_response(payload: Dict[str, Any]) -> Response:
+    """
+    Encode a response body with orjson.
+
+    Returning a ``Response`` skips FastAPI's ``jsonable_encoder`` pass, which
+    walks every nested RTP parameter before the stdlib encoder walks it again.
+    """
+    return Response(content=orjson.dumps(payload), media_type="application/json")
+
+
+def _call_response(result: Dict[str, Any]) -> Response:
+    """
+    Render a CallResponse body, embedding the cached capabilities JSON as-is.
+
+    The capabilities blob is the bulk of the payload and is identical for
+    every room on the same codec set, so it is passed through pre-serialized
+    rather than validated and re-encoded per request.
+    """
+    return _json_response({
+        "room_id": result["room_id"],
+        "router_id": result["router_id"],
+        "transport": result["transport"],
+        "status": result["status"],
+        "rtp_capabilities": orjson.Fragment(result["rtp_capabilities_json"])
+    })
+
+
 @app.post("/api/call/create", response_model=CallResponse)
 async def create_call(request: CreateCallRequest):
     """
@@ -84,13 +201,7 @@ async def create_call(request: CreateCallRequest):
     """
     try:
         result = await create_call_room(request.user_id)
-        return CallResponse(
-            room_id=result["room_id"],
-            router_id=result["router_id"],
-            rtp_capabilities=result["rtp_capabilities"],
-            transport=result["transport"],
-            status=result["status"]
-        )
+        return _call_response(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -104,13 +215,8 @@ async def join_call(room_id: str, request: JoinCallRequest):
     """
     try:
         result = await join_call_room(room_id, request.user_id)
-        return CallResponse(
-            room_id=result["room_id"],
-            router_id=result["router_id"],
-            rtp_capabilities=result["rtp_capabilities"],
-            transport=result["transport"],
-            status=result["status"]
-        )
+        await get_signaling_hub().publish(room_id, "peerJoined", {"user_id": request.user_id})
+        return _call_response(result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -127,6 +233,7 @@ async def leave_call(room_id: str, user_id: str):
     try:
         success = await leave_call_room(room_id, user_id)
         if success:
+            await get_signaling_hub().publish(room_id, "peerLeft", {"user_id": user_id})
             return {"status": "left", "room_id": room_id}
         else:
             raise HTTPException(status_code=404, detail="Call room not found")
@@ -134,6 +241,23 @@ async def leave_call(room_id: str, user_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/call/{room_id}/heartbeat")
+async def call_heartbeat(room_id: str, user_id: str):
+    """
+    Keep a participant from being reclaimed by the idle room reaper.
+    
+    Clients without a signaling socket should call this well within
+    ``ROOM_IDLE_TIMEOUT``; any other call API request counts as well.
+    """
+    try:
+        touch_participant(room_id, user_id)
+        return {"status": "ok", "room_id": room_id}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/call/{room_id}")
 async def get_call(room_id: str):
     """Get information about a call room."""
@@ -143,13 +267,28 @@ async def get_call(room_id: str):
     
     # Remove internal data before returning
     return {
-        "room_id": call_info["room_id"],
-        "participants": call_info["participants"],
-        "status": call_info["status"],
-        "created_at": call_info["created_at"]
+        "room_id": call_info.room_id,
+        "participants": call_info.participant_ids(),
+        "status": call_info.status,
+        "created_at": call_info.created_at
     }
 
 
+# Signaling
+
+@app.websocket("/ws/signaling")
+async def signaling_socket(websocket: WebSocket, user_id: str):
+    """
+    Persistent signaling channel for one participant.
+    
+    Multiplexes create/join, transport connect, produce, consume and leave
+    as ``{"id", "method", "params"}`` requests and pushes ``peerJoined``,
+    ``newProducer`` and ``peerLeft`` events. See
+    ``app/services/signaling.py`` for the message format.
+    """
+    await serve_signaling(websocket, user_id)
+
+
 # WebRTC Transport Endpoints
 
 @app.post("/api/call/{room_id}/transport/{transport_id}/connect")
@@ -168,7 +307,7 @@ async def connect_transport_endpoint(
         if not call_info:
             raise HTTPException(status_code=404, detail="Call room not found")
         
-        router_id = call_info["router_id"]
+        router_id = call_info.router_id
         success = await connect_transport(
             router_id,
             transport_id,
@@ -205,11 +344,16 @@ async def create_producer_endpoint(
             request.rtp_parameters,
             request.kind
         )
-        return {
+        await get_signaling_hub().publish(room_id, "newProducer", {
+            "user_id": user_id,
+            "producer_id": producer.get("producer_id"),
+            "kind": producer.get("kind")
+        }, exclude=user_id)
+        return _json_response({
             "producer_id": producer.get("producer_id"),
             "kind": request.kind,
             "status": "created"
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -236,12 +380,93 @@ async def create_consumer_endpoint(
             request.producer_id,
             request.rtp_capabilities
         )
-        return {
+        return _json_response({
             "consumer_id": consumer.get("consumer_id"),
             "producer_id": request.producer_id,
             "rtp_parameters": consumer.get("rtp_parameters"),
             "status": "created"
-        }
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/call/{room_id}/producers")
+async def create_producers_endpoint(
+    room_id: str,
+    user_id: str,
+    transport_id: str,
+    request: CreateProducersRequest
+):
+    """
+    Create several producers (e.g. audio and video) in one request.
+    
+    The SFU creates all of them or none.
+    """
+    try:
+        producers = await add_producers_to_call(
+            room_id,
+            user_id,
+            transport_id,
+            [
+                {"kind": producer.kind, "rtp_parameters": producer.rtp_parameters}
+                for producer in request.producers
+            ]
+        )
+        hub = get_signaling_hub()
+        for producer in producers:
+            await hub.publish(room_id, "newProducer", {
+                "user_id": user_id,
+                "producer_id": producer.get("producer_id"),
+                "kind": producer.get("kind")
+            }, exclude=user_id)
+        return _json_response({
+            "producers": [
+                {"producer_id": producer.get("producer_id"), "kind": producer.get("kind")}
+                for producer in producers
+            ],
+            "status": "created"
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/call/{room_id}/consume-all")
+async def consume_all_endpoint(
+    room_id: str,
+    user_id: str,
+    transport_id: str,
+    request: ConsumeRemoteRequest
+):
+    """
+    Consume every remote producer in the call in one request.
+    
+    Producers the user already consumes are left out, so this can be
+    called again after a ``newProducer`` event.
+    """
+    try:
+        result = await consume_remote_producers(
+            room_id,
+            user_id,
+            transport_id,
+            request.rtp_capabilities
+        )
+        return _json_response({
+            "consumers": [
+                {
+                    "consumer_id": consumer.get("consumer_id"),
+                    "producer_id": consumer.get("producer_id"),
+                    "kind": consumer.get("kind"),
+                    "rtp_parameters": consumer.get("rtp_parameters")
+                }
+                for consumer in result["consumers"]
+            ],
+            "skipped": result["skipped"],
+            "status": "created"
+        })
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -255,7 +480,7 @@ async def start_recording_endpoint(room_id: str, request: StartRecordingRequest)
     """
     Start recording a call for a specific user.
     
-    Records the user's local stream.
+    Records the user's published audio/video as received by the SFU.
     """
     try:
         # Verify call exists
@@ -263,16 +488,31 @@ async def start_recording_endpoint(room_id: str, request: StartRecordingRequest)
         if not call_info:
             raise HTTPException(status_code=404, detail="Call room not found")
         
-        if request.user_id not in call_info["participants"]:
+        if request.user_id not in call_info.participants:
             raise HTTPException(status_code=403, detail="User not in call room")
         
-        result = await start_recording(room_id, request.user_id)
+        result = await start_recording(
+            room_id,
+            request.user_id,
+            request.priority,
+            request.segmented
+        )
         return RecordingResponse(
             recording_id=result["recording_id"],
             filename=result["filename"],
             filepath=result["filepath"],
             status=result["status"]
         )
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": str(e), "scheduler": get_recording_scheduler().get_state()},
+            headers={"Retry-After": "5"}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -296,6 +536,43 @@ async def stop_recording_endpoint(recording_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/recording/scheduler")
+async def get_recording_scheduler_state():
+    """Get recorder admission limits, current load and queued requests."""
+    return get_recording_scheduler().get_state()
+
+
+@app.get("/api/recording/list")
+async def list_recordings_endpoint(
+    room_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    status: Optional[str] = None,
+    started_after: Optional[str] = None,
+    started_before: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+):
+    """
+    List recordings newest first, one page at a time.
+    
+    Pass ``next_cursor`` from the response as ``cursor`` to fetch the next
+    page; it is null on the last page.
+    """
+    try:
+        recordings, next_cursor = list_recordings(
+            room_id=room_id,
+            user_id=user_id,
+            status=status,
+            started_after=started_after,
+            started_before=started_before,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"recordings": recordings, "count": len(recordings), "next_cursor": next_cursor}
+
+
 @app.get("/api/recording/{recording_id}")
 async def get_recording(recording_id: str):
     """Get information about a recording."""
@@ -303,49 +580,47 @@ async def get_recording(recording_id: str):
     if not recording_info:
         raise HTTPException(status_code=404, detail="Recording not found")
     
-    # Remove process object
-    return {k: v for k, v in recording_info.items() if k != "process"}
-
-
-@app.get("/api/recording/list")
-async def list_recordings_endpoint(room_id: str = None):
-    """List all recordings, optionally filtered by room_id."""
-    recordings = list_recordings(room_id)
-    return {"recordings": recordings, "count": len(recordings)}
+    return recording_info
 
 
 # S3 Upload Endpoints
 
-@app.post("/api/recording/upload/{recording_id}", response_model=S3UploadResponse)
+@app.post("/api/recording/upload/{recording_id}", response_model=S3UploadResponse, status_code=202)
 async def upload_recording(recording_id: str):
     """
-    Upload a recording to S3.
+    Start uploading a recording to S3.
     
-    The recording must be stopped before uploading.
+    The recording must be stopped before uploading (segmented recordings
+    stream to S3 while recording and return their running job). Returns
+    immediately with the upload job, which runs on the durable job queue and
+    is retried on failure. Progress is reported under ``upload`` in
+    ``GET /api/recording/{recording_id}``.
     """
     try:
         recording_info = get_recording_info(recording_id)
         if not recording_info:
             raise HTTPException(status_code=404, detail="Recording not found")
         
-        if recording_info["status"] != "stopped":
+        if recording_info["status"] != "stopped" and not recording_info.get("segmented"):
             raise HTTPException(
                 status_code=400,
                 detail="Recording must be stopped before uploading"
             )
         
-        result = await upload_recording_to_s3(
-            recording_info["filepath"],
-            recording_id
-        )
+        job = submit_upload(recording_id)
         
         return S3UploadResponse(
-            recording_id=result["recording_id"],
-            s3_bucket=result["s3_bucket"],
-            s3_key=result["s3_key"],
-            s3_url=result["s3_url"],
-            status=result["status"]
+            recording_id=recording_id,
+            s3_bucket=job["s3_bucket"],
+            s3_key=job["s3_key"],
+            s3_url=job["s3_url"],
+            status=job["status"],
+            job_id=job["job_id"],
+            bytes_total=job["bytes_total"],
+            bytes_uploaded=job["bytes_uploaded"]
         )
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except FileNotFoundError as e:
@@ -354,12 +629,127 @@ async def upload_recording(recording_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Export Endpoints
+
+@app.get("/api/export")
+async def export_history(since: Optional[str] = None, types: str = "calls,recordings"):
+    """
+    Stream call and recording history as newline-delimited JSON.
+    
+    ``since`` (ISO timestamp) limits the export to records changed at or
+    after it, for incremental syncs; ``types`` selects ``calls`` and/or
+    ``recordings``.
+    """
+    try:
+        stream = export_ndjson(since, types.split(","))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+
+# Admin Endpoints
+
+def _require_admin(token: Optional[str]) -> None:
+    """Reject the request unless it carries the configured admin token."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Admin API disabled")
+    if token != settings.admin_token:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/api/admin/profiling")
+async def get_profiling_state(x_admin_token: Optional[str] = Header(None)):
+    """Get profiler settings, event loop lag and the number of kept profiles."""
+    _require_admin(x_admin_token)
+    return get_profiler().get_state()
+
+
+@app.post("/api/admin/profiling")
+async def configure_profiling(
+    request: ProfilingConfigRequest,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Enable/disable profiling or change its sample rate and slow threshold."""
+    _require_admin(x_admin_token)
+    try:
+        return get_profiler().configure(
+            enabled=request.enabled,
+            sample_rate=request.sample_rate,
+            slow_threshold_ms=request.slow_threshold_ms
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/admin/sfu")
+async def get_sfu_nodes(x_admin_token: Optional[str] = Header(None)):
+    """Get every SFU node's health, load and drain state."""
+    _require_admin(x_admin_token)
+    return get_sfu_cluster().get_stats()
+
+
+@app.post("/api/admin/sfu/{node_id}/drain")
+async def drain_sfu_node(
+    node_id: str,
+    draining: bool = True,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Stop placing new rooms on an SFU node (``draining=false`` to undo).
+    
+    Rooms already on the node continue until they end. The flag is set on
+    the SFU, so every API worker picks it up on its next health check.
+    """
+    _require_admin(x_admin_token)
+    try:
+        return await get_sfu_cluster().set_draining(node_id, draining)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """List captured request profiles, newest first."""
+    _require_admin(x_admin_token)
+    profiles = get_profiler().list_profiles()
+    return {"profiles": profiles, "count": len(profiles)}
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = "json",
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Get a captured profile.
+    
+    ``format=folded`` returns the stacks in flamegraph folded format
+    (``frame;frame;frame count`` per line).
+    """
+    _require_admin(x_admin_token)
+    profile = get_profiler().get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(
+            "".join(f"{entry['stack']} {entry['count']}\n" for entry in profile["stacks"])
+        )
+    return profile
+
+
 if __name__ == "__main__":
+    if settings.server_workers > 1 and settings.state_backend == "memory":
+        raise SystemExit("STATE_BACKEND=sqlite is required when SERVER_WORKERS > 1")
+    
     uvicorn.run(
         "main:app",
         host=settings.server_host,
         port=settings.server_port,
-        reload=True
+        workers=settings.server_workers,
+        reload=settings.server_reload and settings.server_workers == 1
     )
 
 
@@ -43,7 +43,61 @@ async function createConsumer({
   };
 }
 
+// Consumes each producer the client's capabilities allow; the rest are
+// reported in `skipped`. Any other failure closes the consumers already
+// created and fails the batch.
+async function createConsumers({
+  routerId,
+  transportId,
+  producerIds,
+  rtpCapabilities,
+  paused = false,
+}) {
+  const state = assertRouter(routerId);
+  getTransport({ routerId, transportId });
+
+  const skipped = [];
+  const consumable = producerIds.filter((producerId) => {
+    if (!state.producers.has(producerId)) {
+      skipped.push({ producer_id: producerId, reason: 'Producer not found' });
+      return false;
+    }
+    if (!state.router.canConsume({ producerId, rtpCapabilities })) {
+      skipped.push({ producer_id: producerId, reason: 'Cannot consume this producer' });
+      return false;
+    }
+    return true;
+  });
+
+  const results = await Promise.allSettled(
+    consumable.map((producerId) => createConsumer({
+      routerId,
+      transportId,
+      producerId,
+      rtpCapabilities,
+      paused,
+    })),
+  );
+
+  const failed = results.find(({ status }) => status === 'rejected');
+  if (failed) {
+    results
+      .filter(({ status }) => status === 'fulfilled')
+      .forEach(({ value: { consumer } }) => {
+        consumer.close();
+        state.consumers.delete(consumer.id);
+      });
+    throw failed.reason;
+  }
+
+  return {
+    payload: results.map(({ value: { payload } }) => payload),
+    skipped,
+  };
+}
+
 module.exports = {
   createConsumer,
+  createConsumers,
 };
 
@@ -0,0 +1,106 @@
+const { assertRouter } = require('../router/routerManager');
+
+const recordingListenIp = process.env.MEDIASOUP_RECORDING_LISTEN_IP || '127.0.0.1';
+
+// One PlainTransport per producer, each sending RTP/RTCP to the recorder's
+// port pair; consumers start paused until the recorder is listening.
+async function createRecordingConsumers({ routerId, producerIds, ip, ports }) {
+  const state = assertRouter(routerId);
+
+  if (producerIds.length !== ports.length) {
+    throw new Error('producer_ids and ports must have the same length');
+  }
+
+  const transports = [];
+  const entries = [];
+  try {
+    for (let i = 0; i < producerIds.length; i += 1) {
+      const producerId = producerIds[i];
+      const { rtp_port: rtpPort, rtcp_port: rtcpPort } = ports[i];
+
+      if (!state.producers.has(producerId)) {
+        throw new Error(`Producer ${producerId} not found`);
+      }
+
+      const transport = await state.router.createPlainTransport({
+        listenIp: { ip: recordingListenIp },
+        rtcpMux: false,
+        comedia: false,
+      });
+      state.transports.set(transport.id, transport);
+      transports.push(transport);
+
+      await transport.connect({ ip, port: rtpPort, rtcpPort });
+
+      const consumer = await transport.consume({
+        producerId,
+        rtpCapabilities: state.router.rtpCapabilities,
+        paused: true,
+      });
+      state.consumers.set(consumer.id, consumer);
+
+      consumer.on('transportclose', () => {
+        state.consumers.delete(consumer.id);
+      });
+
+      entries.push({ transport, consumer, rtpPort, rtcpPort });
+    }
+  } catch (err) {
+    transports.forEach((transport) => {
+      transport.close();
+      state.transports.delete(transport.id);
+    });
+    throw err;
+  }
+
+  return {
+    payload: entries.map(({ transport, consumer, rtpPort, rtcpPort }) => ({
+      transport_id: transport.id,
+      consumer_id: consumer.id,
+      producer_id: consumer.producerId,
+      kind: consumer.kind,
+      rtp_parameters: consumer.rtpParameters,
+      rtp_port: rtpPort,
+      rtcp_port: rtcpPort,
+    })),
+  };
+}
+
+async function resumeRecordingConsumers({ routerId, consumerIds }) {
+  const state = assertRouter(routerId);
+
+  await Promise.all(
+    consumerIds.map(async (consumerId) => {
+      const consumer = state.consumers.get(consumerId);
+      if (!consumer) {
+        throw new Error(`Consumer ${consumerId} not found`);
+      }
+      await consumer.resume();
+      if (consumer.kind === 'video') {
+        await consumer.requestKeyFrame();
+      }
+    }),
+  );
+
+  return { status: 'resumed' };
+}
+
+function closeRecordingTransports({ routerId, transportIds }) {
+  const state = assertRouter(routerId);
+
+  transportIds.forEach((transportId) => {
+    const transport = state.transports.get(transportId);
+    if (transport) {
+      transport.close();
+      state.transports.delete(transportId);
+    }
+  });
+
+  return { status: 'closed' };
+}
+
+module.exports = {
+  createRecordingConsumers,
+  resumeRecordingConsumers,
+  closeRecordingTransports,
+};
@@ -8,13 +8,20 @@ const {
   createRouter,
   getRouterState,
   deleteRouter,
+  getStats,
+  setDraining,
 } = require('./router/routerManager');
 const {
   createTransport,
   connectTransport,
 } = require('./transports/transportService');
-const { createProducer } = require('./producers/producerService');
-const { createConsumer } = require('./consumers/consumerService');
+const { createProducer, createProducers } = require('./producers/producerService');
+const { createConsumer, createConsumers } = require('./consumers/consumerService');
+const {
+  createRecordingConsumers,
+  resumeRecordingConsumers,
+  closeRecordingTransports,
+} = require('./consumers/recordingConsumerService');
 
 const app = express();
 app.use(cors());
@@ -28,6 +35,15 @@ app.get('/api/health', (req, res) => {
   res.json({ status: 'ok', uptime: process.uptime() });
 });
 
+app.get('/api/stats', (req, res) => {
+  res.json(getStats());
+});
+
+app.post('/api/drain', (req, res) => {
+  setDraining(req.body.draining ?? true);
+  res.json(getStats());
+});
+
 app.post(
   '/api/router/create',
   asyncHandler(async (req, res) => {
@@ -36,10 +52,38 @@ app.post(
     res.json({
       router_id: router.id,
       rtp_capabilities: router.rtpCapabilities,
+      codec_fingerprint: getRouterState(router.id).codecFingerprint,
     });
   }),
 );
 
+app.post(
+  '/api/room/provision',
+  asyncHandler(async (req, res) => {
+    const transportCount = Number(req.body.transports ?? 1);
+    if (!Number.isInteger(transportCount) || transportCount < 0 || transportCount > 2) {
+      return res.status(400).json({ error: 'transports must be an integer between 0 and 2' });
+    }
+
+    const router = await createRouter();
+    try {
+      const transports = await Promise.all(
+        Array.from({ length: transportCount }, () => createTransport({ routerId: router.id })),
+      );
+
+      return res.json({
+        router_id: router.id,
+        rtp_capabilities: router.rtpCapabilities,
+        codec_fingerprint: getRouterState(router.id).codecFingerprint,
+        transports: transports.map(({ payload }) => payload),
+      });
+    } catch (err) {
+      deleteRouter(router.id);
+      throw err;
+    }
+  }),
+);
+
 app.get(
   '/api/router/:routerId/rtp-capabilities',
   asyncHandler(async (req, res) => {
@@ -48,6 +92,7 @@ app.get(
       return res.status(404).json({ error: 'Router not found' });
     }
 
+    res.set('X-Codec-Fingerprint', state.codecFingerprint);
     return res.json(state.router.rtpCapabilities);
   }),
 );
@@ -122,6 +167,105 @@ app.post(
   }),
 );
 
+app.post(
+  '/api/producers/create',
+  asyncHandler(async (req, res) => {
+    const { router_id: routerId, transport_id: transportId, producers } = req.body;
+    if (!routerId || !transportId || !Array.isArray(producers) || !producers.length) {
+      return res
+        .status(400)
+        .json({ error: 'router_id, transport_id and producers are required' });
+    }
+    if (producers.some((producer) => !producer || !producer.kind || !producer.rtp_parameters)) {
+      return res.status(400).json({ error: 'each producer needs kind and rtp_parameters' });
+    }
+
+    const { payload } = await createProducers({ routerId, transportId, producers });
+    return res.json({ producers: payload });
+  }),
+);
+
+app.post(
+  '/api/consumers/create',
+  asyncHandler(async (req, res) => {
+    const {
+      router_id: routerId,
+      transport_id: transportId,
+      producer_ids: producerIds,
+      rtp_capabilities: rtpCapabilities,
+      paused,
+    } = req.body;
+
+    if (!routerId || !transportId || !Array.isArray(producerIds) || !rtpCapabilities) {
+      return res
+        .status(400)
+        .json({ error: 'router_id, transport_id, producer_ids and rtp_capabilities are required' });
+    }
+
+    const { payload, skipped } = await createConsumers({
+      routerId,
+      transportId,
+      producerIds,
+      rtpCapabilities,
+      paused,
+    });
+
+    return res.json({ consumers: payload, skipped });
+  }),
+);
+
+app.post(
+  '/api/recording/consumers/create',
+  asyncHandler(async (req, res) => {
+    const {
+      router_id: routerId,
+      producer_ids: producerIds,
+      ip,
+      ports,
+    } = req.body;
+
+    if (!routerId || !Array.isArray(producerIds) || !producerIds.length || !ip || !Array.isArray(ports)) {
+      return res
+        .status(400)
+        .json({ error: 'router_id, producer_ids, ip and ports are required' });
+    }
+
+    const { payload } = await createRecordingConsumers({
+      routerId,
+      producerIds,
+      ip,
+      ports,
+    });
+
+    return res.json({ consumers: payload });
+  }),
+);
+
+app.post(
+  '/api/recording/consumers/resume',
+  asyncHandler(async (req, res) => {
+    const { router_id: routerId, consumer_ids: consumerIds } = req.body;
+    if (!routerId || !Array.isArray(consumerIds)) {
+      return res.status(400).json({ error: 'router_id and consumer_ids are required' });
+    }
+
+    const response = await resumeRecordingConsumers({ routerId, consumerIds });
+    return res.json(response);
+  }),
+);
+
+app.post(
+  '/api/recording/transports/close',
+  asyncHandler(async (req, res) => {
+    const { router_id: routerId, transport_ids: transportIds } = req.body;
+    if (!routerId || !Array.isArray(transportIds)) {
+      return res.status(400).json({ error: 'router_id and transport_ids are required' });
+    }
+
+    return res.json(closeRecordingTransports({ routerId, transportIds }));
+  }),
+);
+
 app.post(
   '/api/router/:routerId/close',
   asyncHandler(async (req, res) => {
@@ -1,11 +1,11 @@
 const { assertRouter } = require('../router/routerManager');
 const { getTransport } = require('../transports/transportService');
 
-async function createProducer({ routerId, transportId, rtpParameters, appData }) {
+async function createProducer({ routerId, transportId, kind, rtpParameters, appData }) {
   const state = assertRouter(routerId);
   const transport = getTransport({ routerId, transportId });
 
-  const producer = await transport.produce({ rtpParameters, appData });
+  const producer = await transport.produce({ kind, rtpParameters, appData });
   state.producers.set(producer.id, producer);
 
   producer.on('transportclose', () => {
@@ -21,7 +21,34 @@ async function createProducer({ routerId, transportId, rtpParameters, appData })
   };
 }
 
+// Creates every producer or none: if one fails, those already created are
+// closed so the client can retry the whole batch.
+async function createProducers({ routerId, transportId, producers }) {
+  const results = await Promise.allSettled(
+    producers.map(({ kind, rtp_parameters: rtpParameters, app_data: appData }) =>
+      createProducer({ routerId, transportId, kind, rtpParameters, appData }),
+    ),
+  );
+
+  const failed = results.find(({ status }) => status === 'rejected');
+  if (failed) {
+    const state = assertRouter(routerId);
+    results
+      .filter(({ status }) => status === 'fulfilled')
+      .forEach(({ value: { producer } }) => {
+        producer.close();
+        state.producers.delete(producer.id);
+      });
+    throw failed.reason;
+  }
+
+  return {
+    payload: results.map(({ value: { payload } }) => payload),
+  };
+}
+
 module.exports = {
   createProducer,
+  createProducers,
 };
 
@@ -1,10 +1,18 @@
+const crypto = require('crypto');
 const mediasoup = require('mediasoup');
 const os = require('os');
 
 const workers = [];
+// Live load per worker, in the same order as `workers`
+const workerLoads = [];
 const routerStore = new Map();
 let nextWorkerIndex = 0;
+// Score of a fully busy core, in routers + transports
+const workerCpuWeight = Number(process.env.MEDIASOUP_WORKER_CPU_WEIGHT) || 50;
 let workersReady = false;
+// Set while the node is being emptied; reported in stats so API workers stop
+// placing new rooms here. Existing routers keep working.
+let draining = false;
 
 const defaultCodecs = [
   {
@@ -34,6 +42,16 @@ const defaultCodecs = [
   },
 ];
 
+// Routers built from the same codec list expose identical RTP capabilities,
+// so clients can cache capabilities per fingerprint instead of per router.
+function codecFingerprint(mediaCodecs) {
+  return crypto
+    .createHash('sha256')
+    .update(JSON.stringify(mediaCodecs))
+    .digest('hex')
+    .slice(0, 16);
+}
+
 async function bootstrapWorkers(options = {}) {
   if (workersReady) {
     return workers;
@@ -49,6 +67,7 @@ async function bootstrapWorkers(options = {}) {
     rtcMaxPort = Number(process.env.MEDIASOUP_RTC_MAX_PORT) || 49999,
     numWorkers = Number(process.env.MEDIASOUP_WORKERS)
       || Math.min(os.cpus().length, 4),
+    loadSampleIntervalMs = Number(process.env.MEDIASOUP_LOAD_SAMPLE_MS) || 2000,
   } = options;
 
   for (let i = 0; i < numWorkers; i += 1) {
@@ -65,29 +84,93 @@ async function bootstrapWorkers(options = {}) {
     });
 
     workers.push(worker);
+    workerLoads.push({
+      worker,
+      routers: 0,
+      transports: 0,
+      cpu: 0,
+      lastCpuMs: null,
+      lastSampledAt: null,
+    });
   }
 
+  await sampleWorkerCpu();
+  setInterval(sampleWorkerCpu, loadSampleIntervalMs).unref();
+
   workersReady = true;
   console.log(`Initialized ${workers.length} mediasoup worker(s)`);
   return workers;
 }
 
-function getNextWorker() {
-  if (!workers.length) {
+// CPU time (user + system) each worker used since the previous sample, as a
+// fraction of one core.
+async function sampleWorkerCpu() {
+  await Promise.all(workerLoads.map(async (load) => {
+    try {
+      const usage = await load.worker.getResourceUsage();
+      const now = Date.now();
+      const cpuMs = usage.ru_utime + usage.ru_stime;
+      if (load.lastCpuMs !== null && now > load.lastSampledAt) {
+        load.cpu = (cpuMs - load.lastCpuMs) / (now - load.lastSampledAt);
+      }
+      load.lastCpuMs = cpuMs;
+      load.lastSampledAt = now;
+    } catch (err) {
+      // The worker died (and takes the process down); keep the last sample
+    }
+  }));
+}
+
+function workerScore(load) {
+  return load.routers + load.transports + load.cpu * workerCpuWeight;
+}
+
+// Least loaded worker by router/transport counts and recent CPU. The scan
+// starts one past the last pick, so equally loaded workers take turns.
+function selectWorker() {
+  if (!workerLoads.length) {
     throw new Error('Mediasoup workers are not initialized');
   }
 
-  const worker = workers[nextWorkerIndex % workers.length];
-  nextWorkerIndex += 1;
-  return worker;
+  let best = null;
+  let bestScore = Infinity;
+  for (let i = 0; i < workerLoads.length; i += 1) {
+    const load = workerLoads[(nextWorkerIndex + i) % workerLoads.length];
+    const score = workerScore(load);
+    if (score < bestScore) {
+      best = load;
+      bestScore = score;
+    }
+  }
+  nextWorkerIndex = workerLoads.indexOf(best) + 1;
+  return best;
 }
 
 async function createRouter(mediaCodecs = defaultCodecs) {
-  const worker = getNextWorker();
-  const router = await worker.createRouter({ mediaCodecs });
+  const load = selectWorker();
+  // Counted before the await so concurrent creates spread across workers
+  load.routers += 1;
+  let router;
+  try {
+    router = await load.worker.createRouter({ mediaCodecs });
+  } catch (err) {
+    load.routers -= 1;
+    throw err;
+  }
+
+  router.observer.on('close', () => {
+    load.routers -= 1;
+  });
+  router.observer.on('newtransport', (transport) => {
+    load.transports += 1;
+    transport.observer.on('close', () => {
+      load.transports -= 1;
+    });
+  });
 
   routerStore.set(router.id, {
     router,
+    codecFingerprint: codecFingerprint(mediaCodecs),
     transports: new Map(),
     producers: new Map(),
     consumers: new Map(),
@@ -122,12 +205,54 @@ function deleteRouter(routerId) {
   routerStore.delete(routerId);
 }
 
+function setDraining(value) {
+  draining = Boolean(value);
+}
+
+// Node load for room placement by the API's SFU cluster.
+function getStats() {
+  let transports = 0;
+  let producers = 0;
+  let consumers = 0;
+  routerStore.forEach((state) => {
+    transports += state.transports.size;
+    producers += state.producers.size;
+    consumers += state.consumers.size;
+  });
+  const workerStats = workerLoads.map((load) => ({
+    pid: load.worker.pid,
+    routers: load.routers,
+    transports: load.transports,
+    cpu: load.cpu,
+    score: workerScore(load),
+  }));
+
+  return {
+    workers: workers.length,
+    routers: routerStore.size,
+    transports,
+    producers,
+    consumers,
+    // 1-minute load average per CPU; mediasoup workers are separate processes
+    cpu_load: os.loadavg()[0] / os.cpus().length,
+    // Mean CPU of the mediasoup workers (fraction of a core each)
+    workers_cpu: workerStats.length
+      ? workerStats.reduce((sum, worker) => sum + worker.cpu, 0) / workerStats.length
+      : 0,
+    worker_stats: workerStats,
+    draining,
+  };
+}
+
 module.exports = {
   bootstrapWorkers,
   createRouter,
   getRouterState,
   assertRouter,
   deleteRouter,
+  getStats,
+  setDraining,
   defaultCodecs,
+  codecFingerprint,
 };
 